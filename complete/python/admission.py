@@ -0,0 +1,249 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+# ------------------------------------------------
+# 요청 수락 제어 설정 (환경 변수로 조정 가능, 모두 기본은 끔)
+# ------------------------------------------------
+# 사용자(userName, 없으면 클라이언트 IP)와 operation 별 초당 요청 수 "rate/burst". 0 이면 제한 없음
+# 예) SNS_RATE_LIMIT_WRITE=5/20 이면 한 사용자가 같은 쓰기 API 를 초당 5회, 순간적으로 20회까지 호출할 수 있습니다.
+RATE_LIMIT_READ = os.environ.get("SNS_RATE_LIMIT_READ", "0")
+RATE_LIMIT_WRITE = os.environ.get("SNS_RATE_LIMIT_WRITE", "0")
+# operation 별로 따로 정하는 값 (예: "createComment=2/5,likePost=10/30")
+RATE_LIMITS = os.environ.get("SNS_RATE_LIMITS", "")
+# 기억하는 (사용자, operation) 버킷 수. 넘치면 가장 오래 안 쓴 버킷부터 버립니다. (워커마다)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("SNS_RATE_LIMIT_MAX_KEYS", "100000"))
+# 동시에 처리하는 읽기(GET) / 쓰기 요청 수. 0 이면 제한 없음 (워커마다)
+MAX_CONCURRENT_READS = int(os.environ.get("SNS_MAX_CONCURRENT_READS", "0"))
+MAX_CONCURRENT_WRITES = int(os.environ.get("SNS_MAX_CONCURRENT_WRITES", "0"))
+# 동시 처리 한도에 걸린 요청이 기다리는 최대 시간(ms). 대기열 맨 앞 요청이 이 시간의 절반 넘게 기다리고 있으면
+# 새 요청은 기다리지 않고 바로 503 을 받습니다.
+MAX_QUEUE_WAIT_MS = float(os.environ.get("SNS_ADMISSION_MAX_WAIT_MS", "500"))
+# 동시 처리 한도마다 기다릴 수 있는 최대 요청 수
+MAX_QUEUE = int(os.environ.get("SNS_ADMISSION_MAX_QUEUE", "1000"))
+
+# 오래 연결된 채로 있는 요청은 동시 처리 수에 넣지 않습니다.
+EXEMPT_OPERATIONS = frozenset({"streamEvents"})
+
+READ = "read"
+WRITE = "write"
+
+
+def parse_rate(value: str) -> Tuple[float, float]:
+    """"rate/burst" 또는 "rate" (burst 는 rate 와 같게, 최소 1)"""
+    rate, _, burst = value.strip().partition("/")
+    rate = float(rate)
+    burst = float(burst) if burst else max(rate, 1.0)
+    if rate < 0 or (rate > 0 and burst < 1):
+        raise ValueError(f"잘못된 요청 수 제한 값입니다: {value}")
+    return rate, burst
+
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[float, float]]:
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        operation, sep, rate = item.partition("=")
+        if not sep:
+            raise ValueError(f"SNS_RATE_LIMITS 항목은 operationId=rate/burst 형식이어야 합니다: {item}")
+        limits[operation.strip()] = parse_rate(rate)
+    return limits
+
+
+class RateLimiter:
+    """
+    키마다 토큰 버킷 하나. 토큰은 초당 rate 개씩 burst 개까지 차고, 요청 하나가 하나를 씁니다.
+    버킷은 키가 처음 쓰일 때 가득 찬 채로 만들고, max_keys 를 넘으면 가장 오래 안 쓴 것부터 버립니다.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [남은 토큰, 마지막 갱신 시각]
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()
+
+    def acquire(self, key: Hashable, rate: float, burst: float, now: Optional[float] = None) -> float:
+        """토큰을 하나 쓰면 0, 모자라면 쓰지 않고 다음 토큰까지 기다릴 시간(초)을 돌려줍니다."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimit:
+    """
+    동시에 처리하는 요청 수 한도 (이벤트 루프에서만 사용). 한도를 넘은 요청은 도착 순서대로 기다렸다가
+    앞 요청이 끝나면 자리를 넘겨받습니다. 오래 기다려야 할 요청은 DB 앞에 쌓이기 전에 503 으로 돌려보냅니다.
+    """
+
+    def __init__(self, name: str, limit: int, max_wait: float = MAX_QUEUE_WAIT_MS / 1000, max_queue: int = MAX_QUEUE):
+        self.name = name
+        self.limit = limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.shed = 0
+        self.max_wait_ms = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if len(self._waiters) >= self.max_queue or (self._waiters and now - self._waiters[0][0] >= self.max_wait / 2):
+            self._shed()
+        entry = (now, loop.create_future())
+        self._waiters.append(entry)
+        self.queued_total += 1
+        try:
+            await asyncio.wait_for(entry[1], self.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            self._shed()
+        except asyncio.CancelledError:
+            # 자리를 넘겨받은 직후에 취소되었으면 그 자리를 다음 요청에 넘깁니다.
+            if entry[1].done() and not entry[1].cancelled():
+                self.release()
+            else:
+                self._discard(entry)
+            raise
+        self.admitted += 1
+        self.max_wait_ms = max(self.max_wait_ms, (loop.time() - now) * 1000)
+
+    def release(self) -> None:
+        # 기다리는 요청이 있으면 자리를 그대로 넘기고, 없으면 반납합니다.
+        while self._waiters:
+            _, future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, entry) -> None:
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            pass
+
+    def _shed(self) -> None:
+        self.shed += 1
+        raise HTTPException(status_code=503, detail="요청이 많아 처리하지 못했습니다. 잠시 후 다시 시도하세요.",
+                            headers={"Retry-After": "1"})
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "queuedTotal": self.queued_total,
+            "shed": self.shed,
+            "maxWaitMs": round(self.max_wait_ms, 3),
+        }
+
+
+class Admission:
+    """요청 수 제한(429)과 동시 처리 한도(503)를 operationId 와 사용자별로 적용합니다."""
+
+    def __init__(self, read_rate: str = RATE_LIMIT_READ, write_rate: str = RATE_LIMIT_WRITE,
+                 rate_limits: str = RATE_LIMITS, max_reads: int = MAX_CONCURRENT_READS,
+                 max_writes: int = MAX_CONCURRENT_WRITES):
+        self.rates = {READ: parse_rate(read_rate), WRITE: parse_rate(write_rate)}
+        self.operation_rates = parse_rate_limits(rate_limits)
+        self.limiter = RateLimiter()
+        # limit 이 0 이면 그 종류는 동시 처리 수를 제한하지 않습니다.
+        self.limits = {READ: ConcurrencyLimit(READ, max_reads), WRITE: ConcurrencyLimit(WRITE, max_writes)}
+        self.rate_limited: Dict[str, int] = {}
+
+    def rate_for(self, operation: str, kind: str) -> Tuple[float, float]:
+        return self.operation_rates.get(operation) or self.rates[kind]
+
+    def check_rate(self, operation: str, user: str, rate: float, burst: float) -> None:
+        wait = self.limiter.acquire((user, operation), rate, burst)
+        if wait > 0:
+            self.rate_limited[operation] = self.rate_limited.get(operation, 0) + 1
+            raise HTTPException(status_code=429, detail="요청이 너무 많습니다. 잠시 후 다시 시도하세요.",
+                                headers={"Retry-After": str(math.ceil(wait))})
+
+    def stats(self) -> dict:
+        return {
+            "rateLimited": dict(self.rate_limited),
+            "rateLimitedTotal": sum(self.rate_limited.values()),
+            "buckets": len(self.limiter),
+            **{kind: limit.stats() for kind, limit in self.limits.items()},
+        }
+
+
+admission = Admission()
+
+
+async def _user_key(request: Request) -> str:
+    # JSON 본문의 userName (일괄 API 는 첫 항목), 없으면 ?viewer= / ?userName=, 그래도 없으면 클라이언트 IP
+    route = request.scope.get("route")
+    if getattr(route, "body_field", None) is not None:
+        try:
+            # FastAPI 가 이미 읽어 둔 본문이므로 다시 파싱하지 않습니다.
+            body = await request.json()
+        except ValueError:
+            body = None
+        if isinstance(body, list) and body:
+            body = body[0]
+        if isinstance(body, dict) and isinstance(body.get("userName"), str) and body["userName"]:
+            return body["userName"]
+    user = request.query_params.get("viewer") or request.query_params.get("userName")
+    if user:
+        return user
+    return request.client.host if request.client else ""
+
+
+async def admit(request: Request):
+    """
+    요청 수락 제어 (APIRouter 의 dependency). 사용자별 토큰 버킷을 먼저 확인하고(429),
+    읽기 / 쓰기 동시 처리 한도 자리를 얻은 뒤 핸들러를 실행합니다. (503)
+    """
+    route = request.scope.get("route")
+    operation = getattr(route, "operation_id", None) or getattr(route, "name", "")
+    kind = READ if request.method in ("GET", "HEAD") else WRITE
+    rate, burst = admission.rate_for(operation, kind)
+    if rate > 0:
+        admission.check_rate(operation, await _user_key(request), rate, burst)
+    limit = admission.limits[kind]
+    if limit.limit <= 0 or operation in EXEMPT_OPERATIONS:
+        yield
+        return
+    await limit.acquire()
+    try:
+        yield
+    finally:
+        limit.release()
@@ -0,0 +1,538 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from repository import COMMENT_COLUMNS, POST_COLUMNS
+
+if TYPE_CHECKING:
+    # storage -> migrations -> archive 순서로 import 되므로 타입 검사할 때만 가져옵니다.
+    from storage import ShardedStorage
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 오래된 포스트 보관 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 작성된 지 이 일수가 지나고 그동안 변경(댓글 / 좋아요 포함)도 없는 포스트를 보관 표로 옮깁니다. 0 이면 끔
+ARCHIVE_AFTER_DAYS = float(os.environ.get("SNS_ARCHIVE_AFTER_DAYS", "0"))
+# 보관 / 정리 작업을 실행하는 주기(초)
+ARCHIVE_INTERVAL = float(os.environ.get("SNS_ARCHIVE_INTERVAL", "3600"))
+# 한 트랜잭션에서 옮기는 최대 포스트 수 (쓰기 잠금을 오래 잡지 않도록 나눠서 옮깁니다)
+ARCHIVE_BATCH_SIZE = int(os.environ.get("SNS_ARCHIVE_BATCH_SIZE", "200"))
+# zlib 압축 수준 1~9
+COMPRESS_LEVEL = int(os.environ.get("SNS_ARCHIVE_COMPRESS_LEVEL", "6"))
+# 압축을 풀어 둔 보관 포스트를 기억하는 수 (워커마다)
+BLOCK_CACHE_SIZE = int(os.environ.get("SNS_ARCHIVE_CACHE_SIZE", "256"))
+# incremental vacuum 한 번에 돌려주는 최대 페이지 수
+VACUUM_PAGES = int(os.environ.get("SNS_ARCHIVE_VACUUM_PAGES", "1000"))
+
+_POST = ", ".join(POST_COLUMNS)
+_COMMENT = ", ".join(COMMENT_COLUMNS)
+
+
+class ArchivedPost(NamedTuple):
+    # posts 와 같은 컬럼 순서의 행
+    row: tuple
+    # comments 와 같은 컬럼 순서의 행, id 순서
+    comments: List[tuple]
+    likes: List[str]
+    # likes 와 같은 순서의 누른 시각
+    liked_at: List[str]
+
+
+def create_archive_tables(conn: sqlite3.Connection) -> None:
+    """
+    보관 표를 만듭니다. 포스트 하나(본문 + 모든 댓글 + 좋아요한 사용자)를 zlib 으로 압축한 블록 하나로
+    저장하고, 목록 / 조회에 필요한 나머지 컬럼은 압축하지 않고 둡니다. commit 은 마이그레이션에서 합니다.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archived_posts (
+      id INTEGER PRIMARY KEY,
+      userName TEXT NOT NULL,
+      createdAt TEXT NOT NULL,
+      updatedAt TEXT NOT NULL,
+      likeCount INTEGER NOT NULL,
+      commentCount INTEGER NOT NULL,
+      archivedAt REAL NOT NULL,
+      rawSize INTEGER NOT NULL,
+      data BLOB NOT NULL
+    )
+    """)
+
+
+def create_archived_user_counts(conn: sqlite3.Connection) -> None:
+    """
+    사용자별로 보관된 포스트 / 댓글 / 좋아요 수를 세어 두는 표를 만들고, 이미 보관된 포스트로 채웁니다.
+    블록을 풀지 않고도 사용자 요약에 보관된 활동을 더할 수 있도록 보관 / 복원 / 삭제할 때 함께 고칩니다.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archived_user_counts (
+      userName TEXT PRIMARY KEY,
+      posts INTEGER NOT NULL DEFAULT 0,
+      comments INTEGER NOT NULL DEFAULT 0,
+      likes INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """)
+    conn.execute("DELETE FROM archived_user_counts")
+    _count_users(conn, list(iter_archived(conn)), 1)
+
+
+def _count_users(conn: sqlite3.Connection, archived: List[ArchivedPost], sign: int) -> None:
+    """archived 의 작성자 / 댓글 작성자 / 좋아요한 사용자 수를 sign(1 또는 -1) 만큼 archived_user_counts 에 더합니다."""
+    posts, comments, likes = Counter(), Counter(), Counter()
+    for post in archived:
+        posts[post.row[1]] += 1
+        comments.update(c[2] for c in post.comments)
+        likes.update(post.likes)
+    users = sorted(set(posts) | set(comments) | set(likes))
+    if not users:
+        return
+    conn.executemany("""
+        INSERT INTO archived_user_counts (userName, posts, comments, likes) VALUES (?, ?, ?, ?)
+        ON CONFLICT (userName) DO UPDATE SET
+          posts = posts + excluded.posts, comments = comments + excluded.comments, likes = likes + excluded.likes
+    """, [(u, sign * posts[u], sign * comments[u], sign * likes[u]) for u in users])
+    if sign < 0:
+        placeholders = ",".join("?" * len(users))
+        conn.execute(f"DELETE FROM archived_user_counts WHERE userName IN ({placeholders}) "
+                     "AND posts = 0 AND comments = 0 AND likes = 0", users)
+
+
+def pack(content: str, comments: Iterable[tuple], likes: Iterable[str], liked_at: Iterable[str]) -> Tuple[bytes, int]:
+    """(압축한 블록, 압축 전 크기)"""
+    raw = json.dumps({"content": content, "comments": [list(c) for c in comments], "likes": list(likes),
+                      "likedAt": list(liked_at)}, ensure_ascii=False, separators=(",", ":")).encode()
+    return zlib.compress(raw, COMPRESS_LEVEL), len(raw)
+
+
+def _unpack(meta: tuple, data: bytes) -> ArchivedPost:
+    # meta: (id, userName, createdAt, updatedAt, likeCount, commentCount)
+    block = json.loads(zlib.decompress(data))
+    post_id, user_name, created_at, updated_at, like_count, comment_count = meta
+    row = (post_id, user_name, block["content"], created_at, updated_at, like_count, comment_count)
+    # likedAt 이 없는 예전 블록은 마이그레이션 11 처럼 포스트의 마지막 변경 시각으로 봅니다.
+    liked_at = block.get("likedAt") or [updated_at] * len(block["likes"])
+    return ArchivedPost(row, [tuple(c) for c in block["comments"]], block["likes"], liked_at)
+
+
+# ------------------------------------------------
+# 압축 해제 캐시
+# ------------------------------------------------
+class BlockCache:
+    """
+    압축을 푼 보관 포스트를 (id, archivedAt) 로 기억하는 작은 LRU.
+    보관된 내용은 바뀌지 않으므로 조회 쿼리가 돌려준 archivedAt 이 같으면 그대로 씁니다.
+    (삭제되었거나 복원 후 다시 보관되었다면 쿼리 결과가 달라지므로 다른 워커의 변경도 따라갑니다)
+    """
+
+    def __init__(self, max_entries: int = BLOCK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, ArchivedPost]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def archived_at(self, post_id: int) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(post_id)
+            return entry[0] if entry is not None else None
+
+    def get(self, post_id: int, archived_at: float) -> Optional[ArchivedPost]:
+        with self._lock:
+            entry = self._entries.get(post_id)
+            if entry is None or entry[0] != archived_at:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(post_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, post_id: int, archived_at: float, archived: ArchivedPost) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[post_id] = (archived_at, archived)
+            self._entries.move_to_end(post_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, post_id: int) -> None:
+        with self._lock:
+            self._entries.pop(post_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+block_cache = BlockCache()
+
+
+# ------------------------------------------------
+# 조회
+# ------------------------------------------------
+# 포스트가 posts 에 있는지와 보관 블록을 한 쿼리로 읽습니다.
+# 압축을 푼 블록이 캐시에 있으면(archivedAt 이 같으면) 블록은 읽지 않습니다.
+_LOOKUP = """
+    SELECT EXISTS (SELECT 1 FROM posts WHERE id = :id),
+           a.id, a.userName, a.createdAt, a.updatedAt, a.likeCount, a.commentCount, a.archivedAt,
+           CASE WHEN a.archivedAt IS :cached THEN NULL ELSE a.data END
+    FROM (SELECT 1) LEFT JOIN archived_posts a ON a.id = :id
+"""
+
+
+def lookup(conn: sqlite3.Connection, post_id: int, cache: BlockCache = block_cache) -> Tuple[bool, Optional[ArchivedPost]]:
+    """(posts 에 있는지, 보관된 포스트) 를 돌려줍니다. 둘 다 아니면 (False, None) 입니다."""
+    row = conn.execute(_LOOKUP, {"id": post_id, "cached": cache.archived_at(post_id)}).fetchone()
+    hot, meta, archived_at, data = bool(row[0]), row[1:7], row[7], row[8]
+    if archived_at is None:
+        return hot, None
+    if data is None:
+        archived = cache.get(post_id, archived_at)
+        if archived is not None:
+            return hot, archived
+        # 캐시를 확인한 사이에 밀려났으면 블록만 다시 읽습니다.
+        data = conn.execute("SELECT data FROM archived_posts WHERE id = ?", (post_id,)).fetchone()[0]
+    archived = _unpack(meta, data)
+    cache.put(post_id, archived_at, archived)
+    return hot, archived
+
+
+def find(conn: sqlite3.Connection, post_id: int) -> Optional[ArchivedPost]:
+    return lookup(conn, post_id)[1]
+
+
+def archived_ids(conn: sqlite3.Connection, post_ids: List[int]) -> Set[int]:
+    """post_ids 중 보관된 포스트의 id (블록은 읽지 않음)"""
+    if not post_ids:
+        return set()
+    placeholders = ",".join("?" * len(post_ids))
+    return {row[0] for row in conn.execute(f"SELECT id FROM archived_posts WHERE id IN ({placeholders})", post_ids)}
+
+
+def comment_page(archived: ArchivedPost, limit: int, before_id: Optional[int] = None,
+                 columns: Optional[Tuple[str, ...]] = None) -> List[tuple]:
+    """repository.list_comments 와 같은 순서(id DESC)와 모양으로 보관된 댓글을 limit 개 돌려줍니다."""
+    rows = [c for c in reversed(archived.comments) if before_id is None or c[0] < before_id][:limit]
+    if columns is None:
+        return rows
+    indexes = [COMMENT_COLUMNS.index(column) for column in columns]
+    return [tuple(row[i] for i in indexes) for row in rows]
+
+
+def iter_archived(conn: sqlite3.Connection) -> Iterator[ArchivedPost]:
+    """보관된 포스트를 id 순서로 하나씩 풀어서 돌려줍니다. (내보내기용, 캐시는 쓰지 않음)"""
+    for row in conn.execute("SELECT id, userName, createdAt, updatedAt, likeCount, commentCount, data "
+                            "FROM archived_posts ORDER BY id"):
+        yield _unpack(row[:6], row[6])
+
+
+# ------------------------------------------------
+# 보관 / 복원 / 삭제 (writer 커넥션에서 호출)
+# ------------------------------------------------
+def archive_batch(conn: sqlite3.Connection, cutoff: str, after_id: int,
+                  batch_size: int = ARCHIVE_BATCH_SIZE) -> Tuple[List[int], int, bool]:
+    """
+    id 순서로 after_id 다음부터 batch_size 개를 살펴, cutoff 보다 먼저 작성되고 그 뒤로 바뀌지 않은
+    포스트를 보관 표로 옮깁니다. (옮긴 id, 다음에 이어서 볼 id, 끝났는지) 를 돌려줍니다.
+    id 는 대체로 작성 순서이므로 cutoff 이후에 작성된 포스트를 만나면 끝난 것으로 봅니다.
+    """
+    # 여러 워커가 동시에 실행해도 같은 포스트를 두 번 옮기지 않도록 처음부터 쓰기 잠금을 잡습니다.
+    conn.execute("BEGIN IMMEDIATE")
+    rows = conn.execute(f"SELECT {_POST} FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                        (after_id, batch_size)).fetchall()
+    done = len(rows) < batch_size
+    candidates = []
+    for row in rows:
+        if row[3] >= cutoff:
+            done = True
+            break
+        after_id = row[0]
+        # 최근에 댓글 / 좋아요 / 수정이 있었던 포스트는 아직 보관하지 않습니다.
+        if row[4] < cutoff:
+            candidates.append(row)
+    if not candidates:
+        return [], after_id, done
+
+    ids = [row[0] for row in candidates]
+    placeholders = ",".join("?" * len(ids))
+    comments = {}
+    for row in conn.execute(f"SELECT {_COMMENT} FROM comments WHERE postId IN ({placeholders}) ORDER BY postId, id", ids):
+        comments.setdefault(row[1], []).append(row)
+    likes, liked_at = {}, {}
+    for post_id, user_name, at in conn.execute(
+            f"SELECT postId, userName, likedAt FROM likes WHERE postId IN ({placeholders}) ORDER BY postId, userName", ids):
+        likes.setdefault(post_id, []).append(user_name)
+        liked_at.setdefault(post_id, []).append(at)
+
+    now = time.time()
+    params = []
+    moved = []
+    for post_id, user_name, content, created_at, updated_at, _, comment_count in candidates:
+        archived = ArchivedPost((post_id, user_name), comments.get(post_id, []), likes.get(post_id, []),
+                                liked_at.get(post_id, []))
+        data, raw_size = pack(content, archived.comments, archived.likes, archived.liked_at)
+        moved.append(archived)
+        # 여러 워커로 실행하면 likeCount 는 다른 워커가 아직 다시 세지 않았을 수 있으므로 옮기는 좋아요 수를 씁니다.
+        like_count = len(likes.get(post_id, []))
+        params.append((post_id, user_name, created_at, updated_at, like_count, comment_count, now, raw_size, data))
+    conn.executemany("""
+        INSERT INTO archived_posts (id, userName, createdAt, updatedAt, likeCount, commentCount, archivedAt, rawSize, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, params)
+    _count_users(conn, moved, 1)
+    # 댓글 / 좋아요 / 검색 색인 / 인기 점수는 ON DELETE CASCADE 와 트리거로 함께 지워집니다.
+    conn.execute(f"DELETE FROM posts WHERE id IN ({placeholders})", ids)
+    return ids, after_id, done
+
+
+def restore(conn: sqlite3.Connection, post_id: int) -> bool:
+    """보관된 포스트를 posts / comments / likes 로 되돌립니다. 보관된 포스트가 아니면 False."""
+    row = conn.execute("SELECT id, userName, createdAt, updatedAt, likeCount, commentCount, data "
+                       "FROM archived_posts WHERE id = ?", (post_id,)).fetchone()
+    if row is None:
+        return False
+    archived = _unpack(row[:6], row[6])
+    conn.execute(f"INSERT INTO posts ({_POST}) VALUES (?, ?, ?, ?, ?, ?, ?)", archived.row)
+    conn.executemany(f"INSERT INTO comments ({_COMMENT}) VALUES (?, ?, ?, ?, ?, ?)", archived.comments)
+    # 좋아요는 원래 누른 시각으로 되돌려야 인기 점수에 지금 누른 것처럼 더해지지 않습니다.
+    conn.executemany("INSERT INTO likes (postId, userName, likedAt) VALUES (?, ?, ?)",
+                     [(post_id, u, at) for u, at in zip(archived.likes, archived.liked_at)])
+    conn.execute("DELETE FROM archived_posts WHERE id = ?", (post_id,))
+    _count_users(conn, [archived], -1)
+    block_cache.discard(post_id)
+    return True
+
+
+def delete(conn: sqlite3.Connection, post_id: int) -> bool:
+    row = conn.execute("DELETE FROM archived_posts WHERE id = ? "
+                       "RETURNING id, userName, createdAt, updatedAt, likeCount, commentCount, data", (post_id,)).fetchone()
+    block_cache.discard(post_id)
+    if row is None:
+        return False
+    _count_users(conn, [_unpack(row[:6], row[6])], -1)
+    return True
+
+
+# ------------------------------------------------
+# 빈 페이지 정리 (VACUUM)
+# ------------------------------------------------
+def incremental_vacuum(conn: sqlite3.Connection, pages: int = VACUUM_PAGES) -> Optional[int]:
+    """
+    빈 페이지를 최대 pages 개 파일에서 돌려주고 남은 빈 페이지 수를 돌려줍니다.
+    auto_vacuum=INCREMENTAL 이 아닌 (이 기능 이전에 만든) 데이터베이스면 None 입니다.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return None
+    # execute 는 이 PRAGMA 를 한 단계만 실행하므로 끝까지 실행하는 executescript 를 씁니다.
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def full_vacuum(path: str) -> None:
+    """데이터베이스 전체를 다시 쓰며 auto_vacuum=INCREMENTAL 로 바꿉니다. (서버를 멈춘 뒤 실행)"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+# ------------------------------------------------
+# 백그라운드 보관 / 정리 작업
+# ------------------------------------------------
+class Compactor:
+    """
+    ARCHIVE_INTERVAL 마다 모든 샤드에서 오래된 포스트를 보관 표로 옮기고 (ARCHIVE_BATCH_SIZE 개씩 한 트랜잭션)
+    비워진 페이지를 incremental vacuum 으로 파일에서 돌려줍니다. 진행 상황은 progress 로 볼 수 있습니다.
+    """
+
+    def __init__(self, after_days: float = ARCHIVE_AFTER_DAYS, interval: float = ARCHIVE_INTERVAL,
+                 batch_size: int = ARCHIVE_BATCH_SIZE):
+        self.after_days = after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self._storage: Optional["ShardedStorage"] = None
+        self._before_batch: Optional[Callable[[], None]] = None
+        self._on_archive: Optional[Callable[[List[int]], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.runs = 0
+        self.archived_posts = 0
+        self.progress: dict = {"phase": "idle"}
+
+    @property
+    def enabled(self) -> bool:
+        return self.after_days > 0
+
+    def start(self, storage: "ShardedStorage", before_batch: Optional[Callable[[], None]] = None,
+              on_archive: Optional[Callable[[List[int]], None]] = None, background: bool = True) -> None:
+        """
+        before_batch 는 옮기기 전에 호출됩니다. (아직 반영되지 않은 좋아요를 먼저 반영하도록)
+        on_archive(ids) 는 옮긴 뒤에 호출됩니다. (읽기 캐시 정리)
+        """
+        self._storage = storage
+        self._before_batch = before_batch
+        self._on_archive = on_archive
+        if background and self.enabled and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="archive-compactor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception:
+                # 옮긴 배치는 이미 commit 되었으므로 다음 주기에 이어서 진행합니다.
+                logger.exception("오래된 포스트를 보관하지 못했습니다.")
+                self.progress = {**self.progress, "phase": "failed"}
+
+    def run(self, log: Callable[[str], None] = logger.info) -> int:
+        """한 번 실행하고 옮긴 포스트 수를 돌려줍니다."""
+        with self._lock:
+            cutoff = (datetime.datetime.now() - datetime.timedelta(days=self.after_days)).strftime('%Y-%m-%d %H:%M:%S')
+            started = time.time()
+            total = 0
+            freed = 0
+            for index, shard in enumerate(self._storage.shards):
+                after_id, done = 0, False
+                while not done and not self._stop.is_set():
+                    if self._before_batch is not None:
+                        self._before_batch()
+                    with shard.pool.writer() as conn:
+                        ids, after_id, done = archive_batch(conn, cutoff, after_id, self.batch_size)
+                    if ids:
+                        total += len(ids)
+                        self.archived_posts += len(ids)
+                        if self._on_archive is not None:
+                            self._on_archive(ids)
+                    self._report(log, "archive", index, total, freed, started, f"~{after_id}")
+
+                # 비워진 페이지를 조금씩 파일에서 돌려줍니다. (한 번에 잡는 쓰기 잠금을 짧게)
+                while not self._stop.is_set():
+                    with shard.pool.writer() as conn:
+                        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                        remaining = incremental_vacuum(conn)
+                    if remaining is None:
+                        log(f"샤드 {index}: auto_vacuum 이 꺼진 데이터베이스라서 파일 크기는 줄지 않습니다. "
+                            f"서버를 멈추고 python archive.py vacuum --full 을 한 번 실행하세요.")
+                        break
+                    freed += before - remaining
+                    self._report(log, "vacuum", index, total, freed, started, f"빈 페이지 {remaining}개 남음")
+                    if remaining == 0 or before == remaining:
+                        break
+            self.runs += 1
+            self.progress = {"phase": "idle", "archivedPosts": total, "freedPages": freed,
+                             "startedAt": started, "finishedAt": time.time()}
+            return total
+
+    def _report(self, log: Callable[[str], None], phase: str, shard: int, archived: int, freed: int,
+                started: float, detail: str) -> None:
+        self.progress = {"phase": phase, "shard": shard, "archivedPosts": archived, "freedPages": freed,
+                         "startedAt": started}
+        log(f"[{phase}] 샤드 {shard}: 보관 {archived}개, 정리한 페이지 {freed}개 ({detail})")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "afterDays": self.after_days,
+            "runs": self.runs,
+            "archivedPosts": self.archived_posts,
+            "progress": self.progress,
+            "cache": block_cache.stats(),
+        }
+
+
+compactor = Compactor()
+
+
+# ------------------------------------------------
+# CLI (python archive.py status|run|restore|vacuum)
+# ------------------------------------------------
+def _parse_args(argv=None) -> argparse.Namespace:
+    from db import DB_PATH
+
+    parser = argparse.ArgumentParser(prog="python archive.py", description="Simple SNS 오래된 포스트 보관")
+    parser.add_argument("--db", default=DB_PATH, help=f"데이터베이스 파일 경로 (기본: {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="샤드별 포스트 / 보관 포스트 수와 압축률을 보여줍니다.")
+    run = sub.add_parser("run", help="오래된 포스트를 지금 보관하고 빈 페이지를 정리합니다.")
+    run.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS or None, required=not ARCHIVE_AFTER_DAYS,
+                     help="작성 후 이 일수가 지난 포스트를 보관 (기본: SNS_ARCHIVE_AFTER_DAYS)")
+    restore_cmd = sub.add_parser("restore", help="보관된 포스트를 다시 일반 포스트로 되돌립니다.")
+    restore_cmd.add_argument("--post", type=int, required=True, help="포스트 ID")
+    vacuum = sub.add_parser("vacuum", help="빈 페이지를 파일에서 돌려줍니다.")
+    vacuum.add_argument("--full", action="store_true",
+                        help="VACUUM 으로 전체를 다시 쓰며 incremental vacuum 을 켭니다. (서버를 멈춘 뒤 실행)")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None) -> int:
+    from storage import ShardedStorage, read_shard_count, shard_paths
+
+    args = _parse_args(argv)
+    if args.command == "vacuum" and args.full:
+        for path in shard_paths(args.db, read_shard_count(args.db)):
+            before = os.path.getsize(path)
+            full_vacuum(path)
+            print(f"{path}: {before} -> {os.path.getsize(path)} byte")
+        return 0
+
+    storage = ShardedStorage(args.db, read_shard_count(args.db))
+    storage.open()
+    try:
+        if args.command == "status":
+            for shard in storage.shards:
+                with shard.pool.reader() as conn:
+                    posts = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+                    archived, raw, packed = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(rawSize), 0), COALESCE(SUM(length(data)), 0) FROM archived_posts"
+                    ).fetchone()
+                    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                ratio = f"{packed / raw:.0%}" if raw else "-"
+                print(f"{shard.index:>4}  {shard.path}  포스트 {posts}  보관 {archived} "
+                      f"(압축 {packed}/{raw} byte, {ratio})  빈 페이지 {free}")
+        elif args.command == "run":
+            runner = Compactor(after_days=args.days, interval=0)
+            runner.start(storage, background=False)
+            print(f"보관한 포스트 {runner.run(log=print)}개")
+        elif args.command == "restore":
+            shard = storage.for_post(args.post)
+            with shard.pool.writer() as conn:
+                if not restore(conn, args.post):
+                    print(f"보관된 포스트 {args.post} 가 없습니다.", file=sys.stderr)
+                    return 1
+            print(f"포스트 {args.post} 를 되돌렸습니다.")
+        elif args.command == "vacuum":
+            for shard in storage.shards:
+                with shard.pool.writer() as conn:
+                    remaining = incremental_vacuum(conn, pages=2 ** 31 - 1)
+                print(f"샤드 {shard.index}: " + ("auto_vacuum 이 꺼져 있습니다. --full 로 실행하세요."
+                                                 if remaining is None else f"빈 페이지 {remaining}개 남음"))
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,10 @@
+"""
+Simple SNS API 부하 테스트 / 벤치마크 도구.
+
+합성 데이터를 넣은 뒤 openapi.yaml 의 각 operation 을 동시성 단계별로 호출하고
+operation 별 처리량(req/s)과 p50/p95/p99 지연 시간을 측정합니다.
+
+    python -m bench run --target inprocess --concurrency 1,8,32 --output results.json
+    python -m bench compare before.json after.json
+    python -m bench serialize --sizes 1,20,100
+"""
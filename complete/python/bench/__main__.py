@@ -0,0 +1,206 @@
+import argparse
+import datetime
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from . import budget, report, serialize
+from .client import HttpClient
+from .operations import OPERATIONS, openapi_operation_ids
+from .runner import APP_DIR, InProcessServer, RemoteServer, UvicornProcess, run_operation
+from .seed import SeedConfig, seed_database, seed_via_api
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Simple SNS API 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="데이터를 만들고 벤치마크를 실행합니다.")
+    run.add_argument("--target", choices=["inprocess", "uvicorn", "url"], default="inprocess",
+                     help="inprocess: 같은 프로세스에서 uvicorn 실행, uvicorn: 별도 프로세스, url: 실행 중인 서버")
+    run.add_argument("--url", default="http://127.0.0.1:8000", help="--target url 일 때 서버 주소")
+    run.add_argument("--port", type=int, default=8765, help="inprocess / uvicorn 서버 포트")
+    run.add_argument("--workers", type=int, default=1, help="--target uvicorn 일 때 워커 프로세스 수 (launcher.py)")
+    run.add_argument("--db", help="데이터베이스 파일 경로 (기본: 임시 파일)")
+    run.add_argument("--handler-mode", choices=["sync", "async"],
+                     help="핸들러 실행 방식 SNS_HANDLER_MODE (기본: 환경 변수, 없으면 sync)")
+
+    run.add_argument("--posts", type=int, default=SeedConfig.posts)
+    run.add_argument("--comments-per-post", type=int, default=SeedConfig.comments_per_post)
+    run.add_argument("--likes", type=int, default=SeedConfig.likes)
+    run.add_argument("--users", type=int, default=SeedConfig.users)
+    run.add_argument("--like-skew", type=float, default=SeedConfig.like_skew, help="좋아요 Zipf 지수 (0 이면 균등)")
+    run.add_argument("--seed", type=int, default=SeedConfig.seed)
+
+    run.add_argument("--operations", default="", help="측정할 operationId 목록 (쉼표 구분, 기본: 전체)")
+    run.add_argument("--concurrency", type=_int_list, default=[1, 4, 16], help="동시성 단계 (예: 1,4,16,64)")
+    run.add_argument("--requests", type=int, default=500, help="operation / 동시성 단계별 최대 요청 수")
+    run.add_argument("--duration", type=float, default=10, help="operation / 동시성 단계별 최대 시간(초)")
+    run.add_argument("--warmup", type=int, default=5, help="스레드별 워밍업 요청 수 (측정 제외)")
+    run.add_argument("--output", help="결과 JSON 파일 경로")
+
+    bud = sub.add_parser("budget", help="operationId 별 요청당 SQL 수가 예산을 넘지 않는지 확인합니다.")
+    bud.add_argument("--port", type=int, default=8765, help="inprocess 서버 포트")
+    bud.add_argument("--posts", type=int, default=200)
+    bud.add_argument("--requests", type=int, default=20, help="operation 별 요청 수")
+    bud.add_argument("--operations", default="", help="확인할 operationId 목록 (쉼표 구분, 기본: 전체)")
+    bud.add_argument("--seed", type=int, default=SeedConfig.seed)
+    bud.add_argument("--handler-mode", choices=["sync", "async"], help="핸들러 실행 방식 SNS_HANDLER_MODE")
+
+    ser = sub.add_parser("serialize", help="응답 모델 경로와 JSON 조각 빠른 경로의 직렬화 시간을 비교합니다.")
+    ser.add_argument("--sizes", type=_int_list, default=[1, 20, 100], help="응답 하나의 항목 수 (쉼표 구분)")
+    ser.add_argument("--iterations", type=int, default=2000, help="경로 / 항목 수별 반복 횟수")
+    ser.add_argument("--seed", type=int, default=SeedConfig.seed)
+
+    cmp = sub.add_parser("compare", help="두 결과 JSON 을 비교합니다.")
+    cmp.add_argument("base")
+    cmp.add_argument("new")
+    return parser.parse_args(argv)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _run(args: argparse.Namespace) -> int:
+    operation_ids = [o for o in args.operations.split(",") if o] or list(OPERATIONS)
+    unknown = [o for o in operation_ids if o not in OPERATIONS]
+    if unknown:
+        print(f"알 수 없는 operationId: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    missing = [o for o in openapi_operation_ids() if o not in OPERATIONS]
+    if missing:
+        print(f"경고: 벤치마크가 없는 operationId: {', '.join(missing)}", file=sys.stderr)
+
+    if args.handler_mode:
+        # uvicorn 대상은 이 환경 변수를 물려받은 launcher.py 프로세스에서 적용됩니다.
+        os.environ["SNS_HANDLER_MODE"] = args.handler_mode
+    config = SeedConfig(posts=args.posts, comments_per_post=args.comments_per_post, likes=args.likes,
+                        users=args.users, like_skew=args.like_skew, seed=args.seed)
+
+    seed_via_server = args.target == "url"
+    if args.target == "url":
+        server = RemoteServer(args.url)
+    else:
+        db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="sns-bench-"), "sns.db")
+        # 앱 설정은 import 시점에 환경 변수에서 읽으므로 main 을 import 하기 전에 지정합니다.
+        os.environ["SNS_DB_PATH"] = db_path
+        import main
+        import storage
+
+        # 샤드가 여럿이면 파일마다 id 를 나눠야 하므로 서버를 띄운 뒤 API 로 시드 데이터를 만듭니다.
+        seed_via_server = storage.SHARD_COUNT > 1
+        if not seed_via_server:
+            conn = sqlite3.connect(db_path)
+            main.init_schema(conn)
+            print(f"시드 데이터 생성: {db_path}", file=sys.stderr)
+            dataset = seed_database(conn, config)
+            conn.close()
+        if args.target == "inprocess":
+            server = InProcessServer(port=args.port)
+        else:
+            server = UvicornProcess(db_path, port=args.port, workers=args.workers)
+
+    rows = []
+    with server:
+        if seed_via_server:
+            print(f"시드 데이터 생성: {server.base_url}", file=sys.stderr)
+            dataset = seed_via_api(HttpClient(server.base_url), config)
+        for operation_id in operation_ids:
+            for concurrency in args.concurrency:
+                result = run_operation(server.base_url, operation_id, OPERATIONS[operation_id], dataset,
+                                       concurrency, args.requests, args.duration, args.warmup, args.seed)
+                row = report.summarize(result)
+                rows.append(row)
+                print(f"{operation_id} x{concurrency}: {row['throughputRps']} req/s, "
+                      f"p99 {row['p99Ms']} ms, errors {row['errors']}", file=sys.stderr)
+
+    report.print_table(rows)
+    if args.output:
+        meta = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "gitCommit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "target": args.target,
+            "workers": args.workers if args.target == "uvicorn" else None,
+            "handlerMode": os.environ.get("SNS_HANDLER_MODE", "sync") if args.target != "url" else None,
+            "fastJson": os.environ.get("SNS_FAST_JSON", "1") != "0" if args.target != "url" else None,
+            "seed": vars(config),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "warmup": args.warmup,
+        }
+        report.write_json(args.output, meta, rows)
+        print(f"결과 저장: {args.output}", file=sys.stderr)
+    return 1 if any(r["errors"] for r in rows) else 0
+
+
+def _budget(args: argparse.Namespace) -> int:
+    operation_ids = [o for o in args.operations.split(",") if o] or list(OPERATIONS)
+    unknown = [o for o in operation_ids if o not in OPERATIONS]
+    if unknown:
+        print(f"알 수 없는 operationId: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    # 캐시 적중으로 SQL 수가 줄어들지 않도록 읽기 캐시를 끄고 임시 DB 를 씁니다.
+    os.environ["SNS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="sns-budget-"), "sns.db")
+    os.environ["SNS_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["SNS_METRICS_ENABLED"] = "1"
+    # 예산은 단일 샤드 기준입니다.
+    os.environ["SNS_DB_SHARDS"] = "1"
+    if args.handler_mode:
+        os.environ["SNS_HANDLER_MODE"] = args.handler_mode
+    import main
+
+    conn = sqlite3.connect(os.environ["SNS_DB_PATH"])
+    main.init_schema(conn)
+    config = SeedConfig(posts=args.posts, likes=args.posts * 10, users=100, seed=args.seed)
+    dataset = seed_database(conn, config)
+    conn.close()
+
+    with InProcessServer(port=args.port) as server:
+        counts = budget.measure(server.base_url, dataset, operation_ids, args.requests, args.seed)
+
+    rows, ok = budget.check(counts)
+    budget.print_table(rows)
+    # 예산을 넘었거나 예산이 없는 operation 이 있으면 실패 (CI 에서 사용)
+    return 0 if ok else 1
+
+
+def _serialize(args: argparse.Namespace) -> int:
+    # main 을 import 하기만 하고 서버는 띄우지 않지만, 설정을 읽는 모듈이 있으므로 임시 DB 를 지정합니다.
+    os.environ["SNS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="sns-serialize-"), "sns.db")
+    rows = serialize.measure(args.sizes, args.iterations, args.seed)
+    serialize.print_table(rows)
+    # 두 경로의 결과가 다르면 실패 (CI 에서 사용)
+    return 0 if all(row[-1] for row in rows) else 1
+
+
+def cli(argv=None) -> int:
+    args = _parse_args(argv)
+    if args.command == "compare":
+        report.print_comparison(report.compare(args.base, args.new))
+        return 0
+    if args.command == "budget":
+        return _budget(args)
+    if args.command == "serialize":
+        return _serialize(args)
+    return _run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional, Tuple
+
+from .operations import OPERATIONS
+from .runner import run_operation
+from .seed import Dataset
+
+# ------------------------------------------------
+# operationId 별 요청당 최대 SQL 수 (쿼리 수 예산)
+#
+# 핸들러가 실행한 SQL 만 셉니다. (writer 스레드의 BEGIN / SAVEPOINT / COMMIT,
+# 좋아요 반영 스레드는 제외) 읽기 캐시는 끄고 측정하므로 캐시 미스 기준 값입니다.
+# 쿼리를 늘리는 변경이라면 이유를 남기고 예산도 함께 고칩니다.
+# ------------------------------------------------
+BUDGETS: Dict[str, int] = {
+    "getPosts": 1,
+    "createPost": 1,
+    "getPost": 1,
+    "updatePost": 1,
+    "deletePost": 1,
+    # 빈 페이지일 때만 포스트 존재 확인
+    "getComments": 2,
+    "createComment": 2,
+    # 댓글이 없을 때만 포스트 존재 확인 (404 메시지 구분)
+    "getComment": 2,
+    "updateComment": 2,
+    "deleteComment": 2,
+    "likePost": 1,
+    "unlikePost": 1,
+    "createPostsBatch": 2,
+    "createCommentsBatch": 3,
+    # 존재 확인 2 + 응답 전 반영(추가 / 삭제 / likeCount 갱신 각 1, 대기 중인 좋아요가 500건 이하일 때)
+    "likePostsBatch": 5,
+    # 포스트 목록 / 포스트별 최신 댓글 / 보는 사람의 좋아요 여부 각 1 (페이지 크기와 무관)
+    "getFeed": 3,
+    # 점수 색인에서 상위 N 개 (점수는 좋아요 / 댓글 트리거가 갱신하므로 쓰기 쪽 SQL 수도 그대로)
+    "getTrending": 1,
+    "search": 1,
+    # 사용자별 목록은 (userName, id) 색인에서 샤드마다 쿼리 하나
+    "getUserPosts": 1,
+    "getUserComments": 1,
+    # 반영 대기 중인 좋아요한 포스트가 있을 때만 그 포스트를 따로 읽습니다.
+    "getUserLikes": 2,
+    # 요약이 캐시에 없을 때 세 개수를 쿼리 하나로 셉니다.
+    "getUserSummary": 1,
+    # 스트리밍 본문은 핸들러가 돌려준 뒤에 읽으므로 핸들러 안의 SQL 은 없습니다.
+    "exportData": 0,
+    # 벤치마크 입력(가져오기 배치 하나) 기준: 포스트 / 댓글 / 좋아요 각 1
+    "importData": 3,
+    # 이벤트 구독은 DB 를 읽지 않습니다.
+    "streamEvents": 0,
+}
+
+
+def measure(base_url: str, dataset: Dataset, operation_ids: List[str], requests: int,
+            seed: int) -> Dict[str, Tuple[int, int]]:
+    """
+    operation 마다 requests 번 차례로 호출하고 {operationId: (요청 수, 요청당 최대 SQL 수)} 를 돌려줍니다.
+    같은 프로세스의 앱(InProcessServer)을 대상으로만 쓸 수 있습니다.
+    """
+    from metrics import metrics
+
+    counts = {}
+    for operation_id in operation_ids:
+        metrics.reset()
+        result = run_operation(base_url, operation_id, OPERATIONS[operation_id], dataset,
+                               concurrency=1, requests=requests, duration=3600, warmup=0, seed=seed)
+        if result.errors:
+            raise RuntimeError(f"{operation_id}: 기대하지 않은 응답 {result.error_samples}")
+        # 준비 요청(setup)은 다른 operationId 로 집계되므로 해당 operation 만 봅니다.
+        counts[operation_id] = metrics.statement_counts().get(operation_id, (0, 0))
+    return counts
+
+
+def check(counts: Dict[str, Tuple[int, int]]) -> Tuple[List[Tuple[str, int, int, Optional[int]]], bool]:
+    """(operationId, 요청 수, 최대 SQL 수, 예산) 목록과 모두 예산 안인지 여부"""
+    rows = []
+    ok = True
+    for operation_id, (requests, max_statements) in counts.items():
+        budget = BUDGETS.get(operation_id)
+        if budget is None or requests == 0 or max_statements > budget:
+            ok = False
+        rows.append((operation_id, requests, max_statements, budget))
+    return rows, ok
+
+
+def print_table(rows: List[Tuple[str, int, int, Optional[int]]]) -> None:
+    print(f"{'operationId':<24}{'requests':>10}{'max SQL':>10}{'budget':>10}  result")
+    for operation_id, requests, max_statements, budget in rows:
+        if budget is None:
+            result = "예산 없음"
+        elif requests == 0:
+            result = "측정 안 됨"
+        elif max_statements > budget:
+            result = "초과"
+        else:
+            result = "ok"
+        print(f"{operation_id:<24}{requests:>10}{max_statements:>10}{budget if budget is not None else '-':>10}  {result}")
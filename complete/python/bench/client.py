@@ -0,0 +1,54 @@
+import http.client
+import json
+from typing import Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class HttpClient:
+    """
+    keep-alive 를 사용하는 아주 작은 HTTP 클라이언트. (스레드마다 하나씩 사용)
+    벤치마크 측정값에 클라이언트 라이브러리 비용이 섞이지 않도록 표준 라이브러리만 씁니다.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def request(self, method: str, path: str, body: Any = None, headers: Optional[dict] = None) -> Tuple[int, bytes]:
+        payload = None
+        all_headers = dict(headers or {})
+        if isinstance(body, bytes):
+            # NDJSON 처럼 이미 만들어진 본문은 그대로 보냅니다.
+            payload = body
+            all_headers.setdefault("Content-Type", "application/x-ndjson")
+        elif body is not None:
+            payload = json.dumps(body).encode()
+            all_headers["Content-Type"] = "application/json"
+        # 서버가 keep-alive 연결을 닫았으면 한 번만 다시 연결합니다.
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=payload, headers=all_headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if attempt == 2:
+                    raise
+
+    def json(self, method: str, path: str, body: Any = None) -> Tuple[int, Any]:
+        status, data = self.request(method, path, body)
+        return status, (json.loads(data) if data else None)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,249 @@
+import json
+import os
+import random
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from .client import HttpClient
+from .seed import Dataset, WORDS
+
+OPENAPI_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "openapi.yaml")
+
+# 일괄 API 한 번에 보내는 항목 수
+BATCH_SIZE = 50
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    body: Any = None
+    expected: Tuple[int, ...] = (200,)
+
+
+class WorkerState:
+    """벤치마크 스레드 하나의 상태. 측정하지 않는 준비 요청도 이 클라이언트로 보냅니다."""
+
+    def __init__(self, client: HttpClient, dataset: Dataset, run_tag: str, worker_id: int, seed: int):
+        self.client = client
+        self.dataset = dataset
+        self.run_tag = run_tag
+        self.worker_id = worker_id
+        self.rng = random.Random(seed * 1000 + worker_id)
+        self._seq = 0
+
+    def next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def unique_user(self) -> str:
+        # 실행마다 다른 이름을 써야 좋아요가 이전 실행과 겹치지 않습니다.
+        return f"bench-{self.run_tag}-w{self.worker_id}-{self.next_seq()}"
+
+    def post_id(self) -> int:
+        # 절반은 인기 글, 절반은 전체에서 고르게
+        if self.rng.random() < 0.5:
+            return self.rng.choice(self.dataset.hot_post_ids)
+        return self.rng.choice(self.dataset.post_ids)
+
+    def comment(self) -> Tuple[int, int]:
+        return self.rng.choice(self.dataset.comments)
+
+    def text(self) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(5, 30)))
+
+    def setup(self, method: str, path: str, body: Any = None) -> Any:
+        status, data = self.client.json(method, path, body)
+        if status >= 300:
+            raise RuntimeError(f"준비 요청 실패: {method} {path} -> {status}")
+        return data
+
+
+OPERATIONS: Dict[str, Callable[[WorkerState], Call]] = {}
+
+
+def operation(operation_id: str):
+    def register(fn: Callable[[WorkerState], Call]):
+        OPERATIONS[operation_id] = fn
+        return fn
+    return register
+
+
+# ------------------------------------------------
+# 포스트
+# ------------------------------------------------
+@operation("getPosts")
+def get_posts(w: WorkerState) -> Call:
+    return Call("GET", "/api/posts?limit=20")
+
+
+@operation("createPost")
+def create_post(w: WorkerState) -> Call:
+    return Call("POST", "/api/posts", {"userName": w.unique_user(), "content": w.text()}, (201,))
+
+
+@operation("getPost")
+def get_post(w: WorkerState) -> Call:
+    return Call("GET", f"/api/posts/{w.post_id()}")
+
+
+@operation("updatePost")
+def update_post(w: WorkerState) -> Call:
+    return Call("PATCH", f"/api/posts/{w.rng.choice(w.dataset.post_ids)}", {"content": w.text()})
+
+
+@operation("deletePost")
+def delete_post(w: WorkerState) -> Call:
+    # 시드 데이터는 지우지 않도록 먼저 지울 글을 만듭니다. (측정 제외)
+    post = w.setup("POST", "/api/posts", {"userName": w.unique_user(), "content": w.text()})
+    return Call("DELETE", f"/api/posts/{post['id']}", expected=(204,))
+
+
+# ------------------------------------------------
+# 댓글
+# ------------------------------------------------
+@operation("getComments")
+def get_comments(w: WorkerState) -> Call:
+    return Call("GET", f"/api/posts/{w.post_id()}/comments?limit=20")
+
+
+@operation("createComment")
+def create_comment(w: WorkerState) -> Call:
+    return Call("POST", f"/api/posts/{w.post_id()}/comments",
+                {"userName": w.unique_user(), "content": w.text()}, (201,))
+
+
+@operation("getComment")
+def get_comment(w: WorkerState) -> Call:
+    comment_id, post_id = w.comment()
+    return Call("GET", f"/api/posts/{post_id}/comments/{comment_id}")
+
+
+@operation("updateComment")
+def update_comment(w: WorkerState) -> Call:
+    comment_id, post_id = w.comment()
+    return Call("PATCH", f"/api/posts/{post_id}/comments/{comment_id}", {"content": w.text()})
+
+
+@operation("deleteComment")
+def delete_comment(w: WorkerState) -> Call:
+    post_id = w.post_id()
+    comment = w.setup("POST", f"/api/posts/{post_id}/comments", {"userName": w.unique_user(), "content": w.text()})
+    return Call("DELETE", f"/api/posts/{post_id}/comments/{comment['id']}", expected=(204,))
+
+
+# ------------------------------------------------
+# 좋아요
+# ------------------------------------------------
+@operation("likePost")
+def like_post(w: WorkerState) -> Call:
+    return Call("POST", f"/api/posts/{w.post_id()}/likes", {"userName": w.unique_user()}, (201,))
+
+
+@operation("unlikePost")
+def unlike_post(w: WorkerState) -> Call:
+    post_id = w.post_id()
+    user = w.unique_user()
+    w.setup("POST", f"/api/posts/{post_id}/likes", {"userName": user})
+    return Call("DELETE", f"/api/posts/{post_id}/likes", {"userName": user}, (204,))
+
+
+# ------------------------------------------------
+# 일괄 작성 / 검색
+# ------------------------------------------------
+@operation("createPostsBatch")
+def create_posts_batch(w: WorkerState) -> Call:
+    body = [{"userName": w.unique_user(), "content": w.text()} for _ in range(BATCH_SIZE)]
+    return Call("POST", "/api/posts:batch", body, (201,))
+
+
+@operation("createCommentsBatch")
+def create_comments_batch(w: WorkerState) -> Call:
+    body = [{"userName": w.unique_user(), "content": w.text()} for _ in range(BATCH_SIZE)]
+    return Call("POST", f"/api/posts/{w.post_id()}/comments:batch", body, (201,))
+
+
+@operation("likePostsBatch")
+def like_posts_batch(w: WorkerState) -> Call:
+    body = [{"postId": w.post_id(), "userName": w.unique_user()} for _ in range(BATCH_SIZE)]
+    return Call("POST", "/api/likes:batch", body)
+
+
+@operation("getFeed")
+def get_feed(w: WorkerState) -> Call:
+    # 포스트 20개 + 포스트별 최신 댓글 + 시드 사용자의 좋아요 여부
+    return Call("GET", f"/api/feed?viewer={w.rng.choice(w.dataset.users)}&limit=20")
+
+
+@operation("getTrending")
+def get_trending(w: WorkerState) -> Call:
+    return Call("GET", "/api/trending?limit=20")
+
+
+@operation("search")
+def search(w: WorkerState) -> Call:
+    return Call("GET", f"/api/search?q={w.rng.choice(WORDS[:20])}&limit=20")
+
+
+
+# ------------------------------------------------
+# 사용자별 목록 / 요약
+# ------------------------------------------------
+@operation("getUserSummary")
+def get_user_summary(w: WorkerState) -> Call:
+    return Call("GET", f"/api/users/{w.rng.choice(w.dataset.users)}")
+
+
+@operation("getUserPosts")
+def get_user_posts(w: WorkerState) -> Call:
+    return Call("GET", f"/api/users/{w.rng.choice(w.dataset.users)}/posts?limit=20")
+
+
+@operation("getUserComments")
+def get_user_comments(w: WorkerState) -> Call:
+    return Call("GET", f"/api/users/{w.rng.choice(w.dataset.users)}/comments?limit=20")
+
+
+@operation("getUserLikes")
+def get_user_likes(w: WorkerState) -> Call:
+    return Call("GET", f"/api/users/{w.rng.choice(w.dataset.users)}/likes?limit=20")
+
+# ------------------------------------------------
+# 내보내기 / 가져오기
+# ------------------------------------------------
+# 가져오기 벤치마크가 쓰는 id 시작 값 (시드 데이터와 겹치지 않도록 큰 값)
+IMPORT_ID_BASE = 1_000_000_000
+
+
+@operation("exportData")
+def export_data(w: WorkerState) -> Call:
+    return Call("GET", "/api/export")
+
+
+@operation("importData")
+def import_data(w: WorkerState) -> Call:
+    # 요청마다 새 id 로 포스트 하나와 댓글 / 좋아요를 보냅니다.
+    post_id = IMPORT_ID_BASE + (w.worker_id * 1_000_000 + w.next_seq()) * 10
+    user = w.unique_user()
+    records = [{"type": "post", "id": post_id, "userName": user, "content": w.text(),
+                "createdAt": "2025-01-01 00:00:00", "updatedAt": "2025-01-01 00:00:00",
+                "likeCount": BATCH_SIZE, "commentCount": 9}]
+    records += [{"type": "comment", "id": post_id + i, "postId": post_id, "userName": user, "content": w.text(),
+                 "createdAt": "2025-01-01 00:00:00", "updatedAt": "2025-01-01 00:00:00"} for i in range(1, 10)]
+    records += [{"type": "like", "postId": post_id, "userName": f"{user}-{i}"} for i in range(BATCH_SIZE)]
+    return Call("POST", "/api/import", "".join(json.dumps(r) + "\n" for r in records).encode())
+
+
+@operation("streamEvents")
+def stream_events(w: WorkerState) -> Call:
+    # 연결 후 ready 이벤트 하나를 받고 끝나는 구독 (구독 / 해제 비용)
+    return Call("GET", "/api/events?limit=1")
+
+
+def openapi_operation_ids(path: str = OPENAPI_PATH) -> List[str]:
+    # PyYAML 없이도 동작하도록 operationId 줄만 읽습니다.
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return re.findall(r"^\s*operationId:\s*(\w+)\s*$", f.read(), re.MULTILINE)
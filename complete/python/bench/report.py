@@ -0,0 +1,87 @@
+import json
+import math
+from typing import Dict, List, Tuple
+
+from .runner import Result
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # nearest-rank 방식
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(result: Result) -> dict:
+    latencies = sorted(result.latencies)
+    count = len(latencies)
+    ms = 1000
+    return {
+        "operationId": result.operation_id,
+        "concurrency": result.concurrency,
+        "requests": count,
+        "errors": result.errors,
+        "errorSamples": result.error_samples,
+        "elapsedSec": round(result.elapsed, 4),
+        "throughputRps": round(count / result.elapsed, 2) if result.elapsed else 0.0,
+        "meanMs": round(sum(latencies) / count * ms, 3) if count else 0.0,
+        "p50Ms": round(percentile(latencies, 50) * ms, 3),
+        "p95Ms": round(percentile(latencies, 95) * ms, 3),
+        "p99Ms": round(percentile(latencies, 99) * ms, 3),
+        "maxMs": round(latencies[-1] * ms, 3) if count else 0.0,
+    }
+
+
+def print_table(rows: List[dict]) -> None:
+    header = f"{'operationId':<22}{'conc':>5}{'reqs':>8}{'err':>6}{'req/s':>10}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['operationId']:<22}{r['concurrency']:>5}{r['requests']:>8}{r['errors']:>6}"
+              f"{r['throughputRps']:>10.1f}{r['p50Ms']:>9.2f}{r['p95Ms']:>9.2f}{r['p99Ms']:>9.2f}")
+
+
+def write_json(path: str, meta: dict, rows: List[dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": rows}, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(base_path: str, new_path: str) -> List[dict]:
+    """두 실행 결과를 (operationId, concurrency) 로 맞춰서 변화율을 계산합니다."""
+    def load(path: str) -> Dict[Tuple[str, int], dict]:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {(r["operationId"], r["concurrency"]): r for r in data["results"]}
+
+    base, new = load(base_path), load(new_path)
+    rows = []
+    for key in sorted(base.keys() & new.keys()):
+        b, n = base[key], new[key]
+        rows.append({
+            "operationId": key[0],
+            "concurrency": key[1],
+            "throughputRps": (b["throughputRps"], n["throughputRps"], _change(b["throughputRps"], n["throughputRps"])),
+            "p50Ms": (b["p50Ms"], n["p50Ms"], _change(b["p50Ms"], n["p50Ms"])),
+            "p99Ms": (b["p99Ms"], n["p99Ms"], _change(b["p99Ms"], n["p99Ms"])),
+        })
+    return rows
+
+
+def _change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return round((after - before) / before * 100, 1)
+
+
+def print_comparison(rows: List[dict]) -> None:
+    header = f"{'operationId':<22}{'conc':>5}{'req/s':>22}{'p50ms':>22}{'p99ms':>22}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        cells = "".join(
+            f"{f'{b:.1f}->{n:.1f} ({c:+.1f}%)':>22}"
+            for b, n, c in (r["throughputRps"], r["p50Ms"], r["p99Ms"])
+        )
+        print(f"{r['operationId']:<22}{r['concurrency']:>5}{cells}")
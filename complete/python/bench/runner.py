@@ -0,0 +1,186 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from .client import HttpClient
+from .operations import Call, WorkerState
+from .seed import Dataset
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+# ------------------------------------------------
+# 측정 대상 서버
+# ------------------------------------------------
+class InProcessServer:
+    """벤치마크와 같은 프로세스의 스레드에서 uvicorn 으로 앱을 띄웁니다."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        self.base_url = f"http://{host}:{port}"
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "InProcessServer":
+        import uvicorn
+        import main
+
+        config = uvicorn.Config(main.app, host=self.host, port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="bench-uvicorn", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 30
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("서버를 시작하지 못했습니다.")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+class UvicornProcess:
+    """별도 프로세스로 `python launcher.py` 를 띄웁니다. (워커 간 캐시 무효화 포함)"""
+
+    def __init__(self, db_path: str, host: str = "127.0.0.1", port: int = 8765, workers: int = 1):
+        self.base_url = f"http://{host}:{port}"
+        self.args = [sys.executable, "launcher.py",
+                     "--host", host, "--port", str(port),
+                     "--workers", str(workers), "--log-level", "warning"]
+        self.env = {**os.environ, "SNS_DB_PATH": db_path}
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "UvicornProcess":
+        self._proc = subprocess.Popen(self.args, cwd=APP_DIR, env=self.env)
+        wait_until_ready(self.base_url, lambda: self._proc.poll() is None)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._proc.terminate()
+        try:
+            self._proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+
+
+class RemoteServer:
+    """이미 실행 중인 서버를 그대로 사용합니다."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def __enter__(self) -> "RemoteServer":
+        wait_until_ready(self.base_url, lambda: True)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def wait_until_ready(base_url: str, alive: Callable[[], bool], timeout: float = 30) -> None:
+    client = HttpClient(base_url, timeout=1)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not alive():
+            raise RuntimeError("서버 프로세스가 종료되었습니다.")
+        try:
+            status, _ = client.request("GET", "/api/posts?limit=1")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{base_url} 가 응답하지 않습니다.")
+
+
+# ------------------------------------------------
+# 측정
+# ------------------------------------------------
+@dataclass
+class Result:
+    operation_id: str
+    concurrency: int
+    elapsed: float
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    # 기대하지 않은 상태 코드 예시 (최대 5개)
+    error_samples: List[str] = field(default_factory=list)
+
+
+def run_operation(base_url: str, operation_id: str, build: Callable[[WorkerState], Call],
+                  dataset: Dataset, concurrency: int, requests: int, duration: float,
+                  warmup: int, seed: int) -> Result:
+    """
+    concurrency 개의 스레드가 같은 operation 을 반복 호출합니다.
+    전체 요청 수가 requests 에 도달하거나 duration 초가 지나면 멈춥니다.
+    준비 요청(setup)과 워밍업 요청은 측정에서 제외합니다.
+    """
+    result = Result(operation_id, concurrency, 0.0)
+    lock = threading.Lock()
+    issued = [0]
+    run_tag = uuid.uuid4().hex[:8]
+    deadline = [0.0]
+    started = [0.0]
+
+    def on_start() -> None:
+        # 모든 스레드가 준비되면 한 번 호출됩니다.
+        started[0] = time.perf_counter()
+        deadline[0] = started[0] + duration
+
+    start_barrier = threading.Barrier(concurrency + 1, action=on_start)
+
+    def take_ticket() -> bool:
+        with lock:
+            if issued[0] >= requests or time.perf_counter() > deadline[0]:
+                return False
+            issued[0] += 1
+            return True
+
+    def worker(worker_id: int) -> None:
+        client = HttpClient(base_url)
+        state = WorkerState(client, dataset, run_tag, worker_id, seed)
+        latencies = []
+        errors = []
+        try:
+            for _ in range(warmup):
+                call = build(state)
+                client.request(call.method, call.path, call.body)
+            start_barrier.wait()
+            while take_ticket():
+                call = build(state)
+                t0 = time.perf_counter()
+                status, _ = client.request(call.method, call.path, call.body)
+                latencies.append(time.perf_counter() - t0)
+                if status not in call.expected:
+                    errors.append(f"{call.method} {call.path} -> {status}")
+        except threading.BrokenBarrierError:
+            return
+        except Exception as e:
+            errors.append(repr(e))
+            start_barrier.abort()
+        finally:
+            client.close()
+            with lock:
+                result.latencies.extend(latencies)
+                result.errors += len(errors)
+                result.error_samples.extend(errors[:5 - len(result.error_samples)])
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    for t in threads:
+        t.join()
+    result.elapsed = time.perf_counter() - started[0] if started[0] else 0.0
+    return result
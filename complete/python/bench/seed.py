@@ -0,0 +1,144 @@
+import datetime
+import random
+import sqlite3
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+@dataclass
+class SeedConfig:
+    posts: int = 1000
+    # 포스트당 평균 댓글 수 (실제 개수는 0 ~ 2배 사이에서 무작위)
+    comments_per_post: int = 5
+    likes: int = 20000
+    users: int = 500
+    # 좋아요가 몰리는 정도 (Zipf 지수, 0 이면 균등)
+    like_skew: float = 1.1
+    seed: int = 42
+
+
+@dataclass
+class Dataset:
+    post_ids: List[int] = field(default_factory=list)
+    # (commentId, postId)
+    comments: List[Tuple[int, int]] = field(default_factory=list)
+    users: List[str] = field(default_factory=list)
+    # 좋아요가 많이 몰린 순서대로 정렬된 포스트 id (상위 포스트를 "인기 글" 로 사용)
+    hot_post_ids: List[int] = field(default_factory=list)
+
+
+WORDS = (
+    "apple banana cherry coffee river mountain sunset morning travel music "
+    "book movie garden city ocean forest coding python sqlite fastapi "
+    "오늘 날씨 커피 여행 음악 사진 주말 점심 산책 공부"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_database(conn: sqlite3.Connection, config: SeedConfig) -> Dataset:
+    """
+    빈 데이터베이스(스키마만 있는 상태)에 합성 데이터를 넣습니다.
+    likeCount / commentCount 는 실제 행 수와 일치하도록 계산해 넣습니다.
+    """
+    rng = random.Random(config.seed)
+    now = datetime.datetime.now()
+    users = [f"user{i:05d}" for i in range(config.users)]
+    c = conn.cursor()
+
+    # 포스트
+    posts = []
+    for i in range(config.posts):
+        at = (now - datetime.timedelta(minutes=config.posts - i)).strftime('%Y-%m-%d %H:%M:%S')
+        posts.append((rng.choice(users), _text(rng, rng.randint(5, 40)), at, at))
+    c.executemany("""
+        INSERT INTO posts (userName, content, createdAt, updatedAt, likeCount, commentCount)
+        VALUES (?, ?, ?, ?, 0, 0)
+    """, posts)
+    c.execute("SELECT id FROM posts ORDER BY id")
+    post_ids = [row[0] for row in c.fetchall()]
+
+    # 댓글
+    comments = []
+    for post_id in post_ids:
+        for _ in range(rng.randint(0, config.comments_per_post * 2)):
+            at = now.strftime('%Y-%m-%d %H:%M:%S')
+            comments.append((post_id, rng.choice(users), _text(rng, rng.randint(3, 20)), at, at))
+    c.executemany("""
+        INSERT INTO comments (postId, userName, content, createdAt, updatedAt)
+        VALUES (?, ?, ?, ?, ?)
+    """, comments)
+
+    # 좋아요 (Zipf 분포로 일부 포스트에 몰리게)
+    weights = [1 / ((rank + 1) ** config.like_skew) for rank in range(len(post_ids))]
+    ranked = post_ids[:]
+    rng.shuffle(ranked)
+    likes = set()
+    max_likes = min(config.likes, len(post_ids) * len(users))
+    while len(likes) < max_likes:
+        for post_id in rng.choices(ranked, weights=weights, k=max_likes - len(likes)):
+            likes.add((post_id, rng.choice(users)))
+    liked_at = now.strftime('%Y-%m-%d %H:%M:%S')
+    c.executemany("INSERT OR IGNORE INTO likes (postId, userName, likedAt) VALUES (?, ?, ?)",
+                  [(post_id, user_name, liked_at) for post_id, user_name in sorted(likes)])
+
+    like_counts = Counter(post_id for post_id, _ in likes)
+    comment_counts = Counter(comment[0] for comment in comments)
+    c.executemany(
+        "UPDATE posts SET likeCount = ?, commentCount = ? WHERE id = ?",
+        [(like_counts[post_id], comment_counts[post_id], post_id) for post_id in post_ids],
+    )
+    conn.commit()
+
+    c.execute("SELECT id, postId FROM comments ORDER BY id")
+    return Dataset(
+        post_ids=post_ids,
+        comments=[(row[0], row[1]) for row in c.fetchall()],
+        users=users,
+        hot_post_ids=ranked[:max(1, len(ranked) // 100)],
+    )
+
+
+def seed_via_api(client, config: SeedConfig, batch_size: int = 500) -> Dataset:
+    """
+    이미 실행 중인 서버(--target url)에는 일괄 작성 API 로 데이터를 넣습니다.
+    """
+    rng = random.Random(config.seed)
+    users = [f"user{i:05d}" for i in range(config.users)]
+
+    def call(method: str, path: str, body) -> list:
+        status, data = client.json(method, path, body)
+        if status >= 300:
+            raise RuntimeError(f"시드 요청 실패: {method} {path} -> {status} {data}")
+        return data
+
+    post_ids = []
+    for start in range(0, config.posts, batch_size):
+        body = [{"userName": rng.choice(users), "content": _text(rng, rng.randint(5, 40))}
+                for _ in range(min(batch_size, config.posts - start))]
+        post_ids.extend(p["id"] for p in call("POST", "/api/posts:batch", body))
+
+    comments = []
+    for post_id in post_ids:
+        count = rng.randint(0, config.comments_per_post * 2)
+        if count:
+            body = [{"userName": rng.choice(users), "content": _text(rng, rng.randint(3, 20))} for _ in range(count)]
+            comments.extend((cm["id"], post_id) for cm in call("POST", f"/api/posts/{post_id}/comments:batch", body))
+
+    weights = [1 / ((rank + 1) ** config.like_skew) for rank in range(len(post_ids))]
+    ranked = post_ids[:]
+    rng.shuffle(ranked)
+    picks = rng.choices(ranked, weights=weights, k=config.likes)
+    for start in range(0, len(picks), batch_size):
+        body = [{"postId": post_id, "userName": rng.choice(users)} for post_id in picks[start:start + batch_size]]
+        call("POST", "/api/likes:batch", body)
+
+    return Dataset(
+        post_ids=post_ids,
+        comments=comments,
+        users=users,
+        hot_post_ids=ranked[:max(1, len(ranked) // 100)],
+    )
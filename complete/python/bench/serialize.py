@@ -0,0 +1,92 @@
+import asyncio
+import random
+import time
+from typing import Callable, List, Tuple
+
+from .seed import _text
+
+# ------------------------------------------------
+# JSON 직렬화 경로 비교 (python -m bench serialize)
+#
+# 같은 행 목록을 응답 하나로 만드는 데 드는 CPU 시간을 잽니다. DB 와 HTTP 는 빼고 직렬화만 봅니다.
+# - model: 지금까지의 경로. 읽기 캐시에 dict 목록이 있을 때처럼 FastAPI 의 serialize_response 로
+#   응답 모델 검증 + JSON 인코딩만 잽니다. (동기 핸들러는 검증을 스레드 풀에서 하지만 그 전환 비용은 뺍니다)
+# - cold: 빠른 경로에서 조각 캐시가 비어 있을 때 (행마다 인코딩 후 이어 붙이기)
+# - warm: 조각 캐시에 모두 있을 때 (행 비교 후 이어 붙이기)
+# 빠른 경로는 읽기 캐시에 이어 붙인 바이트를 두므로 캐시 적중 시에는 직렬화 비용이 없습니다.
+# 두 경로의 결과 바이트가 다르면 실패로 표시합니다.
+# ------------------------------------------------
+
+
+def _post_rows(rng: random.Random, count: int) -> List[tuple]:
+    now = "2024-01-01 12:00:00"
+    return [(i, f"user{rng.randrange(500)}", _text(rng, rng.randint(5, 60)), now, now,
+             rng.randrange(1000), rng.randrange(50)) for i in range(count, 0, -1)]
+
+
+def _comment_rows(rng: random.Random, count: int) -> List[tuple]:
+    now = "2024-01-01 12:00:00"
+    return [(i, 1, f"user{rng.randrange(500)}", _text(rng, rng.randint(3, 30)), now, now)
+            for i in range(count, 0, -1)]
+
+
+def _time(fn: Callable[[], bytes], iterations: int) -> float:
+    """한 번 호출에 걸린 평균 시간(µs)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def measure(sizes: List[int], iterations: int, seed: int) -> List[Tuple[str, int, float, float, float, bool]]:
+    """(operationId, 항목 수, model µs, cold µs, warm µs, 결과 일치 여부) 목록"""
+    from fastapi.routing import serialize_response
+
+    import json_cache
+    import main
+    import repository
+
+    routes = {getattr(route, "operation_id", None): route for route in main.api_router.routes}
+    cases = [
+        ("getPosts", main.POST_JSON, repository.post_dict, _post_rows),
+        ("getComments", main.COMMENT_JSON, repository.comment_dict, _comment_rows),
+    ]
+    loop = asyncio.new_event_loop()
+    rng = random.Random(seed)
+    rows_out = []
+    try:
+        for operation_id, encoder, to_dict, make_rows in cases:
+            field = routes[operation_id].response_field
+            for size in sizes:
+                rows = make_rows(rng, size)
+                items = [to_dict(row) for row in rows]
+
+                def model() -> bytes:
+                    return loop.run_until_complete(serialize_response(field=field, response_content=items,
+                                                                      dump_json=True))
+
+                cold_cache = json_cache.FragmentCache(max_entries=0)
+                warm_cache = json_cache.FragmentCache(max_entries=size)
+                warm_cache.encode(encoder, rows)
+
+                def cold() -> bytes:
+                    return json_cache.join(cold_cache.encode(encoder, rows))
+
+                def warm() -> bytes:
+                    return json_cache.join(warm_cache.encode(encoder, rows))
+
+                same = model() == cold() == warm()
+                rows_out.append((operation_id, size, _time(model, iterations), _time(cold, iterations),
+                                 _time(warm, iterations), same))
+    finally:
+        loop.close()
+    return rows_out
+
+
+def print_table(rows: List[Tuple[str, int, float, float, float, bool]]) -> None:
+    header = f"{'operationId':<14}{'items':>7}{'model µs':>11}{'cold µs':>10}{'warm µs':>10}{'cold x':>8}{'warm x':>8}  result"
+    print(header)
+    print("-" * len(header))
+    for operation_id, size, model, cold, warm, same in rows:
+        print(f"{operation_id:<14}{size:>7}{model:>11.1f}{cold:>10.1f}{warm:>10.1f}"
+              f"{model / cold:>8.1f}{model / warm:>8.1f}  {'ok' if same else '결과 다름'}")
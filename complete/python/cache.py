@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+# ------------------------------------------------
+# 캐시 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 0 이면 캐시를 끕니다.
+CACHE_MAX_ENTRIES = int(os.environ.get("SNS_CACHE_MAX_ENTRIES", "10000"))
+# 항목이 살아있는 최대 시간(초)
+CACHE_TTL = float(os.environ.get("SNS_CACHE_TTL", "30"))
+
+
+class _Entry:
+    __slots__ = ("value", "tags", "expires_at")
+
+    def __init__(self, value: Any, tags: Set[Hashable], expires_at: float):
+        self.value = value
+        self.tags = tags
+        self.expires_at = expires_at
+
+
+class ReadCache:
+    """
+    LRU + TTL 읽기 캐시.
+
+    각 항목은 태그(예: ("post", 1))를 가지며, 변경 핸들러는 invalidate(태그) 로
+    그 태그가 붙은 항목만 정확히 지웁니다. on_invalidate 가 설정되어 있으면 지운 태그를
+    다른 워커 프로세스에도 알립니다. (cache_sync.py)
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._by_tag: Dict[Hashable, Set[Hashable]] = {}
+        # 무효화가 일어날 때마다 증가합니다. 읽는 도중 무효화가 있었다면 결과를 저장하지 않습니다.
+        self._generation = 0
+        # invalidate / clear 후에 호출됩니다. (tags 가 None 이면 전체 비우기)
+        self.on_invalidate: Optional[Callable[[Optional[Tuple[Hashable, ...]]], None]] = None
+        # 이 프로세스에서 태그를 지울 때마다(다른 워커에서 받은 무효화 포함) 호출됩니다. (tags 가 None 이면 전체 비우기)
+        self.on_evict: Optional[Callable[[Optional[Tuple[Hashable, ...]]], None]] = None
+        # 캐시를 꺼도 무효화를 다른 워커에 알릴지 (on_evict 로 태그를 받는 다른 캐시가 있을 때, cache_sync.py)
+        self.share_when_disabled = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Tuple[Any, Iterable[Hashable]]]) -> Any:
+        """
+        key 가 캐시에 있으면 돌려주고, 없으면 loader() 를 호출해 (값, 태그 목록) 을 받아 저장합니다.
+        loader 가 예외를 던지면 아무것도 저장하지 않습니다.
+        """
+        if not self.enabled:
+            return loader()[0]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+
+        value, tags = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value, set(tags))
+        return value
+
+    def invalidate(self, *tags: Hashable) -> None:
+        self.evict(tags)
+        if self.on_invalidate is not None:
+            self.on_invalidate(tags)
+
+    def notify(self, *tags: Hashable) -> None:
+        """이 프로세스의 캐시는 그대로 두고 다른 워커에만 무효화를 알립니다. (이미 직접 갱신한 항목)"""
+        if tags and self.on_invalidate is not None:
+            self.on_invalidate(tags)
+
+    def clear(self) -> None:
+        self.evict_all()
+        if self.on_invalidate is not None:
+            self.on_invalidate(None)
+
+    def evict(self, tags: Iterable[Hashable]) -> None:
+        """이 프로세스의 캐시에서만 지웁니다. (다른 워커에서 받은 무효화를 적용할 때)"""
+        tags = tuple(tags)
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._by_tag.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+        if self.on_evict is not None:
+            self.on_evict(tags)
+
+    def evict_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+        if self.on_evict is not None:
+            self.on_evict(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    # ------------------------------------------------
+    # 내부 함수 (self._lock 을 잡은 상태에서 호출)
+    # ------------------------------------------------
+    def _store(self, key: Hashable, value: Any, tags: Set[Hashable]) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, tags, time.monotonic() + self.ttl)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+read_cache = ReadCache()
@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Hashable, List, Optional, Tuple
+
+from cache import ReadCache, read_cache
+from db import BUSY_TIMEOUT_MS, DB_PATH
+from events import EventHub, event_hub
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 워커 간 캐시 무효화 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 서버 워커 프로세스 수 (launcher.py 가 지정)
+WORKERS = int(os.environ.get("SNS_WORKERS", "1"))
+# 1 이면 다른 워커가 지운 캐시 항목을 이 워커에서도 지우고, 실시간 이벤트도 주고받습니다. 기본값은 워커가 2개 이상일 때 켜짐
+CACHE_SYNC = os.environ.get("SNS_CACHE_SYNC", "1" if WORKERS > 1 else "0") == "1"
+# 무효화 기록을 주고받는 데이터베이스 파일
+SYNC_PATH = os.environ.get("SNS_CACHE_SYNC_PATH", DB_PATH + ".cache-sync")
+# 다른 워커의 무효화를 확인하는 주기(초). 다른 워커의 변경이 보이기까지 걸리는 최대 시간입니다.
+SYNC_INTERVAL = float(os.environ.get("SNS_CACHE_SYNC_INTERVAL", "0.05"))
+# 무효화 기록을 보관하는 시간(초). 이보다 오래 확인하지 못한 워커는 캐시를 모두 비웁니다.
+SYNC_RETENTION = float(os.environ.get("SNS_CACHE_SYNC_RETENTION", "60"))
+
+Tags = Optional[Tuple[Hashable, ...]]
+
+
+class CacheSync:
+    """
+    여러 워커 프로세스의 읽기 캐시를 맞춥니다.
+
+    캐시에서 태그를 지우면 공유 데이터베이스의 cache_invalidations 테이블에 기록하고,
+    각 워커는 SYNC_INTERVAL 마다 PRAGMA data_version 으로 다른 커넥션의 commit 이 있었는지 보고
+    있었을 때만 새 기록을 읽어 같은 태그를 지웁니다. 따라서 바뀐 항목만 정확히 지워지고,
+    아무도 쓰지 않을 때는 PRAGMA 하나 외에는 읽지 않습니다.
+
+    실시간 이벤트(events.py)도 직렬화된 채로 sync_events 테이블에 기록하고, 이벤트를 만든 워커를
+    포함한 모든 워커가 기록 순서(seq)대로 읽어 구독자에게 보냅니다. 그래서 어느 워커에 연결했든
+    이벤트 순서가 같습니다. 워커마다 SSE 구독자 수를 sync_subscribers 에 남기므로, 어느 워커에도
+    구독자가 없으면 이벤트는 기록하지 않습니다. (새 구독자는 최대 SYNC_INTERVAL 뒤부터 다른 워커의 이벤트를 받음)
+    """
+
+    def __init__(self, cache: ReadCache, hub: Optional[EventHub] = None, path: str = SYNC_PATH,
+                 interval: float = SYNC_INTERVAL, retention: float = SYNC_RETENTION, enabled: bool = CACHE_SYNC):
+        self.cache = cache
+        self.hub = hub
+        self.path = path
+        self.interval = interval
+        self.retention = retention
+        self.enabled = enabled
+        # 자기 자신이 남긴 기록은 건너뜁니다.
+        self.origin = os.getpid()
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = 0
+        self._last_seq = 0
+        self._last_event_seq = 0
+        # 이 커넥션의 commit 은 data_version 을 바꾸지 않으므로 직접 기록한 이벤트가 있는지 따로 표시합니다.
+        self._own_events = False
+        self._last_poll = 0.0
+        self._last_prune = 0.0
+        # sync_subscribers 에 마지막으로 남긴 이 워커의 구독자 수와 시각
+        self._reported_subscribers = 0
+        self._last_report = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.published = 0
+        self.received = 0
+        self.resets = 0
+        self.events_published = 0
+        self.events_received = 0
+
+    # ------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self.origin = os.getpid()
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_invalidations (
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          origin INTEGER NOT NULL,
+          tag TEXT,
+          createdAt REAL NOT NULL
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_events (
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          origin INTEGER NOT NULL,
+          frame BLOB NOT NULL,
+          createdAt REAL NOT NULL
+        )
+        """)
+        # 구독자가 있는 워커만 행을 두고 retention / 2 마다 updatedAt 을 갱신합니다. (비정상 종료한 워커의 행은 만료)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_subscribers (
+          origin INTEGER PRIMARY KEY,
+          subscribers INTEGER NOT NULL,
+          updatedAt REAL NOT NULL
+        )
+        """)
+        # 새 워커의 캐시는 비어 있고 구독자도 없으므로 이전 기록은 읽을 필요가 없습니다.
+        self._last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()[0]
+        self._last_event_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_events").fetchone()[0]
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        self._last_poll = self._last_prune = time.monotonic()
+        self._reported_subscribers = 0
+        self._conn = conn
+        self._read_remote_subscribers()
+
+        if self.cache.enabled or self.cache.share_when_disabled:
+            self.cache.on_invalidate = self.publish
+        if self.hub is not None:
+            self.hub.on_frame = self.publish_event
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._conn is None:
+            return
+        self.cache.on_invalidate = None
+        if self.hub is not None:
+            self.hub.on_frame = None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            try:
+                self._conn.execute("DELETE FROM sync_subscribers WHERE origin = ?", (self.origin,))
+            except sqlite3.Error:
+                # 남은 행은 retention 이 지나면 무시됩니다.
+                pass
+            self._conn.close()
+            self._conn = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except sqlite3.Error:
+                # 다음 주기에 다시 시도합니다. 그동안 놓친 무효화는 기록에 남아 있습니다.
+                logger.exception("캐시 무효화 기록을 읽지 못했습니다.")
+
+    # ------------------------------------------------
+    # 보내기 / 받기
+    # ------------------------------------------------
+    def publish(self, tags: Tags) -> None:
+        """이 워커에서 지운 태그를 기록합니다. (tags 가 None 이면 전체 비우기)"""
+        now = time.time()
+        if tags is None:
+            rows = [(self.origin, None, now)]
+        else:
+            rows = [(self.origin, json.dumps(tag), now) for tag in tags]
+        if not rows:
+            return
+        if self._insert("INSERT INTO cache_invalidations (origin, tag, createdAt) VALUES (?, ?, ?)", rows):
+            self.published += len(rows)
+
+    def publish_event(self, frame: bytes) -> None:
+        """이 워커에서 생긴 실시간 이벤트를 공유 기록에 남깁니다. (다음 poll 에서 모든 워커가 보냄)"""
+        if self._insert("INSERT INTO sync_events (origin, frame, createdAt) VALUES (?, ?, ?)",
+                        [(self.origin, frame, time.time())]):
+            self._own_events = True
+            self.events_published += 1
+
+    def _insert(self, sql: str, rows: List[tuple]) -> bool:
+        try:
+            with self._lock:
+                if self._conn is None:
+                    return False
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(sql, rows)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return True
+        except sqlite3.Error:
+            # 데이터는 이미 commit 되었으므로 요청은 실패시키지 않습니다. 다른 워커는 TTL 이 지나면 새로 읽습니다.
+            logger.exception("다른 워커에 변경을 알리지 못했습니다.")
+            return False
+
+    def poll(self) -> int:
+        """다른 워커의 새 무효화 기록을 읽어 적용하고, 적용한 기록 수를 돌려줍니다."""
+        with self._lock:
+            if self._conn is None:
+                return 0
+            now = time.monotonic()
+            stalled = now - self._last_poll > self.retention
+            self._last_poll = now
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            rows: List[tuple] = []
+            events: List[tuple] = []
+            self._report_subscribers()
+            if data_version != self._data_version or self._own_events:
+                self._data_version = data_version
+                self._own_events = False
+                self._read_remote_subscribers()
+                rows = self._conn.execute(
+                    "SELECT seq, origin, tag FROM cache_invalidations WHERE seq > ? ORDER BY seq",
+                    (self._last_seq,),
+                ).fetchall()
+                if rows:
+                    self._last_seq = rows[-1][0]
+                events = self._conn.execute(
+                    "SELECT seq, origin, frame FROM sync_events WHERE seq > ? ORDER BY seq",
+                    (self._last_event_seq,),
+                ).fetchall()
+                if events:
+                    self._last_event_seq = events[-1][0]
+            if now - self._last_prune > self.retention / 2:
+                self._last_prune = now
+                cutoff = time.time() - self.retention
+                self._conn.execute("DELETE FROM cache_invalidations WHERE createdAt < ?", (cutoff,))
+                self._conn.execute("DELETE FROM sync_events WHERE createdAt < ?", (cutoff,))
+                self._conn.execute("DELETE FROM sync_subscribers WHERE updatedAt < ?", (cutoff,))
+                self._read_remote_subscribers()
+
+        if stalled:
+            # 오래 멈춰 있었다면 그 사이의 기록이 지워졌을 수 있으므로 캐시를 모두 비웁니다.
+            self.cache.evict_all()
+            self.resets += 1
+        tags = []
+        clear = False
+        for _, origin, tag in rows:
+            if origin == self.origin:
+                continue
+            if tag is None:
+                clear = True
+            else:
+                tags.append(tuple(json.loads(tag)))
+        if clear:
+            self.cache.evict_all()
+        elif tags:
+            self.cache.evict(tags)
+        received = len(tags) + clear
+        self.received += received
+        # 캐시를 지운 뒤에 이벤트를 보내야 이벤트를 받고 다시 읽은 클라이언트가 새 값을 봅니다.
+        for _, origin, frame in events:
+            self.hub.deliver(frame)
+            if origin != self.origin:
+                self.events_received += 1
+        return received
+
+    def _report_subscribers(self) -> None:
+        # 이 워커의 구독자 수가 바뀌었을 때와, 구독자가 있는 동안 retention / 2 마다만 기록합니다. (self._lock 안에서 호출)
+        if self.hub is None:
+            return
+        count = self.hub.subscriber_count
+        now = time.time()
+        if count == self._reported_subscribers and (not count or now - self._last_report < self.retention / 2):
+            return
+        if count:
+            self._conn.execute("INSERT OR REPLACE INTO sync_subscribers (origin, subscribers, updatedAt) VALUES (?, ?, ?)",
+                               (self.origin, count, now))
+        else:
+            self._conn.execute("DELETE FROM sync_subscribers WHERE origin = ?", (self.origin,))
+        self._reported_subscribers = count
+        self._last_report = now
+
+    def _read_remote_subscribers(self) -> None:
+        # 다른 워커들의 구독자 수 (self._lock 안에서 호출)
+        if self.hub is None:
+            return
+        self.hub.remote_subscribers = self._conn.execute(
+            "SELECT COALESCE(SUM(subscribers), 0) FROM sync_subscribers WHERE origin != ? AND updatedAt >= ?",
+            (self.origin, time.time() - self.retention),
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._conn is not None,
+            "workers": WORKERS,
+            "interval": self.interval,
+            "published": self.published,
+            "received": self.received,
+            "resets": self.resets,
+            "eventsPublished": self.events_published,
+            "eventsReceived": self.events_received,
+            "remoteSubscribers": self.hub.remote_subscribers if self.hub is not None else 0,
+        }
+
+
+cache_sync = CacheSync(read_cache, event_hub)
@@ -0,0 +1,288 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from metrics import METRICS_ENABLED, metrics
+
+# ------------------------------------------------
+# 데이터베이스 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+DB_PATH = os.environ.get("SNS_DB_PATH", "sns.db")
+# 동시에 대여할 수 있는 읽기 전용 커넥션 수
+POOL_SIZE = int(os.environ.get("SNS_DB_POOL_SIZE", "8"))
+# 커넥션을 빌릴 때 기다릴 최대 시간(초)
+POOL_TIMEOUT = float(os.environ.get("SNS_DB_POOL_TIMEOUT", "10"))
+# 이 시간(초) 이상 쉬었던 커넥션은 빌려주기 전에 상태를 확인
+HEALTH_CHECK_INTERVAL = float(os.environ.get("SNS_DB_HEALTH_CHECK_INTERVAL", "30"))
+# 잠금 대기 시간(ms)
+BUSY_TIMEOUT_MS = int(os.environ.get("SNS_DB_BUSY_TIMEOUT_MS", "5000"))
+# 페이지 캐시 크기(KiB), mmap 크기(byte)
+CACHE_SIZE_KB = int(os.environ.get("SNS_DB_CACHE_SIZE_KB", "16384"))
+MMAP_SIZE = int(os.environ.get("SNS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+# busy_timeout 이 지나도 database is locked 이면 다시 실행할 횟수
+LOCKED_RETRIES = int(os.environ.get("SNS_DB_LOCKED_RETRIES", "3"))
+# 커넥션마다 재사용할 prepared statement 수 (repository 의 SQL 은 모두 상수 문자열)
+STATEMENT_CACHE_SIZE = int(os.environ.get("SNS_DB_STATEMENT_CACHE", "256"))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# ------------------------------------------------
+# SQL 계측 (실행 수 / 시간 / commit / database is locked 재시도)
+# ------------------------------------------------
+def _is_locked(e: sqlite3.OperationalError) -> bool:
+    return "database is locked" in str(e)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def _run(self, fn, sql, parameters):
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return fn(sql, parameters)
+                except sqlite3.OperationalError as e:
+                    if not _is_locked(e) or attempt >= LOCKED_RETRIES:
+                        raise
+                    # 실패한 문장은 반영되지 않았으므로 같은 문장을 다시 실행할 수 있습니다.
+                    attempt += 1
+                    wait_started = time.perf_counter()
+                    time.sleep(0.01 * attempt)
+                    metrics.record_lock_wait(time.perf_counter() - wait_started, retry=True)
+        finally:
+            metrics.record_statement(sql, time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            metrics.record_fetch(time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            metrics.record_fetch(time.perf_counter() - started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.record_fetch(time.perf_counter() - started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """모든 SQL 이 InstrumentedCursor 를 거치도록 하는 커넥션."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            metrics.record_commit(time.perf_counter() - started)
+
+
+class _PooledConnection:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    SQLite 커넥션 풀.
+
+    - 쓰기는 전용 writer 커넥션 하나로만 수행합니다. (lock 으로 직렬화)
+    - 읽기는 최대 pool_size 개의 reader 커넥션을 요청(스레드)마다 하나씩 빌려 씁니다.
+    - WAL 모드에서는 reader 와 writer 가 서로를 막지 않습니다.
+    """
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = POOL_SIZE,
+                 timeout: float = POOL_TIMEOUT,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL, uri: bool = False):
+        if pool_size < 1:
+            raise ValueError("pool_size 는 1 이상이어야 합니다.")
+        self.path = path
+        # path 가 file: URI 인지 (읽기 복제본의 메모리 데이터베이스, replica.py)
+        self.uri = uri
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Lock()
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._readers_created = 0
+        self._closed = False
+
+        # writer 커넥션은 가장 먼저 열어서 WAL 모드를 켜 둡니다.
+        self._writer_lock = threading.Lock()
+        self._writer = _PooledConnection(self._connect(readonly=False))
+
+    # ------------------------------------------------
+    # 커넥션 생성 / 상태 확인
+    # ------------------------------------------------
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        # 요청 처리 중 dependency 의 진입/종료 스레드가 다를 수 있으므로 check_same_thread 는 끕니다.
+        # 한 커넥션은 한 번에 하나의 요청만 사용하므로 안전합니다.
+        factory = InstrumentedConnection if METRICS_ENABLED else sqlite3.Connection
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                               factory=factory, cached_statements=STATEMENT_CACHE_SIZE, uri=self.uri)
+        # 커넥션 설정은 처음 빌려주는 요청에서 일어나더라도 그 요청의 SQL 수로 세지 않습니다.
+        c = conn.cursor(sqlite3.Cursor)
+        if not readonly:
+            # 새 파일이면 지운 페이지를 나중에 조금씩 돌려줄 수 있도록 합니다. (WAL 전환 전에만 적용, 기존 파일은 그대로)
+            c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        c.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        c.execute("PRAGMA temp_store=MEMORY")
+        # 댓글 / 좋아요의 ON DELETE CASCADE 를 위해 외래 키를 켭니다. (커넥션마다 설정)
+        c.execute("PRAGMA foreign_keys=ON")
+        if readonly:
+            c.execute("PRAGMA query_only=ON")
+        c.close()
+        return conn
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            pooled.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def health_check(self) -> dict:
+        # 새 커넥션 없이 writer 와 유휴 reader 를 모두 점검합니다.
+        with self._writer_lock:
+            try:
+                self._writer.conn.execute("SELECT 1").fetchone()
+                writer_ok = True
+            except sqlite3.Error:
+                writer_ok = False
+        return {
+            "writer": writer_ok,
+            "readersCreated": self._readers_created,
+            "readersIdle": self._idle.qsize(),
+            "poolSize": self.pool_size,
+        }
+
+    # ------------------------------------------------
+    # reader 커넥션 대여 / 반납
+    # ------------------------------------------------
+    def acquire_reader(self) -> _PooledConnection:
+        if self._closed:
+            raise RuntimeError("커넥션 풀이 닫혔습니다.")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout("사용 가능한 DB 커넥션이 없습니다.")
+        try:
+            while True:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    with self._lock:
+                        self._readers_created += 1
+                    return _PooledConnection(self._connect(readonly=True))
+                if self._is_healthy(pooled):
+                    return pooled
+                # 깨진 커넥션은 버리고 다시 시도
+                self._discard(pooled)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release_reader(self, pooled: _PooledConnection) -> None:
+        try:
+            if pooled.conn.in_transaction:
+                pooled.conn.rollback()
+            pooled.last_used = time.monotonic()
+            if self._closed:
+                self._discard(pooled)
+            else:
+                self._idle.put(pooled)
+        except sqlite3.Error:
+            self._discard(pooled)
+        finally:
+            self._slots.release()
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        with self._lock:
+            self._readers_created -= 1
+        try:
+            pooled.conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        pooled = self.acquire_reader()
+        try:
+            yield pooled.conn
+        finally:
+            self.release_reader(pooled)
+
+    # ------------------------------------------------
+    # writer 커넥션
+    # ------------------------------------------------
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        started = time.perf_counter()
+        acquired = self._writer_lock.acquire(timeout=self.timeout)
+        metrics.record_lock_wait(time.perf_counter() - started)
+        if not acquired:
+            raise PoolTimeout("writer 커넥션을 얻지 못했습니다.")
+        try:
+            if not self._is_healthy(self._writer):
+                try:
+                    self._writer.conn.close()
+                except sqlite3.Error:
+                    pass
+                self._writer = _PooledConnection(self._connect(readonly=False))
+            conn = self._writer.conn
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._writer.last_used = time.monotonic()
+        finally:
+            self._writer_lock.release()
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            self._writer.conn.close()
@@ -0,0 +1,278 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.params import Depends
+
+from db import POOL_SIZE
+from metrics import InstrumentedRoute
+
+# ------------------------------------------------
+# 핸들러 실행 방식 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# sync: 핸들러를 FastAPI 기본 스레드풀에서 실행 (기존 방식)
+# async: 핸들러를 async 로 감싸고 DB 작업은 아래 크기가 정해진 전용 스레드(읽기 / 쓰기 차선)에서 실행
+HANDLER_MODE = os.environ.get("SNS_HANDLER_MODE", "sync")
+# 차선별 스레드 수 (읽기는 GET, 쓰기는 그 밖의 메서드)
+READ_THREADS = int(os.environ.get("SNS_DB_READ_THREADS", str(POOL_SIZE)))
+WRITE_THREADS = int(os.environ.get("SNS_DB_WRITE_THREADS", "8"))
+# 차선마다 실행 중인 작업 외에 기다릴 수 있는 작업 수. 넘치면 바로 503 을 돌려줍니다.
+LANE_QUEUE = int(os.environ.get("SNS_DB_LANE_QUEUE", "256"))
+# 요청 하나의 DB 작업(대기 포함)을 기다리는 최대 시간(초). 넘으면 504, 0 이면 제한 없음
+REQUEST_TIMEOUT = float(os.environ.get("SNS_DB_REQUEST_TIMEOUT", "10"))
+# DB 작업을 기다리는 동안 클라이언트 연결이 끊겼는지 확인하는 주기(초)
+DISCONNECT_POLL = float(os.environ.get("SNS_DB_DISCONNECT_POLL", "0.1"))
+
+if HANDLER_MODE not in ("sync", "async"):
+    raise ValueError("SNS_HANDLER_MODE 는 sync 또는 async 여야 합니다.")
+
+READ = "read"
+WRITE = "write"
+
+
+class LaneBusy(Exception):
+    pass
+
+
+class DbTimeout(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class _Job:
+    """
+    차선에 넣은 작업 하나. 시작 전에 취소되면 실행하지 않고, 실행 중에 취소되면 그 작업이 쓰고 있는
+    읽기 커넥션에 interrupt 를 보내 진행 중인 쿼리를 멈춥니다. (writer 커넥션은 건드리지 않음)
+    """
+
+    __slots__ = ("fn", "context", "cancelled", "_conns", "_lock")
+
+    def __init__(self, fn: Callable[["_Job"], Any]):
+        self.fn = fn
+        # 요청별 계측(metrics)이 차선 스레드에서도 이어지도록 컨텍스트를 함께 넘깁니다.
+        self.context = contextvars.copy_context()
+        self.cancelled = False
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def run(self) -> Any:
+        if self.cancelled:
+            return None
+        return self.context.run(self.fn, self)
+
+    def track(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if self.cancelled:
+                conn.interrupt()
+            self._conns.append(conn)
+
+    def untrack(self, conn: sqlite3.Connection) -> None:
+        # 커넥션을 풀에 돌려주기 전에 호출합니다. (다른 요청의 쿼리를 멈추지 않도록)
+        with self._lock:
+            self._conns.remove(conn)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            for conn in self._conns:
+                conn.interrupt()
+
+
+class Lane:
+    """크기가 정해진 스레드풀 하나와 대기열 한도"""
+
+    def __init__(self, name: str, threads: int, max_queue: int):
+        self.name = name
+        self.threads = max(1, threads)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix=f"sns-db-{self.name}")
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, job: _Job) -> "Future[Any]":
+        with self._lock:
+            if self.pending >= self.threads + self.max_queue:
+                self.rejected += 1
+                raise LaneBusy(f"DB {self.name} 작업이 밀려 있습니다. 잠시 후 다시 시도하세요.")
+            self.pending += 1
+            self.submitted += 1
+        future = self._executor.submit(job.run)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def count_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def count_cancelled(self) -> None:
+        with self._lock:
+            self.cancelled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self.pending
+            submitted, rejected, timeouts, cancelled = self.submitted, self.rejected, self.timeouts, self.cancelled
+        return {
+            "threads": self.threads,
+            "maxQueue": self.max_queue,
+            "running": min(pending, self.threads),
+            "queued": max(pending - self.threads, 0),
+            "submitted": submitted,
+            "rejected": rejected,
+            "timeouts": timeouts,
+            "cancelled": cancelled,
+        }
+
+
+class DbExecutor:
+    """
+    async 모드의 DB 작업 실행기. 읽기 / 쓰기 차선을 나눠 느린 쓰기(SQLite 쓰기 잠금, group commit 대기)가
+    읽기 스레드를 모두 차지하지 않도록 하고, 요청마다 제한 시간과 클라이언트 연결 끊김을 확인합니다.
+    이벤트 루프는 DB 를 기다리는 동안 다른 요청을 받으므로, 스레드가 모자라면 요청이 스레드풀에
+    쌓이는 대신 차선 대기열 한도에서 바로 503 을 받습니다.
+    """
+
+    def __init__(self, read_threads: int = READ_THREADS, write_threads: int = WRITE_THREADS,
+                 max_queue: int = LANE_QUEUE, timeout: float = REQUEST_TIMEOUT,
+                 disconnect_poll: float = DISCONNECT_POLL):
+        self.lanes: Dict[str, Lane] = {READ: Lane(READ, read_threads, max_queue),
+                                       WRITE: Lane(WRITE, write_threads, max_queue)}
+        self.timeout = timeout
+        self.disconnect_poll = disconnect_poll
+        self.disconnects = 0
+
+    def start(self) -> None:
+        for lane in self.lanes.values():
+            lane.start()
+
+    def stop(self) -> None:
+        # 이미 받은 작업(특히 쓰기)은 끝까지 실행합니다.
+        for lane in self.lanes.values():
+            lane.stop()
+
+    async def run(self, lane_name: str, fn: Callable[[_Job], Any], request: Optional[Request] = None) -> Any:
+        """fn(job) 을 차선에서 실행하고 결과를 돌려줍니다. 제한 시간이 지나거나 연결이 끊기면 작업을 취소합니다."""
+        lane = self.lanes[lane_name]
+        job = _Job(fn)
+        future = asyncio.wrap_future(lane.submit(job))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout > 0 else None
+        try:
+            while True:
+                wait = self.disconnect_poll if request is not None else None
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        lane.count_timeout()
+                        raise DbTimeout("DB 작업 시간이 초과되었습니다.")
+                    wait = remaining if wait is None else min(wait, remaining)
+                done, _ = await asyncio.wait({future}, timeout=wait)
+                if done:
+                    return future.result()
+                if request is not None and await request.is_disconnected():
+                    self.disconnects += 1
+                    raise ClientDisconnected()
+        except BaseException:
+            if not future.done():
+                # 아직 시작하지 않은 작업은 실행하지 않고, 실행 중인 읽기 쿼리는 interrupt 로 멈춥니다.
+                # (이미 writer 에 넘긴 쓰기는 되돌릴 수 없으므로 끝까지 실행되고 결과만 버립니다)
+                job.cancel()
+                lane.count_cancelled()
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "mode": HANDLER_MODE,
+            "timeout": self.timeout,
+            "disconnects": self.disconnects,
+            **{name: lane.stats() for name, lane in self.lanes.items()},
+        }
+
+
+db_executor = DbExecutor()
+
+
+# ------------------------------------------------
+# 핸들러 감싸기 (async 모드)
+# ------------------------------------------------
+def _generator_dependencies(sig: inspect.Signature) -> Dict[str, Callable]:
+    # Depends(동기 제너레이터) 인자: 커넥션을 빌려주는 dependency (storage.get_post_conn)
+    return {name: param.default.dependency for name, param in sig.parameters.items()
+            if isinstance(param.default, Depends) and inspect.isgeneratorfunction(param.default.dependency)}
+
+
+def to_async(endpoint: Callable, lane_name: str, executor: DbExecutor = db_executor) -> Callable:
+    """
+    동기 핸들러를 같은 인자를 받는 async 핸들러로 바꿉니다. 핸들러 본문은 차선 스레드에서 실행되고,
+    커넥션을 빌려주는 동기 제너레이터 dependency 도 FastAPI 스레드풀 대신 같은 차선 스레드에서 엽니다.
+    """
+    sig = inspect.signature(endpoint)
+    dependencies = {name: (dependency, list(inspect.signature(dependency).parameters))
+                    for name, dependency in _generator_dependencies(sig).items()}
+    params = [p for name, p in sig.parameters.items() if name not in dependencies]
+    request_name = next((p.name for p in params if p.annotation is Request), None)
+    if request_name is None:
+        # 연결 끊김을 확인하려고 Request 를 받습니다. (핸들러에는 넘기지 않음)
+        params.append(inspect.Parameter("_db_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+
+    def call(job: _Job, kwargs: dict) -> Any:
+        with ExitStack() as stack:
+            for name, (dependency, arg_names) in dependencies.items():
+                conn = stack.enter_context(contextmanager(dependency)(**{a: kwargs[a] for a in arg_names}))
+                job.track(conn)
+                stack.callback(job.untrack, conn)
+                kwargs[name] = conn
+            return endpoint(**kwargs)
+
+    async def wrapper(**kwargs):
+        request = kwargs[request_name] if request_name is not None else kwargs.pop("_db_request")
+        return await executor.run(lane_name, functools.partial(call, kwargs=kwargs), request)
+
+    wrapper.__signature__ = sig.replace(parameters=params)
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__qualname__ = endpoint.__qualname__
+    wrapper.__doc__ = endpoint.__doc__
+    return wrapper
+
+
+class LaneRoute(InstrumentedRoute):
+    """
+    SNS_HANDLER_MODE=async 이면 동기 핸들러를 to_async 로 감싸서 등록하는 APIRoute.
+    (GET 은 읽기 차선, 그 밖은 쓰기 차선. 원래 async 인 핸들러는 그대로 둡니다)
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if HANDLER_MODE == "async" and not inspect.iscoroutinefunction(endpoint):
+            methods = kwargs.get("methods") or ["GET"]
+            lane_name = READ if set(methods) <= {"GET", "HEAD"} else WRITE
+            endpoint = to_async(endpoint, lane_name)
+        super().__init__(path, endpoint, **kwargs)
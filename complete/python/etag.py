@@ -0,0 +1,50 @@
+import hashlib
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+# ETag 는 모두 약한 ETag(W/"...") 입니다. 같은 내용이 gzip / 압축하지 않은 본문으로 나가는데
+# GZipMiddleware 는 ETag 를 바꾸지 않으므로, 바이트 단위로 같음을 약속하는 강한 ETag 를 쓸 수 없습니다.
+_WEAK = "W/"
+
+
+def _weak(digest: str) -> str:
+    return _WEAK + '"' + digest + '"'
+
+
+def row_etag(row: tuple) -> str:
+    # 행의 모든 컬럼(updatedAt, 카운트, 내용 포함)으로 만든 ETag
+    return _weak(hashlib.blake2b(repr(row).encode(), digest_size=12).hexdigest())
+
+
+def list_etag(rows: Iterable[tuple], cursor: Optional[str], columns: Optional[Tuple[str, ...]] = None) -> str:
+    # 목록 ETag 는 페이지에 포함된 행과 다음 페이지 커서를 한 번에 해시합니다.
+    # 필드를 골라 읽은 목록은 값이 같아도 표현이 다르므로 컬럼 이름도 함께 넣습니다.
+    h = hashlib.blake2b(digest_size=12)
+    if columns is not None:
+        h.update(repr(columns).encode())
+    for row in rows:
+        h.update(repr(row).encode())
+    h.update(repr(cursor).encode())
+    return _weak(h.hexdigest())
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match 는 약한 비교를 사용하므로 양쪽 모두 W/ 접두사는 무시합니다.
+    opaque = etag[len(_WEAK):] if etag.startswith(_WEAK) else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith(_WEAK):
+            candidate = candidate[len(_WEAK):]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 실시간 이벤트(SSE) 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 클라이언트마다 아직 보내지 못한 이벤트를 쌓아 둘 수 있는 수. 넘치면 그 클라이언트의 연결을 끊습니다.
+CLIENT_BUFFER = int(os.environ.get("SNS_EVENTS_CLIENT_BUFFER", "256"))
+# likeCount / commentCount 변경을 모아서 보내는 주기(초). 그동안 같은 포스트가 여러 번 바뀌어도 한 번만 보냅니다.
+COALESCE_INTERVAL = float(os.environ.get("SNS_EVENTS_COALESCE_INTERVAL", "0.25"))
+# 이벤트가 없을 때 연결이 끊기지 않도록 주석 줄을 보내는 주기(초)
+KEEPALIVE_INTERVAL = float(os.environ.get("SNS_EVENTS_KEEPALIVE", "15"))
+# 동시에 연결할 수 있는 최대 클라이언트 수 (워커마다)
+MAX_CLIENTS = int(os.environ.get("SNS_EVENTS_MAX_CLIENTS", "1000"))
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+
+def encode(event: str, data: Any) -> bytes:
+    """SSE 한 건 (event / data 줄). data 는 한 줄 JSON 입니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n".encode()
+
+
+# 버퍼가 넘친 클라이언트에게 마지막으로 보내는 이벤트 (다시 연결해서 목록을 새로 읽어야 함)
+OVERFLOW_FRAME = encode("overflow", {"message": "이벤트를 제때 받지 못해 연결을 끊습니다. 목록을 다시 조회하세요."})
+
+
+class Subscriber:
+    """SSE 연결 하나. 보낼 이벤트(이미 직렬화된 bytes)를 크기가 정해진 큐에 쌓습니다."""
+
+    __slots__ = ("queue",)
+
+    def __init__(self, buffer: int):
+        # None 은 연결을 끝내라는 표시입니다.
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(max(buffer, 2))
+
+
+class EventHub:
+    """
+    변경 이벤트를 SSE 구독자 전체에 보내는 asyncio 팬아웃 허브.
+
+    - 이벤트는 발생한 스레드에서 한 번만 직렬화하고, 같은 bytes 를 모든 구독자의 큐에 넣습니다.
+    - likeCount / commentCount 변경은 touch_counts 로 포스트 id 만 모아 두었다가
+      COALESCE_INTERVAL 마다 한 번 읽어서 포스트별 post.counts 이벤트 하나로 보냅니다.
+    - 구독자마다 큐 크기가 정해져 있어 느린 클라이언트 때문에 메모리가 늘지 않습니다.
+      큐가 넘치면 overflow 이벤트를 보내고 그 연결만 끊습니다.
+    - 구독자가 없으면 직렬화도 하지 않습니다. 여러 워커로 실행하면 다른 워커의 구독자 수(remote_subscribers)도
+      함께 보고, 어느 워커에도 구독자가 없으면 공유 기록에도 남기지 않습니다.
+    """
+
+    def __init__(self, buffer: int = CLIENT_BUFFER, coalesce_interval: float = COALESCE_INTERVAL,
+                 keepalive: float = KEEPALIVE_INTERVAL, max_clients: int = MAX_CLIENTS):
+        self.buffer = buffer
+        self.coalesce_interval = coalesce_interval
+        self.keepalive = keepalive
+        self.max_clients = max_clients
+        # 다른 워커에 이벤트를 전달하는 함수와 다른 워커들의 구독자 수 (cache_sync.CacheSync 가 설정)
+        self.on_frame: Optional[Callable[[bytes], None]] = None
+        self.remote_subscribers = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[Subscriber] = set()
+        self._count_loader: Optional[Callable[[Set[int]], List[dict]]] = None
+        self._lock = threading.Lock()
+        self._dirty: Set[int] = set()
+        self._counts_scheduled = False
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped_clients = 0
+        self.count_changes = 0
+
+    # ------------------------------------------------
+    # 시작 / 종료 (이벤트 루프에서 호출)
+    # ------------------------------------------------
+    def start(self, count_loader: Callable[[Set[int]], List[dict]]) -> None:
+        """count_loader(postIds) 는 [{"id", "likeCount", "commentCount"}, ...] 를 돌려줘야 합니다."""
+        self._loop = asyncio.get_running_loop()
+        self._count_loader = count_loader
+
+    def stop(self) -> None:
+        for subscriber in list(self._subscribers):
+            self._close(subscriber, None)
+        self._loop = None
+
+    @property
+    def active(self) -> bool:
+        if self._loop is None:
+            return False
+        return bool(self._subscribers) or (self.on_frame is not None and self.remote_subscribers > 0)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_clients
+
+    # ------------------------------------------------
+    # 이벤트 보내기 (어느 스레드에서나 호출 가능)
+    # ------------------------------------------------
+    def publish(self, event: str, data: Any) -> None:
+        if not self.active:
+            return
+        frame = encode(event, data)
+        self.published += 1
+        if self.on_frame is not None:
+            # 여러 워커로 실행 중이면 모든 워커가 공유 기록에서 같은 순서로 받아 보냅니다. (이 워커 포함)
+            self.on_frame(frame)
+        else:
+            self.deliver(frame)
+
+    def publish_many(self, event: str, items: Iterable[Any]) -> None:
+        for data in items:
+            self.publish(event, data)
+
+    def deliver(self, frame: bytes) -> None:
+        """직렬화된 이벤트를 이 워커의 구독자에게 보냅니다. (공유 기록에서 받은 이벤트도 여기로)"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, frame)
+        except RuntimeError:
+            # 종료 중이라 이벤트 루프가 닫혔습니다.
+            pass
+
+    def touch_counts(self, post_ids: Iterable[int]) -> None:
+        """likeCount / commentCount 가 바뀐 포스트를 표시합니다. 모아서 한 번에 보냅니다."""
+        loop = self._loop
+        if not self.active:
+            return
+        with self._lock:
+            before = len(self._dirty)
+            self._dirty.update(post_ids)
+            self.count_changes += len(self._dirty) - before
+            if self._counts_scheduled or not self._dirty:
+                return
+            self._counts_scheduled = True
+        try:
+            loop.call_soon_threadsafe(loop.call_later, self.coalesce_interval, self._flush_counts)
+        except RuntimeError:
+            pass
+
+    def _flush_counts(self) -> None:
+        with self._lock:
+            post_ids, self._dirty = self._dirty, set()
+            self._counts_scheduled = False
+        if post_ids and self._loop is not None:
+            # DB 를 읽으므로 이벤트 루프 밖에서 실행합니다.
+            self._loop.run_in_executor(None, self._publish_counts, post_ids)
+
+    def _publish_counts(self, post_ids: Set[int]) -> None:
+        try:
+            self.publish_many("post.counts", self._count_loader(post_ids))
+        except Exception:
+            logger.exception("post.counts 이벤트를 만들지 못했습니다.")
+
+    # ------------------------------------------------
+    # 구독 (이벤트 루프에서 호출)
+    # ------------------------------------------------
+    async def stream(self, limit: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        SSE 본문. 연결되면 ready 이벤트를 먼저 보내고, limit 개(ready 포함)를 보냈거나
+        버퍼가 넘치면 끝납니다. 클라이언트가 연결을 끊으면 구독도 바로 정리됩니다.
+        """
+        subscriber = Subscriber(self.buffer)
+        self._subscribers.add(subscriber)
+        sent = 0
+        try:
+            yield encode("ready", {"buffer": self.buffer, "coalesceInterval": self.coalesce_interval})
+            sent += 1
+            while limit is None or sent < limit:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_FRAME
+                    continue
+                if frame is None:
+                    break
+                yield frame
+                if frame is not OVERFLOW_FRAME:
+                    sent += 1
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _fanout(self, frame: bytes) -> None:
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(frame)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._close(subscriber, OVERFLOW_FRAME)
+                self.dropped_clients += 1
+
+    def _close(self, subscriber: Subscriber, last: Optional[bytes]) -> None:
+        # 더는 이벤트를 넣지 않고, 남은 큐를 비운 뒤 마지막 이벤트와 종료 표시를 넣습니다.
+        self._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        if last is not None:
+            subscriber.queue.put_nowait(last)
+        subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending_counts = len(self._dirty)
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "droppedClients": self.dropped_clients,
+            "countChanges": self.count_changes,
+            "pendingCounts": pending_counts,
+        }
+
+
+event_hub = EventHub()
@@ -0,0 +1,158 @@
+import os
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+# ------------------------------------------------
+# JSON 직렬화 빠른 경로 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 1 이면 포스트 / 댓글 조회 응답을 행에서 바로 JSON 바이트로 만들고, 0 이면 응답 모델(response_model) 경로를 씁니다.
+FAST_JSON = os.environ.get("SNS_FAST_JSON", "1") != "0"
+# 인코딩해 둔 포스트 / 댓글 조각(fragment)을 기억하는 최대 개수. 0 이면 조각을 캐시하지 않습니다. (워커마다)
+FRAGMENT_MAX_ENTRIES = int(os.environ.get("SNS_JSON_FRAGMENTS", "50000"))
+
+JSON_MEDIA_TYPE = "application/json"
+
+# 행에서 바로 인코딩할 수 있는 응답 모델 필드 타입. 다른 타입의 필드가 있으면 인코더를 만들 때 실패합니다.
+_SUPPORTED_TYPES = (int, str)
+
+# 만들어진 인코더 목록 (통계용)
+_encoders: List["RowEncoder"] = []
+
+
+class RowEncoder:
+    """
+    응답 모델 하나에 맞춘 행(tuple) -> JSON 바이트 인코더.
+
+    만들 때 모델의 필드마다 컬럼 위치와 타입을 맞춰 보고(없는 컬럼, 별칭, 지원하지 않는 타입이면 ValueError),
+    인코딩할 때는 값의 타입만 확인한 뒤 모델 검증 없이 pydantic-core 의 JSON 인코더로 바로 씁니다.
+    타입이 다른 값(NULL 등)이 있는 행은 응답 모델로 검증해서 인코딩하므로 결과 바이트와 검증 오류는
+    response_model 경로와 같습니다. (필드 순서도 모델 정의 순서를 따릅니다)
+    """
+
+    def __init__(self, kind: str, model: Type[BaseModel], columns: Tuple[str, ...]):
+        self.kind = kind
+        self.columns = columns
+        self.adapter = TypeAdapter(model)
+        positions = {column: i for i, column in enumerate(columns)}
+        for name, field in model.model_fields.items():
+            if name not in positions:
+                raise ValueError(f"{model.__name__}.{name} 에 해당하는 컬럼이 없습니다.")
+            if field.alias not in (None, name) or field.serialization_alias not in (None, name):
+                raise ValueError(f"{model.__name__}.{name} 의 별칭은 지원하지 않습니다.")
+            if field.annotation not in _SUPPORTED_TYPES:
+                raise ValueError(f"{model.__name__}.{name} 의 타입 {field.annotation} 은 지원하지 않습니다.")
+        # 모델 필드 순서대로 (이름, 타입) 과 그 순서로 값을 꺼내는 함수
+        self.names = tuple(model.model_fields)
+        self.types = tuple(field.annotation for field in model.model_fields.values())
+        self._values = itemgetter(*(positions[name] for name in self.names))
+        self.fallbacks = 0
+        _encoders.append(self)
+
+    def encode(self, row: tuple) -> bytes:
+        values = self._values(row)
+        # bool 은 int 의 하위 타입이므로 isinstance 대신 타입을 정확히 비교합니다.
+        if tuple(map(type, values)) != self.types:
+            return self._validated(row)
+        return to_json(dict(zip(self.names, values)))
+
+    def _validated(self, row: tuple) -> bytes:
+        self.fallbacks += 1
+        return self.adapter.dump_json(self.adapter.validate_python(dict(zip(self.columns, row))))
+
+
+def with_fields(fragment: bytes, extra: bytes) -> bytes:
+    """객체 조각 끝에 필드를 덧붙입니다. (예: 피드의 comments, likedByViewer)"""
+    return fragment[:-1] + b"," + extra + b"}"
+
+
+def join(fragments: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+class FragmentCache:
+    """
+    (종류, id) -> (행, JSON 조각) LRU 캐시. 키는 읽기 캐시의 태그와 같은 모양(("post", 1), ("comment", 2))이라서
+    읽기 캐시가 태그를 지울 때(on_evict) 같은 키의 조각도 지웁니다.
+
+    조각은 저장해 둔 행과 지금 읽은 행이 같을 때만 씁니다. 그래서 변경과 조회가 엇갈려 옛 행의 조각이
+    남더라도 틀린 응답을 만들지 않고, 무효화는 바뀐 조각을 일찍 버려 메모리를 아끼는 역할만 합니다.
+    """
+
+    def __init__(self, max_entries: int = FRAGMENT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[tuple, bytes]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def encode(self, encoder: RowEncoder, rows: List[tuple]) -> List[bytes]:
+        """행마다 JSON 조각을 돌려줍니다. 캐시에 없거나 행이 바뀐 것만 인코딩합니다."""
+        if self.max_entries <= 0:
+            return [encoder.encode(row) for row in rows]
+        fragments: List[Optional[bytes]] = []
+        missing = []
+        with self._lock:
+            for row in rows:
+                key = (encoder.kind, row[0])
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == row:
+                    self._entries.move_to_end(key)
+                    fragments.append(entry[1])
+                else:
+                    missing.append(len(fragments))
+                    fragments.append(None)
+            self.hits += len(rows) - len(missing)
+            self.misses += len(missing)
+        if not missing:
+            return fragments
+
+        # 인코딩은 잠금 밖에서 하고 저장만 한 번에 합니다.
+        for i in missing:
+            fragments[i] = encoder.encode(rows[i])
+        with self._lock:
+            for i in missing:
+                self._entries[(encoder.kind, rows[i][0])] = (rows[i], fragments[i])
+                self._entries.move_to_end((encoder.kind, rows[i][0]))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragments
+
+    def encode_one(self, encoder: RowEncoder, row: tuple) -> bytes:
+        return self.encode(encoder, [row])[0]
+
+    def evict(self, tags: Optional[Iterable[Hashable]]) -> None:
+        """읽기 캐시의 on_evict. tags 가 None 이면 모두 지웁니다."""
+        with self._lock:
+            if tags is None:
+                self._entries.clear()
+                return
+            for tag in tags:
+                if self._entries.pop(tag, None) is not None:
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": FAST_JSON,
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "fallbacks": sum(encoder.fallbacks for encoder in _encoders),
+            }
+
+
+fragments = FragmentCache()
@@ -0,0 +1,139 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+logger = logging.getLogger("launcher")
+
+# ------------------------------------------------
+# 여러 워커 프로세스로 실행 (환경 변수로 조정 가능)
+# ------------------------------------------------
+WORKERS = int(os.environ.get("SNS_WORKERS", str(os.cpu_count() or 1)))
+# 워커가 이 시간(초) 안에 다시 죽으면 다시 띄우기 전에 기다립니다.
+RESTART_BACKOFF = float(os.environ.get("SNS_WORKER_RESTART_BACKOFF", "1"))
+
+
+def prepare() -> None:
+    """
+    워커를 띄우기 전에 한 번만 할 일: 스키마 마이그레이션(샤드 수 확인 포함)과
+    워커 수가 바뀌어 주인이 없어진 좋아요 저널까지 모두 반영합니다.
+    """
+    from likes import recover_journals
+    from storage import storage
+
+    storage.open()
+    try:
+        recover_journals(storage)
+    finally:
+        storage.close()
+
+
+def _serve(config_kwargs: dict, sockets: List[socket.socket], worker_id: int, workers: int) -> None:
+    # 앱 모듈은 import 할 때 환경 변수를 읽으므로 main 을 불러오기 전에 워커 정보를 넘깁니다.
+    os.environ["SNS_WORKER_ID"] = str(worker_id)
+    os.environ["SNS_WORKERS"] = str(workers)
+    import uvicorn
+
+    uvicorn.Server(uvicorn.Config("main:app", **config_kwargs)).run(sockets=sockets)
+
+
+class Supervisor:
+    """
+    주소를 한 번만 열고 같은 소켓을 나눠 받는 워커 프로세스 N 개를 띄웁니다.
+
+    워커마다 SNS_WORKER_ID 가 달라 좋아요 저널을 따로 쓰고, 읽기 캐시는 cache_sync.py 로
+    다른 워커의 변경을 따라 지웁니다. SNS_WORKERS 가 2 이상이면 좋아요 여부는 요청마다
+    DB 에서 정합니다. (likes.py) 워커가 비정상 종료하면 같은 번호로 다시 띄우므로
+    그 워커가 반영하지 못한 좋아요는 새 워커가 저널에서 복구합니다.
+    """
+
+    def __init__(self, workers: int, host: str, port: int, log_level: str = "info"):
+        self.workers = workers
+        self.config_kwargs = {"host": host, "port": port, "log_level": log_level}
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._started_at: Dict[int, float] = {}
+        self._sockets: List[socket.socket] = []
+        self._stopping = False
+
+    def run(self) -> int:
+        import uvicorn
+
+        prepare()
+        sock = uvicorn.Config("main:app", **self.config_kwargs).bind_socket()
+        self._sockets = [sock]
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        logger.info("워커 %d개를 시작합니다. (http://%s:%d)", self.workers,
+                    self.config_kwargs["host"], self.config_kwargs["port"])
+        try:
+            for worker_id in range(self.workers):
+                self._spawn(worker_id)
+            while not self._stopping:
+                time.sleep(0.5)
+                self._restart_dead()
+        finally:
+            self._shutdown()
+            sock.close()
+        return 0
+
+    def _spawn(self, worker_id: int) -> None:
+        process = self._context.Process(
+            target=_serve, name=f"sns-worker-{worker_id}",
+            kwargs={"config_kwargs": self.config_kwargs, "sockets": self._sockets,
+                    "worker_id": worker_id, "workers": self.workers},
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._started_at[worker_id] = time.monotonic()
+
+    def _restart_dead(self) -> None:
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive() or self._stopping:
+                continue
+            logger.warning("워커 %d (pid %s) 가 종료 코드 %s 로 끝났습니다. 다시 시작합니다.",
+                           worker_id, process.pid, process.exitcode)
+            if time.monotonic() - self._started_at[worker_id] < RESTART_BACKOFF:
+                time.sleep(RESTART_BACKOFF)
+            self._spawn(worker_id)
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _shutdown(self) -> None:
+        # 워커마다 남은 좋아요와 쓰기 작업을 반영하고 끝나도록 SIGTERM 을 보내고 기다립니다.
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(30)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python launcher.py", description="Simple SNS 서버를 여러 워커 프로세스로 실행")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"워커 프로세스 수 (기본: {WORKERS})")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None) -> int:
+    args = _parse_args(argv)
+    if args.workers < 1:
+        print("--workers 는 1 이상이어야 합니다.", file=sys.stderr)
+        return 2
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+    return Supervisor(args.workers, args.host, args.port, args.log_level).run()
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
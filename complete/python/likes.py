@@ -0,0 +1,485 @@
+import datetime
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import repository
+from db import DB_PATH
+from storage import Shard, ShardedStorage
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 좋아요 쓰기 지연(write-behind) 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 모아둔 좋아요를 DB 에 반영하는 주기(초). 0 이하이면 요청마다 바로 반영합니다.
+FLUSH_INTERVAL = float(os.environ.get("SNS_LIKES_FLUSH_INTERVAL", "0.5"))
+# 대기 중인 좋아요가 이 개수를 넘으면 주기를 기다리지 않고 바로 반영합니다.
+MAX_PENDING = int(os.environ.get("SNS_LIKES_MAX_PENDING", "5000"))
+# memory : 메모리에만 보관 (프로세스가 죽으면 반영 전 좋아요는 사라짐)
+# journal: 저널 파일에 기록 후 응답 (프로세스가 죽어도 재시작 시 복구)
+# fsync  : journal + 매 기록마다 fsync (전원이 나가도 복구)
+DURABILITY = os.environ.get("SNS_LIKES_DURABILITY", "journal")
+JOURNAL_BASE_PATH = os.environ.get("SNS_LIKES_JOURNAL_PATH", DB_PATH + ".likes-journal")
+# launcher.py 로 여러 워커를 띄우면 워커마다 저널을 따로 씁니다. (sns.db.likes-journal.0, .1, ...)
+WORKER_ID = os.environ.get("SNS_WORKER_ID")
+JOURNAL_PATH = JOURNAL_BASE_PATH if WORKER_ID is None else f"{JOURNAL_BASE_PATH}.{WORKER_ID}"
+
+# 여러 워커로 실행하면(SNS_WORKERS > 1) 워커는 다른 워커의 대기 항목을 볼 수 없으므로, 좋아요 / 취소 여부는
+# 요청 안에서 DB 에 바로 기록해서 정하고 likeCount 만 모아서 다시 셉니다.
+SHARED = int(os.environ.get("SNS_WORKERS", "1")) > 1
+
+DURABILITY_MODES = ("memory", "journal", "fsync")
+
+Key = Tuple[int, str]
+
+
+class _Intent:
+    __slots__ = ("liked", "at")
+
+    def __init__(self, liked: bool, at: str):
+        self.liked = liked
+        self.at = at
+
+
+class LikeAggregator:
+    """
+    좋아요/좋아요 취소를 메모리에 모았다가 주기적으로 한 트랜잭션에 반영합니다.
+
+    대기 중인 항목은 (postId, userName) 별로 "최종적으로 좋아요 상태인지" 만 기억하므로
+    같은 사용자가 여러 번 눌렀다 취소해도 DB 에는 마지막 상태만 반영됩니다.
+    반영이 끝날 때까지 대기 항목을 지우지 않기 때문에, 어느 시점이든
+    "대기 항목이 있으면 대기 항목, 없으면 DB" 가 실제 상태입니다.
+
+    shared 이면(여러 워커) 대기 항목을 두지 않고 likes 행을 샤드의 writer 로 바로 추가 / 삭제해서
+    RETURNING 결과로 중복을 판단합니다. 바뀐 포스트만 기억했다가 likeCount 를 likes 에서 다시 세므로
+    어느 워커가 먼저 반영해도 결과가 같습니다.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING,
+                 durability: str = DURABILITY, journal_path: str = JOURNAL_PATH, shared: bool = SHARED):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"SNS_LIKES_DURABILITY 는 {', '.join(DURABILITY_MODES)} 중 하나여야 합니다.")
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self.journal_path = journal_path
+        self.shared = shared
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Key, _Intent] = {}
+        # 대기 항목이 지워질 때마다(반영 / 포스트 삭제) 늘어나는 번호. 잠금 밖에서 읽은 DB 상태가 그사이
+        # 반영으로 낡았는지 확인하는 데 씁니다.
+        self._generation = 0
+        # fsync 를 여러 요청이 한 번에 하기 위한 저널 줄 번호 (_journal_seq 는 self._lock 으로 보호)
+        self._sync_lock = threading.Lock()
+        self._journal_seq = 0
+        self._synced_seq = 0
+        # likeCount 를 다시 세야 하는 포스트 -> (변경 번호, 마지막 변경 시각) (shared)
+        self._dirty: Dict[int, Tuple[int, str]] = {}
+        self._dirty_seq = 0
+        # likes 에 쓰는 중인 포스트별 요청 수. 쓰는 도중에 다시 센 값은 믿을 수 없으므로 표시를 지우지 않습니다.
+        self._writing: Dict[int, int] = {}
+        self._journal = None
+        self._storage: Optional[ShardedStorage] = None
+        self._on_flush: Optional[Callable[[Iterable[int]], None]] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushes = 0
+        self.flushed_intents = 0
+
+    @property
+    def write_behind(self) -> bool:
+        return self.flush_interval > 0
+
+    # ------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------
+    def start(self, storage: ShardedStorage, on_flush: Optional[Callable[[Iterable[int]], None]] = None) -> None:
+        self._storage = storage
+        self._on_flush = on_flush
+        if self.durability != "memory":
+            self._recover()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if self.write_behind:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="like-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        # 종료 시 남은 좋아요를 모두 반영합니다.
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # 실패한 항목은 대기 목록에 남아 다음 주기에 다시 시도됩니다.
+                logger.exception("좋아요 반영에 실패했습니다.")
+
+    # ------------------------------------------------
+    # 좋아요 / 좋아요 취소 기록
+    # ------------------------------------------------
+    def like(self, conn: sqlite3.Connection, post_id: int, user_name: str) -> Optional[bool]:
+        """좋아요를 기록합니다. 이미 좋아요 상태이면 False, 포스트가 없으면 None 을 돌려줍니다."""
+        return self._record(conn, post_id, user_name, True)
+
+    def unlike(self, conn: sqlite3.Connection, post_id: int, user_name: str) -> Optional[bool]:
+        """좋아요 취소를 기록합니다. 좋아요 상태가 아니면 False, 포스트가 없으면 None 을 돌려줍니다."""
+        return self._record(conn, post_id, user_name, False)
+
+    def _record(self, conn: sqlite3.Connection, post_id: int, user_name: str, liked: bool) -> Optional[bool]:
+        key = (post_id, user_name)
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if self.shared:
+            return self._record_shared(key, liked, now)
+        while True:
+            with self._lock:
+                intent = self._pending.get(key)
+                generation = self._generation
+            # 대기 항목이 없으면 DB 가 실제 상태입니다. (반영 중에도 대기 항목은 남아 있음)
+            # 포스트 존재 확인과 좋아요 여부를 한 쿼리로, 다른 좋아요를 막지 않도록 잠금 밖에서 읽습니다.
+            in_db = repository.like_state(conn, post_id, user_name) if intent is None else None
+            with self._lock:
+                intent = self._pending.get(key)
+                if intent is None and self._generation != generation:
+                    # 읽는 사이에 반영되어 대기 항목이 지워졌으면 읽은 값이 낡았을 수 있으므로 다시 읽습니다.
+                    continue
+                if intent is not None:
+                    # 삭제된 포스트의 대기 항목은 discard_post 로 지워지므로 포스트가 있는 것입니다.
+                    current = intent.liked
+                elif in_db is None:
+                    return None
+                else:
+                    current = in_db
+                if current == liked:
+                    return False
+                self._pending[key] = _Intent(liked, now)
+                seq = self._append_journal(key, liked, now)
+                pending = len(self._pending)
+            break
+
+        self._sync_journal(seq)
+        if not self.write_behind:
+            self.flush()
+        elif pending >= self.max_pending:
+            self._wake.set()
+        return True
+
+    def like_many(self, conn: sqlite3.Connection, keys: Iterable[Key]) -> List[bool]:
+        """
+        여러 좋아요를 한 번에 기록하고, 각 항목이 새로 기록되었는지를 순서대로 돌려줍니다.
+        같은 배치 안의 중복 항목도 두 번째부터는 False 입니다.
+        """
+        keys = list(keys)
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if self.shared:
+            return self._like_many_shared(keys, now)
+        while True:
+            with self._lock:
+                unknown = {key for key in keys if key not in self._pending}
+                generation = self._generation
+            # 대기 항목이 없는 키의 DB 상태는 잠금 밖에서 한 쿼리로 읽습니다.
+            in_db = repository.liked_keys(conn, unknown)
+            with self._lock:
+                if self._generation != generation and any(key not in self._pending for key in keys):
+                    continue
+                results = []
+                seq = 0
+                for key in keys:
+                    intent = self._pending.get(key)
+                    current = intent.liked if intent is not None else key in in_db
+                    if current:
+                        results.append(False)
+                        continue
+                    self._pending[key] = _Intent(True, now)
+                    seq = self._append_journal(key, True, now)
+                    results.append(True)
+            break
+        self._sync_journal(seq)
+        return results
+
+    # ------------------------------------------------
+    # 여러 워커 (shared): likes 는 바로 기록하고 likeCount 만 나중에 다시 셉니다.
+    # ------------------------------------------------
+    def _record_shared(self, key: Key, liked: bool, now: str) -> Optional[bool]:
+        post_id, user_name = key
+
+        def write(conn: sqlite3.Connection) -> Optional[bool]:
+            changed = repository.insert_like_keys(conn, [(*key, now)]) if liked else repository.delete_likes(conn, [key])
+            if changed:
+                return True
+            # 바뀐 행이 없을 때만 포스트 존재 여부와 현재 상태를 읽습니다.
+            return None if repository.like_state(conn, post_id, user_name) is None else False
+
+        with self._writing_posts([post_id], now):
+            recorded = self._storage.for_post(post_id).write_queue.run(write)
+        if recorded:
+            self._mark_dirty([post_id], now)
+        return recorded
+
+    def _like_many_shared(self, keys: List[Key], now: str) -> List[bool]:
+        by_shard: Dict[Shard, List[Key]] = {}
+        for key in keys:
+            by_shard.setdefault(self._storage.for_post(key[0]), []).append(key)
+        added: Set[Key] = set()
+        with self._writing_posts({key[0] for key in keys}, now):
+            for shard, shard_keys in by_shard.items():
+                added |= shard.write_queue.run(
+                    lambda conn, ks=shard_keys: repository.insert_like_keys(conn, [(*key, now) for key in ks]))
+        self._mark_dirty({key[0] for key in added}, now)
+
+        # 같은 배치 안의 중복 항목은 두 번째부터 False 입니다.
+        results = []
+        for key in keys:
+            results.append(key in added)
+            added.discard(key)
+        return results
+
+    @contextmanager
+    def _writing_posts(self, post_ids: Iterable[int], now: str) -> Iterator[None]:
+        # 쓰기 전에 먼저 표시하고 저널에 남겨 두므로, commit 직후 프로세스가 죽어도 재시작할 때 다시 셉니다.
+        post_ids = list(post_ids)
+        seq = 0
+        with self._lock:
+            for post_id in post_ids:
+                self._writing[post_id] = self._writing.get(post_id, 0) + 1
+                self._dirty_seq += 1
+                self._dirty[post_id] = (self._dirty_seq, max(now, self._dirty.get(post_id, (0, ""))[1]))
+                seq = self._append_journal((post_id, None), None, now)
+        self._sync_journal(seq)
+        try:
+            yield
+        finally:
+            with self._lock:
+                for post_id in post_ids:
+                    remaining = self._writing[post_id] - 1
+                    if remaining:
+                        self._writing[post_id] = remaining
+                    else:
+                        del self._writing[post_id]
+
+    def _mark_dirty(self, post_ids: Iterable[int], now: str) -> None:
+        # commit 된 뒤에 다시 표시해서, 쓰는 동안 반영(flush)이 먼저 센 값을 바로잡습니다.
+        with self._lock:
+            for post_id in post_ids:
+                self._dirty_seq += 1
+                self._dirty[post_id] = (self._dirty_seq, max(now, self._dirty.get(post_id, (0, ""))[1]))
+            pending = len(self._dirty)
+        if not self.write_behind:
+            self.flush()
+        elif pending >= self.max_pending:
+            self._wake.set()
+
+    def liked_posts(self, conn: sqlite3.Connection, post_ids: Iterable[int], user_name: str) -> Set[int]:
+        """post_ids 중 user_name 이 좋아요한 포스트. 아직 반영되지 않은 좋아요 / 취소도 포함합니다."""
+        post_ids = list(post_ids)
+        with self._lock:
+            # 대기 항목이 없는 포스트만 DB 에서 한 쿼리로 읽습니다.
+            intents = {post_id: self._pending.get((post_id, user_name)) for post_id in post_ids}
+            liked = repository.liked_post_ids(conn, [p for p, i in intents.items() if i is None], user_name)
+        liked.update(post_id for post_id, intent in intents.items() if intent is not None and intent.liked)
+        return liked
+
+    def pending_for_user(self, user_name: str) -> Dict[int, bool]:
+        """
+        user_name 의 아직 반영되지 않은 좋아요 / 취소. (postId -> 좋아요 여부)
+        대기 항목은 DB 에 반영된 뒤에 지워지므로, 이것을 먼저 읽고 DB 를 읽으면 빠지는 항목이 없습니다.
+        """
+        with self._lock:
+            return {key[0]: intent.liked for key, intent in self._pending.items() if key[1] == user_name}
+
+    def discard_post(self, post_id: int) -> None:
+        # 삭제된 포스트의 대기 항목은 버립니다.
+        with self._lock:
+            for key in [k for k in self._pending if k[0] == post_id]:
+                del self._pending[key]
+            self._dirty.pop(post_id, None)
+            self._generation += 1
+
+    # ------------------------------------------------
+    # DB 반영
+    # ------------------------------------------------
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending and not self._dirty:
+                    return 0
+                batch = dict(self._pending)
+                dirty = dict(self._dirty)
+
+            by_shard: Dict[Shard, Tuple[Dict[Key, _Intent], Dict[int, Tuple[int, str]]]] = {}
+            for key, intent in batch.items():
+                by_shard.setdefault(self._storage.for_post(key[0]), ({}, {}))[0][key] = intent
+            for post_id, mark in dirty.items():
+                by_shard.setdefault(self._storage.for_post(post_id), ({}, {}))[1][post_id] = mark
+
+            # 샤드마다 한 트랜잭션으로 반영합니다. 한 샤드가 실패해도 앞서 반영된 샤드의 항목은 정리합니다.
+            flushed: Dict[Key, _Intent] = {}
+            recounted: Dict[int, Tuple[int, str]] = {}
+            try:
+                for shard, (intents, marks) in by_shard.items():
+                    with shard.pool.writer() as conn:
+                        if intents:
+                            self._apply(conn, intents)
+                        if marks:
+                            repository.recount_likes(conn, [(post_id, at) for post_id, (_, at) in marks.items()])
+                    flushed.update(intents)
+                    recounted.update(marks)
+            finally:
+                if flushed or recounted:
+                    with self._lock:
+                        # 반영하는 동안 바뀌지 않은 항목만 대기 목록에서 지웁니다.
+                        for key, intent in flushed.items():
+                            if self._pending.get(key) is intent:
+                                del self._pending[key]
+                        self._generation += 1
+                        for post_id, mark in recounted.items():
+                            if self._dirty.get(post_id) == mark and post_id not in self._writing:
+                                del self._dirty[post_id]
+                        self._compact_journal()
+                    self.flushes += 1
+                    self.flushed_intents += len(flushed) + len(recounted)
+                    if self._on_flush is not None:
+                        self._on_flush({key[0] for key in flushed} | set(recounted))
+        return len(batch) + len(dirty)
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, intents: Dict[Key, _Intent]) -> None:
+        # 포스트 수와 관계없이 추가 / 삭제 / likeCount 갱신을 각각 한 번에 실행합니다.
+        # 실제로 바뀐 행만 RETURNING 으로 돌아오므로 그 수만큼 likeCount 를 조정합니다.
+        last_at: Dict[int, str] = {}
+        for (post_id, _), intent in intents.items():
+            last_at[post_id] = max(last_at.get(post_id, ""), intent.at)
+        delta = repository.insert_likes(conn, [(*key, i.at) for key, i in intents.items() if i.liked])
+        delta.subtract(repository.delete_likes(conn, [key for key, i in intents.items() if not i.liked]))
+        repository.add_like_counts(conn, [(delta[post_id], at, post_id) for post_id, at in last_at.items()])
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending) + len(self._dirty)
+        return {
+            "shared": self.shared,
+            "pending": pending,
+            "flushes": self.flushes,
+            "flushedIntents": self.flushed_intents,
+            "flushInterval": self.flush_interval,
+            "durability": self.durability,
+        }
+
+    # ------------------------------------------------
+    # 저널 (_sync_journal 외에는 self._lock 을 잡은 상태에서 호출)
+    # ------------------------------------------------
+    # 줄마다 [postId, userName, liked, at]. userName 이 null 이면 likeCount 를 다시 셀 포스트입니다. (shared)
+    def _append_journal(self, key: Tuple[int, Optional[str]], liked: Optional[bool], at: str) -> int:
+        # 같은 키의 줄 순서와 _compact_journal 의 파일 교체를 지키기 위해 쓰기(OS 버퍼까지)는 잠금 안에서 하고,
+        # fsync 는 잠금을 놓은 뒤 _sync_journal 에서 합니다. 돌려준 줄 번호를 _sync_journal 에 넘깁니다.
+        if self._journal is None:
+            return 0
+        self._journal.write(json.dumps([key[0], key[1], liked, at], ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._journal_seq += 1
+        return self._journal_seq
+
+    def _sync_journal(self, seq: int) -> None:
+        # fsync 모드에서 seq 번째 줄까지 디스크에 기록된 뒤에 돌아옵니다. (self._lock 밖에서 호출)
+        # 한 요청이 fsync 하는 동안 기다린 요청들은 그 fsync 나 다음 한 번의 fsync 로 함께 끝납니다.
+        if self.durability != "fsync" or not seq:
+            return
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                if self._journal is None:
+                    return
+                target = self._journal_seq
+                # 잠금을 놓은 사이 _compact_journal 이 파일을 닫아도 쓸 수 있도록 복제한 fd 로 fsync 합니다.
+                fd = os.dup(self._journal.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._synced_seq = max(self._synced_seq, target)
+
+    def _compact_journal(self) -> None:
+        # 아직 반영되지 않은 항목만 남기고 저널을 다시 씁니다.
+        if self._journal is None:
+            return
+        self._journal.close()
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for (post_id, user_name), intent in self._pending.items():
+                f.write(json.dumps([post_id, user_name, intent.liked, intent.at], ensure_ascii=False) + "\n")
+            for post_id, (_, at) in self._dirty.items():
+                f.write(json.dumps([post_id, None, None, at]) + "\n")
+            f.flush()
+            if self.durability == "fsync":
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        # 아직 반영되지 않은 항목은 모두 새 파일에 fsync 되었습니다.
+        self._synced_seq = max(self._synced_seq, self._journal_seq)
+
+    def _recover(self) -> None:
+        # 이전 프로세스가 반영하지 못한 좋아요를 저널에서 읽어 바로 반영합니다.
+        # INSERT OR IGNORE / DELETE 결과 행 수로 likeCount 를 계산하므로 여러 번 반영해도 안전합니다.
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    post_id, user_name, liked, at = json.loads(line)
+                except ValueError:
+                    # 마지막 줄이 덜 쓰였을 수 있습니다.
+                    continue
+                if user_name is None:
+                    # 다시 세는 것은 여러 번 해도 결과가 같으므로 남아 있는 표시는 모두 다시 셉니다.
+                    self._dirty[post_id] = (0, max(at, self._dirty.get(post_id, (0, ""))[1]))
+                else:
+                    self._pending[(post_id, user_name)] = _Intent(liked, at)
+        if self._pending or self._dirty:
+            logger.info("저널에서 좋아요 %d 건, likeCount %d 건을 복구합니다.", len(self._pending), len(self._dirty))
+            self.flush()
+        os.remove(self.journal_path)
+
+
+def journal_paths() -> List[str]:
+    """반영되지 않은 항목이 남아 있는 단일 프로세스 / 워커별 저널 파일"""
+    candidates = [JOURNAL_BASE_PATH] + sorted(glob.glob(glob.escape(JOURNAL_BASE_PATH) + ".*"))
+    return [path for path in candidates
+            if (path == JOURNAL_BASE_PATH or path[len(JOURNAL_BASE_PATH) + 1:].isdigit())
+            and os.path.exists(path) and os.path.getsize(path) > 0]
+
+
+def recover_journals(storage: ShardedStorage) -> None:
+    """
+    남아 있는 저널을 모두 반영합니다. 워커 수가 줄어 주인이 없어진 저널도 반영되도록
+    launcher.py 가 워커를 띄우기 전에 호출합니다.
+    """
+    for path in journal_paths():
+        aggregator = LikeAggregator(flush_interval=0, durability="journal", journal_path=path)
+        aggregator.start(storage)
+        aggregator.stop()
+        os.remove(path)
+
+
+like_aggregator = LikeAggregator()
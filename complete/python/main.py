@@ -1,9 +1,35 @@
+import os
 import sqlite3
 import datetime
-from fastapi import FastAPI, Request, HTTPException, status, APIRouter, Depends
+import time
+from fastapi import FastAPI, Request, Response, HTTPException, status, APIRouter, Depends, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Set
+
+import admission
+import archive
+import json_cache
+import repository
+from pagination import InvalidCursor, NEXT_CURSOR_HEADER, clamp_limit, decode_cursor, encode_cursor, paginate, set_cursor_headers
+from cache import read_cache
+from cache_sync import cache_sync
+from db_executor import ClientDisconnected, DbTimeout, LaneBusy, LaneRoute, db_executor
+from events import EVENT_STREAM_MEDIA_TYPE, event_hub
+from etag import is_not_modified, list_etag, not_modified, row_etag
+from likes import like_aggregator
+from metrics import metrics
+from migrations import migrate
+from replica import get_read_conn, replicas
+from search import MAX_SEARCH_OFFSET, SEARCH_TYPES, search_all, to_match_query
+from storage import get_post_conn, merge_sorted, storage
+from trending import trending, trending_decay
+from transfer import NDJSON_MEDIA_TYPE, InvalidRecord, export_ndjson, import_ndjson
+from users import ALL_USERS, user_summaries, user_tag
+from write_queue import WriterBusy
 
 # Pydantic 모델 정의
 class PostBase(BaseModel):
@@ -54,6 +80,63 @@ class Like(LikeBase):
     class Config:
         from_attributes = True
 
+class LikeResult(Like):
+    status: int
+    message: str
+
+class ImportResult(BaseModel):
+    posts: int
+    comments: int
+    likes: int
+    skipped: int
+
+class FeedPost(Post):
+    comments: List[Comment]
+    likedByViewer: bool
+
+class TrendingPost(Post):
+    score: float
+
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    postId: int
+    userName: str
+    snippet: str
+    score: float
+
+class UserSummary(BaseModel):
+    userName: str
+    postCount: int
+    commentCount: int
+    likeCount: int
+
+# 행을 응답 모델과 같은 JSON 바이트로 바로 인코딩하는 빠른 경로 (SNS_FAST_JSON, json_cache.py)
+# 모델에 컬럼이 없는 필드나 지원하지 않는 타입이 생기면 import 할 때 실패합니다.
+POST_JSON = json_cache.RowEncoder("post", Post, repository.POST_COLUMNS)
+COMMENT_JSON = json_cache.RowEncoder("comment", Comment, repository.COMMENT_COLUMNS)
+
+
+def _cache_evicted(tags):
+    # 읽기 캐시에서 ("post", id) / ("comment", id) 태그가 지워지면 같은 키의 JSON 조각도 지우고,
+    # ("user", 이름) / ALL_USERS 태그가 지워지면 사용자 요약을 지웁니다. (다른 워커에서 받은 무효화 포함)
+    json_cache.fragments.evict(tags)
+    user_summaries.evict(tags)
+
+
+read_cache.on_evict = _cache_evicted
+# 사용자 요약은 이 워커에서는 증감을 바로 더하고, 다른 워커에는 그 사용자의 요약을 지우라고 알립니다.
+# (읽기 캐시를 꺼도 여러 워커로 실행 중이면 알림은 보냅니다)
+user_summaries.on_change = lambda user_names: read_cache.notify(*[user_tag(name) for name in user_names])
+read_cache.share_when_disabled = user_summaries.enabled
+
+# 응답 압축 설정 (환경 변수로 조정 가능)
+GZIP_ENABLED = os.environ.get("SNS_GZIP", "1") != "0"
+# 이보다 작은 응답은 압축하지 않습니다. (작은 본문은 압축해도 줄어드는 양보다 CPU 비용이 큽니다)
+GZIP_MIN_SIZE = int(os.environ.get("SNS_GZIP_MIN_SIZE", "1024"))
+# 압축 수준 1~9. 높을수록 작아지지만 느려집니다.
+GZIP_LEVEL = int(os.environ.get("SNS_GZIP_LEVEL", "6"))
+
 # FastAPI 애플리케이션 생성
 app = FastAPI(
     title="Simple SNS API",
@@ -68,68 +151,255 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 브라우저에서 다음 페이지 커서와 ETag 를 읽을 수 있도록 노출
+    expose_headers=[NEXT_CURSOR_HEADER, "Link", "ETag"],
 )
 
-# API 라우터 설정
-api_router = APIRouter(prefix="/api")
+# 응답 압축: Accept-Encoding 에 gzip 이 있고 본문이 GZIP_MIN_SIZE 바이트 이상이면 압축합니다.
+# (SSE 스트림처럼 압축하면 안 되는 응답은 GZipMiddleware 가 알아서 제외합니다)
+if GZIP_ENABLED:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+# API 라우터 설정 (operationId 별 지연 시간 / SQL 통계를 /metrics 로 내보냅니다)
+# SNS_HANDLER_MODE=async 이면 동기 핸들러를 async 로 감싸 DB 작업을 전용 읽기 / 쓰기 차선에서 실행합니다.
+# 모든 요청은 먼저 사용자별 요청 수 제한과 읽기 / 쓰기 동시 처리 한도를 거칩니다. (admission.py)
+api_router = APIRouter(prefix="/api", route_class=LaneRoute, dependencies=[Depends(admission.admit)])
 
 @app.on_event("startup")
 def startup():
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-
-    # 포스트 테이블
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS posts (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      userName TEXT NOT NULL,
-      content TEXT NOT NULL,
-      createdAt TEXT NOT NULL,
-      updatedAt TEXT NOT NULL,
-      likeCount INTEGER NOT NULL,
-      commentCount INTEGER NOT NULL
-    )
-    """)
-
-    # 댓글 테이블
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS comments (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      postId INTEGER NOT NULL,
-      userName TEXT NOT NULL,
-      content TEXT NOT NULL,
-      createdAt TEXT NOT NULL,
-      updatedAt TEXT NOT NULL
-    )
-    """)
-
-    # 좋아요 테이블
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS likes (
-      postId INTEGER NOT NULL,
-      userName TEXT NOT NULL,
-      PRIMARY KEY (postId, userName)
-    )
-    """)
+    # 샤드마다 커넥션 풀 생성, 스키마 마이그레이션, 변경 작업을 묶어서 commit 하는 writer 스레드 시작
+    storage.open()
+    # async 모드의 읽기 / 쓰기 차선 스레드
+    db_executor.start()
+    # 좋아요 write-behind 시작 (반영된 포스트는 읽기 캐시에서 지웁니다)
+    like_aggregator.start(storage, on_flush=_likes_flushed)
+    # 실시간 이벤트(SSE) 팬아웃 허브
+    event_hub.start(_load_counts)
+    # 여러 워커로 실행 중이면 다른 워커의 캐시 무효화와 이벤트를 따라 적용
+    cache_sync.start()
+    # 인기 점수를 주기적으로 현재 시각 기준으로 다시 계산 (점수는 좋아요 / 댓글 트리거가 증분 갱신)
+    trending_decay.start(storage)
+    # SNS_REPLICA=1 이면 조회용 메모리 복제본을 만들고 변경 기록으로 따라잡게 합니다.
+    replicas.start(storage, on_apply=_replica_applied, on_reset=read_cache.evict_all)
+    # 오래된 포스트를 압축해서 보관 표로 옮기는 작업 (SNS_ARCHIVE_AFTER_DAYS, 여러 워커면 첫 워커만)
+    if os.environ.get("SNS_WORKER_ID", "0") == "0":
+        archive.compactor.start(storage, before_batch=like_aggregator.flush, on_archive=_archived)
+
+
+@app.on_event("shutdown")
+def shutdown():
+    # 이벤트 구독을 끝내고, 남은 좋아요와 쓰기 작업을 반영한 뒤 커넥션 풀을 닫습니다.
+    event_hub.stop()
+    archive.compactor.stop()
+    trending_decay.stop()
+    like_aggregator.stop()
+    replicas.stop()
+    cache_sync.stop()
+    db_executor.stop()
+    storage.close()
+
+
+@app.exception_handler(WriterBusy)
+@app.exception_handler(LaneBusy)
+def writer_busy(request: Request, exc: Exception):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(DbTimeout)
+def db_timeout(request: Request, exc: DbTimeout):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(ClientDisconnected)
+def client_disconnected(request: Request, exc: ClientDisconnected):
+    # 받을 클라이언트가 없으므로 본문 없이 끝냅니다. (nginx 의 499 와 같은 의미로 기록)
+    return Response(status_code=499)
+
+
+def _likes_flushed(post_ids):
+    # 반영된 포스트는 읽기 캐시에서 지우고 바뀐 likeCount 를 구독자에게 보냅니다.
+    read_cache.invalidate(*[("post", post_id) for post_id in post_ids])
+    event_hub.touch_counts(post_ids)
+
+
+def _archived(post_ids):
+    # 보관된 포스트는 목록 / 검색에서 빠지므로 그 포스트가 들어 있던 캐시 항목을 지웁니다.
+    # (사용자 요약은 보관된 활동도 세므로 바뀌지 않습니다)
+    read_cache.invalidate(*[("post", post_id) for post_id in post_ids])
+
+
+def _restored(post_ids):
+    # 되돌린 포스트는 최신순 목록 / 피드의 중간에 다시 나타나므로 모든 목록 페이지를 지웁니다.
+    if post_ids:
+        read_cache.invalidate(*[("post", post_id) for post_id in post_ids], POSTS_PAGES)
+
+
+def _replica_applied(changes):
+    # 복제본에 반영된 행이 들어 있던 캐시 항목을 지웁니다. 쓰기 핸들러가 지운 뒤 반영 전의 복제본에서
+    # 다시 읽어 간 항목이 있을 수 있기 때문입니다. (워커마다 자기 복제본이 지우므로 다른 워커에는 알리지 않음)
+    tags = set()
+    for table, op, key, post_id in changes:
+        if table == "comments":
+            tags.add(("comments-head", post_id) if op == "I" else ("comment", key))
+            continue
+        tags.add(("post", key))
+        if table == "posts" and op == "I":
+            tags.add(POSTS_HEAD)
+        if op == "D":
+            tags.add(("post-comments", key))
+    read_cache.evict(tags)
+
+
+def _load_counts(post_ids):
+    # post.counts 이벤트용 likeCount / commentCount (샤드별로 한 번씩 조회)
+    return _read_by_shard(post_ids, repository.post_counts)
+
+
+def _read_by_shard(post_ids, fn):
+    # fn(conn, 그 샤드의 postIds) 를 포스트가 있는 샤드에서만 동시에 실행하고 결과 목록을 이어 붙입니다.
+    by_shard = {}
+    for post_id in post_ids:
+        by_shard.setdefault(storage.shard_index(post_id), []).append(post_id)
+    if not by_shard:
+        return []
+
+    def read(shard):
+        ids = by_shard.get(shard.index)
+        if not ids:
+            return []
+        with shard.pool.reader() as conn:
+            return fn(conn, ids)
+
+    return [row for rows in storage.gather(read) for row in rows]
+
+
+def init_schema(conn: sqlite3.Connection):
+    # 대기 중인 스키마 마이그레이션을 순서대로 적용합니다. (테이블, 검색 색인, 외래 키, 색인)
+    migrate(conn)
+
+
+# 최신순 첫 페이지에만 붙는 캐시 태그 (새 글이 생기면 첫 페이지만 바뀝니다)
+POSTS_HEAD = ("posts-head",)
+# 최신순 목록 / 피드의 모든 페이지에 붙는 캐시 태그 (보관된 포스트를 되돌리면 중간 페이지도 바뀝니다)
+POSTS_PAGES = ("posts-pages",)
+
+
+# 일괄 작성 API 가 한 번에 받을 수 있는 최대 항목 수
+MAX_BATCH_SIZE = int(os.environ.get("SNS_MAX_BATCH_SIZE", "1000"))
+
+
+# 피드의 포스트마다 함께 담는 최신 댓글 수 (기본값 / 최대값)
+FEED_COMMENTS = int(os.environ.get("SNS_FEED_COMMENTS", "3"))
+MAX_FEED_COMMENTS = int(os.environ.get("SNS_FEED_MAX_COMMENTS", "20"))
 
-    conn.commit()
-    conn.close()
+
+def _check_batch(items: list, is_valid, message: str):
+    if not items:
+        raise HTTPException(status_code=400, detail="항목이 비어 있습니다.")
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_SIZE}개까지 보낼 수 있습니다.")
+    errors = [{"index": i, "message": message} for i, item in enumerate(items) if not is_valid(item)]
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+
+def _decode_after(kind: str, after: Optional[str]) -> Optional[int]:
+    try:
+        return decode_cursor(kind, after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _parse_fields(all_columns, fields: Optional[str]):
+    # ?fields= 가 없으면 None (모든 필드)
+    if fields is None:
+        return None
+    try:
+        return repository.project_columns(all_columns, fields)
+    except repository.UnknownField as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _list_response(request: Request, response: Response, items: list, cursor: Optional[str],
+                   limit: int, etag: str, columns):
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if isinstance(items, bytes):
+        # 빠른 경로: 캐시된 조각을 이어 붙인 JSON 바이트를 그대로 보냅니다.
+        response = json_cache.json_response(items)
+    elif columns is not None:
+        # 일부 필드만 담은 항목은 응답 모델과 맞지 않으므로 모델 검증 없이 바로 JSON 으로 보냅니다.
+        response = JSONResponse(items)
+    set_cursor_headers(request, response, cursor, limit)
+    response.headers["ETag"] = etag
+    return response if isinstance(items, bytes) or columns is not None else items
+
+
+def _restoring(conn: sqlite3.Connection, post_id: int, change, restored: list):
+    """
+    change() 가 아무것도 바꾸지 못했고 그 포스트가 보관되어 있으면, 같은 트랜잭션에서 되돌린 뒤 한 번 더
+    실행합니다. 되돌린 포스트 id 는 restored 에 담습니다. (commit 뒤 _restored 로 캐시를 지우기 위해)
+    """
+    result = change()
+    if result is None and archive.restore(conn, post_id):
+        restored.append(post_id)
+        result = change()
+    return result
+
+
+def _restore_posts(shard, post_ids) -> Set[int]:
+    # 쓰기 트랜잭션 밖에서 변경하는 좋아요용: post_ids 중 보관된 포스트를 되돌리고 그 id 를 돌려줍니다.
+    restored = shard.write_queue.run(lambda conn: {post_id for post_id in post_ids if archive.restore(conn, post_id)})
+    _restored(restored)
+    return restored
+
+
+def _post_not_found(conn: sqlite3.Connection, post_id: int):
+    raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+
+
+def _comment_not_found(conn: sqlite3.Connection, post_id: int):
+    # 댓글 조회 / 변경은 postId 까지 WHERE 에 넣어 한 번에 확인하므로,
+    # 실패했을 때만 어느 쪽이 없는지 확인해서 메시지를 고릅니다.
+    if not repository.post_exists(conn, post_id):
+        _post_not_found(conn, post_id)
+    raise HTTPException(status_code=404, detail="댓글을 찾을 수 없습니다.")
 
 
 # ------------------------------------------------
 # (1) 모든 포스트 목록 조회 (GET /api/posts)
 # ------------------------------------------------
 @api_router.get("/posts", response_model=List[Post], operation_id="getPosts")
-def get_posts():
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-    c.execute("SELECT * FROM posts ORDER BY id ASC")
-    rows = c.fetchall()
-    col = [desc[0] for desc in c.description]
-    conn.close()
-
-    # 튜플을 딕셔너리로 변환해서 반환
-    return [dict(zip(col, row)) for row in rows]
+def get_posts(request: Request, response: Response,
+              limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None):
+    limit = clamp_limit(limit)
+    after_id = _decode_after("posts", after)
+    columns = _parse_fields(repository.POST_COLUMNS, fields)
+    replicas.prepare(request)
+
+    def load():
+        # 최신 글부터, 커서 이후(id 가 더 작은) 글을 limit + 1 개까지 조회
+        # (샤드가 여러 개면 샤드마다 동시에 읽어 id 순서로 합칩니다)
+        rows = merge_sorted(replicas.read_all(lambda conn: repository.list_posts(conn, limit + 1, after_id, columns)),
+                            key=lambda row: -row[0], limit=limit + 1)
+        page, cursor = paginate("posts", rows, limit)
+
+        # 다음 페이지 확인용으로 읽은 글까지 태그로 달아야 삭제 시 커서가 정확해집니다.
+        tags = [("post", row[0]) for row in rows] + [POSTS_PAGES]
+        if after_id is None:
+            tags.append(POSTS_HEAD)
+
+        # 튜플을 JSON 바이트(빠른 경로) 또는 딕셔너리로 변환해서 반환
+        if columns is not None:
+            items = [repository.projected_dict(columns, row) for row in page]
+        elif json_cache.FAST_JSON:
+            items = json_cache.join(json_cache.fragments.encode(POST_JSON, page))
+        else:
+            items = [repository.post_dict(row) for row in page]
+        return (items, cursor, list_etag(page, cursor, columns)), tags
+
+    items, cursor, etag = read_cache.get_or_load(("posts", after_id, limit, columns), load)
+    return _list_response(request, response, items, cursor, limit, etag, columns)
 
 
 # ------------------------------------------------
@@ -140,40 +410,52 @@ def create_post(post: PostCreate):
     if not post.userName or not post.content:
         raise HTTPException(status_code=400, detail="userName, content가 필요합니다.")
 
-    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO posts (userName, content, createdAt, updatedAt, likeCount, commentCount)
-        VALUES (?, ?, ?, ?, 0, 0)
-    """, (post.userName, post.content, now, now))
-    post_id = c.lastrowid
-    conn.commit()
+    # 새 포스트는 샤드를 돌아가며 나눠 담습니다.
+    shard = storage.next_shard()
+    post_id = storage.new_id("posts", shard)
 
-    # 삽입 후 해당 포스트 정보를 다시 SELECT
-    c.execute("SELECT * FROM posts WHERE id = ?", (post_id,))
-    row = c.fetchone()
-    col = [desc[0] for desc in c.description]
-    conn.close()
+    def write(conn: sqlite3.Connection):
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # 삽입한 행을 RETURNING 으로 바로 받습니다.
+        return repository.post_dict(repository.insert_post(conn, post.userName, post.content, now, post_id))
 
-    return dict(zip(col, row))
+    # 샤드의 writer 스레드가 다른 요청과 묶어서 commit 한 뒤 결과를 돌려줍니다.
+    with user_summaries.updating(post.userName) as add:
+        created = shard.write_queue.run(write)
+        add(post.userName, posts=1)
+    read_cache.invalidate(POSTS_HEAD)
+    event_hub.publish("post.created", created)
+    return created
 
 
 # ------------------------------------------------
 # (3) 특정 포스트 조회 (GET /api/posts/{postId})
 # ------------------------------------------------
 @api_router.get("/posts/{postId}", response_model=Post, operation_id="getPost")
-def get_post(postId: int):
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-    c.execute("SELECT * FROM posts WHERE id = ?", (postId,))
-    row = c.fetchone()
-    col = [desc[0] for desc in c.description] if c.description else []
-    conn.close()
-
-    if not row:
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
-    return dict(zip(col, row))
+def get_post(postId: int, request: Request, response: Response,
+             conn: sqlite3.Connection = Depends(get_read_conn)):
+    def load():
+        row = repository.get_post(conn, postId)
+        if not row:
+            # 없을 때만 보관 표를 봅니다. (보관된 포스트는 압축을 풀어 같은 모양으로 돌려줌)
+            archived = archive.find(conn, postId)
+            if archived is None:
+                raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+            row = archived.row
+        if json_cache.FAST_JSON:
+            item = json_cache.fragments.encode_one(POST_JSON, row)
+        else:
+            item = repository.post_dict(row)
+        return (item, row_etag(row)), [("post", postId)]
+
+    # 바뀌지 않았으면 본문 없이 304 를 돌려줍니다.
+    item, etag = read_cache.get_or_load(("post", postId), load)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if isinstance(item, bytes):
+        return json_cache.json_response(item, {"ETag": etag})
+    response.headers["ETag"] = etag
+    return item
 
 
 # ------------------------------------------------
@@ -184,30 +466,21 @@ def update_post(postId: int, post_update: PostUpdate):
     if not post_update.content:
         raise HTTPException(status_code=400, detail="수정할 content가 없습니다.")
 
-    # 기존 포스트 확인
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-    c.execute("SELECT * FROM posts WHERE id = ?", (postId,))
-    old = c.fetchone()
-    if not old:
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+    restored = []
 
-    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    c.execute("""
-        UPDATE posts
-        SET content = ?, updatedAt = ?
-        WHERE id = ?
-    """, (post_update.content, now, postId))
-    conn.commit()
+    def write(conn: sqlite3.Connection):
+        # 수정된 행을 RETURNING 으로 받고, 행이 없으면 포스트가 없는 것입니다. (보관된 포스트는 되돌린 뒤 수정)
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = _restoring(conn, postId, lambda: repository.update_post_content(conn, postId, post_update.content, now), restored)
+        if not row:
+            _post_not_found(conn, postId)
+        return repository.post_dict(row)
 
-    # 수정된 내용 다시 SELECT
-    c.execute("SELECT * FROM posts WHERE id = ?", (postId,))
-    row = c.fetchone()
-    col = [desc[0] for desc in c.description]
-    conn.close()
-
-    return dict(zip(col, row))
+    updated = storage.for_post(postId).write_queue.run(write)
+    _restored(restored)
+    read_cache.invalidate(("post", postId))
+    event_hub.publish("post.updated", updated)
+    return updated
 
 
 # ------------------------------------------------
@@ -215,20 +488,16 @@ def update_post(postId: int, post_update: PostUpdate):
 # ------------------------------------------------
 @api_router.delete("/posts/{postId}", status_code=status.HTTP_204_NO_CONTENT, operation_id="deletePost")
 def delete_post(postId: int):
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-    c.execute("SELECT id FROM posts WHERE id = ?", (postId,))
-    post = c.fetchone()
-    if not post:
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
-
-    # 해당 포스트 연관된 댓글, 좋아요, 그리고 포스트 자체 삭제
-    c.execute("DELETE FROM comments WHERE postId = ?", (postId,))
-    c.execute("DELETE FROM likes WHERE postId = ?", (postId,))
-    c.execute("DELETE FROM posts WHERE id = ?", (postId,))
-    conn.commit()
-    conn.close()
+    def write(conn: sqlite3.Connection):
+        # 연관된 댓글, 좋아요는 ON DELETE CASCADE 로 함께 삭제됩니다. (보관된 포스트는 블록째 삭제)
+        if not repository.delete_post(conn, postId) and not archive.delete(conn, postId):
+            raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+
+    storage.for_post(postId).write_queue.run(write)
+    like_aggregator.discard_post(postId)
+    # 작성자뿐 아니라 그 포스트에 댓글 / 좋아요를 남긴 사용자의 개수도 바뀌므로 사용자 요약은 모두 지웁니다.
+    read_cache.invalidate(("post", postId), ("post-comments", postId), ALL_USERS)
+    event_hub.publish("post.deleted", {"id": postId})
     return
 
 
@@ -236,22 +505,39 @@ def delete_post(postId: int):
 # (6) 특정 포스트의 댓글 목록 조회 (GET /api/posts/{postId}/comments)
 # ------------------------------------------------
 @api_router.get("/posts/{postId}/comments", response_model=List[Comment], operation_id="getComments")
-def get_comments(postId: int):
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-
-    # 포스트 존재 확인
-    c.execute("SELECT id FROM posts WHERE id = ?", (postId,))
-    if not c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
-
-    c.execute("SELECT * FROM comments WHERE postId = ? ORDER BY id ASC", (postId,))
-    rows = c.fetchall()
-    col = [desc[0] for desc in c.description]
-    conn.close()
-
-    return [dict(zip(col, row)) for row in rows]
+def get_comments(postId: int, request: Request, response: Response,
+                 limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None,
+                 conn: sqlite3.Connection = Depends(get_read_conn)):
+    limit = clamp_limit(limit)
+    after_id = _decode_after("comments", after)
+    columns = _parse_fields(repository.COMMENT_COLUMNS, fields)
+
+    def load():
+        # 최신 댓글부터 limit + 1 개까지 조회
+        rows = repository.list_comments(conn, postId, limit + 1, after_id, columns)
+        # 댓글이 있으면 포스트도 있는 것이므로, 빈 페이지일 때만 포스트 존재(또는 보관 여부)를 확인합니다.
+        if not rows:
+            hot, archived = archive.lookup(conn, postId)
+            if not hot:
+                if archived is None:
+                    raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+                rows = archive.comment_page(archived, limit + 1, after_id, columns)
+        page, cursor = paginate("comments", rows, limit)
+
+        tags = [("comment", row[0]) for row in rows]
+        tags.append(("post-comments", postId))
+        if after_id is None:
+            tags.append(("comments-head", postId))
+        if columns is not None:
+            items = [repository.projected_dict(columns, row) for row in page]
+        elif json_cache.FAST_JSON:
+            items = json_cache.join(json_cache.fragments.encode(COMMENT_JSON, page))
+        else:
+            items = [repository.comment_dict(row) for row in page]
+        return (items, cursor, list_etag(page, cursor, columns)), tags
+
+    items, cursor, etag = read_cache.get_or_load(("comments", postId, after_id, limit, columns), load)
+    return _list_response(request, response, items, cursor, limit, etag, columns)
 
 
 # ------------------------------------------------
@@ -262,63 +548,55 @@ def create_comment(postId: int, comment: CommentCreate):
     if not comment.userName or not comment.content:
         raise HTTPException(status_code=400, detail="userName, content가 필요합니다.")
 
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
+    # 댓글은 포스트와 같은 샤드에 들어갑니다.
+    shard = storage.for_post(postId)
+    comment_id = storage.new_id("comments", shard)
 
-    # 포스트 존재 확인
-    c.execute("SELECT id FROM posts WHERE id = ?", (postId,))
-    if not c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+    restored = []
 
-    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    c.execute("""
-        INSERT INTO comments (postId, userName, content, createdAt, updatedAt)
-        VALUES (?, ?, ?, ?, ?)
-    """, (postId, comment.userName, comment.content, now, now))
+    def write(conn: sqlite3.Connection):
+        # 댓글 카운트 갱신이 포스트 존재 확인을 겸하고, 추가된 댓글은 RETURNING 으로 받습니다.
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = _restoring(conn, postId, lambda: repository.insert_comment(
+            conn, postId, comment.userName, comment.content, now, comment_id), restored)
+        if not row:
+            _post_not_found(conn, postId)
+        return repository.comment_dict(row)
 
-    # 댓글 카운트 갱신
-    c.execute("""
-        UPDATE posts
-        SET commentCount = commentCount + 1,
-            updatedAt = ?
-        WHERE id = ?
-    """, (now, postId))
-    conn.commit()
-
-    comment_id = c.lastrowid
-    c.execute("SELECT * FROM comments WHERE id = ?", (comment_id,))
-    row = c.fetchone()
-    col = [desc[0] for desc in c.description]
-    conn.close()
-
-    return dict(zip(col, row))
+    with user_summaries.updating(comment.userName) as add:
+        created = shard.write_queue.run(write)
+        add(comment.userName, comments=1)
+    _restored(restored)
+    read_cache.invalidate(("post", postId), ("comments-head", postId))
+    event_hub.publish("comment.created", created)
+    event_hub.touch_counts([postId])
+    return created
 
 
 # ------------------------------------------------
 # (8) 특정 댓글 조회 (GET /api/posts/{postId}/comments/{commentId})
 # ------------------------------------------------
 @api_router.get("/posts/{postId}/comments/{commentId}", response_model=Comment, operation_id="getComment")
-def get_comment(postId: int, commentId: int):
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-
-    # 포스트 존재
-    c.execute("SELECT id FROM posts WHERE id = ?", (postId,))
-    if not c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
-
-    # 해당 댓글
-    c.execute("SELECT * FROM comments WHERE id = ?", (commentId,))
-    row = c.fetchone()
-    col = [desc[0] for desc in c.description] if c.description else []
-    if not row or row[1] != postId:
-        conn.close()
-        raise HTTPException(status_code=404, detail="댓글을 찾을 수 없습니다.")
-    conn.close()
-
-    return dict(zip(col, row))
+def get_comment(postId: int, commentId: int, request: Request, response: Response,
+                conn: sqlite3.Connection = Depends(get_read_conn)):
+    # 해당 포스트의 댓글
+    row = repository.get_comment(conn, postId, commentId)
+    if not row:
+        # 어느 쪽이 없는지 확인하면서 보관된 포스트면 그 블록에서 찾습니다.
+        hot, archived = archive.lookup(conn, postId)
+        if not hot and archived is None:
+            raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+        row = None if hot else next((c for c in archived.comments if c[0] == commentId), None)
+        if row is None:
+            raise HTTPException(status_code=404, detail="댓글을 찾을 수 없습니다.")
+
+    etag = row_etag(row)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if json_cache.FAST_JSON:
+        return json_cache.json_response(json_cache.fragments.encode_one(COMMENT_JSON, row), {"ETag": etag})
+    response.headers["ETag"] = etag
+    return repository.comment_dict(row)
 
 
 # ------------------------------------------------
@@ -329,36 +607,20 @@ def update_comment(postId: int, commentId: int, comment_update: CommentUpdate):
     if not comment_update.content:
         raise HTTPException(status_code=400, detail="수정할 content가 필요합니다.")
 
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-
-    # 포스트 확인
-    c.execute("SELECT id FROM posts WHERE id = ?", (postId,))
-    if not c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+    restored = []
 
-    # 댓글 확인
-    c.execute("SELECT * FROM comments WHERE id = ?", (commentId,))
-    row = c.fetchone()
-    if not row or row[1] != postId:
-        conn.close()
-        raise HTTPException(status_code=404, detail="댓글을 찾을 수 없습니다.")
-
-    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    c.execute("""
-        UPDATE comments
-        SET content = ?, updatedAt = ?
-        WHERE id = ?
-    """, (comment_update.content, now, commentId))
-    conn.commit()
+    def write(conn: sqlite3.Connection):
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = _restoring(conn, postId, lambda: repository.update_comment_content(
+            conn, postId, commentId, comment_update.content, now), restored)
+        if not row:
+            _comment_not_found(conn, postId)
+        return repository.comment_dict(row)
 
-    c.execute("SELECT * FROM comments WHERE id = ?", (commentId,))
-    updated = c.fetchone()
-    col = [desc[0] for desc in c.description]
-    conn.close()
-
-    return dict(zip(col, updated))
+    updated = storage.for_post(postId).write_queue.run(write)
+    _restored(restored)
+    read_cache.invalidate(("comment", commentId))
+    return updated
 
 
 # ------------------------------------------------
@@ -366,36 +628,21 @@ def update_comment(postId: int, commentId: int, comment_update: CommentUpdate):
 # ------------------------------------------------
 @api_router.delete("/posts/{postId}/comments/{commentId}", status_code=status.HTTP_204_NO_CONTENT, operation_id="deleteComment")
 def delete_comment(postId: int, commentId: int):
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-
-    # 포스트 확인
-    c.execute("SELECT id FROM posts WHERE id = ?", (postId,))
-    if not c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
-
-    # 댓글 확인
-    c.execute("SELECT * FROM comments WHERE id = ?", (commentId,))
-    row = c.fetchone()
-    if not row or row[1] != postId:
-        conn.close()
-        raise HTTPException(status_code=404, detail="댓글을 찾을 수 없습니다.")
-
-    # 댓글 삭제
-    c.execute("DELETE FROM comments WHERE id = ?", (commentId,))
-
-    # commentCount 재계산
-    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    c.execute("""
-        UPDATE posts
-        SET commentCount = (SELECT COUNT(*) FROM comments WHERE postId = ?),
-            updatedAt = ?
-        WHERE id = ?
-    """, (postId, now, postId))
-
-    conn.commit()
-    conn.close()
+    restored = []
+
+    def write(conn: sqlite3.Connection):
+        # 댓글 삭제 후 commentCount 재계산 (작성자를 돌려받습니다)
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        author = _restoring(conn, postId, lambda: repository.delete_comment(conn, postId, commentId, now), restored)
+        if author is None:
+            _comment_not_found(conn, postId)
+        return author
+
+    author = storage.for_post(postId).write_queue.run(write)
+    _restored(restored)
+    # 작성자는 삭제한 뒤에야 알 수 있어서 증감 대신 그 사용자의 요약을 지웁니다.
+    read_cache.invalidate(("post", postId), ("comment", commentId), user_tag(author))
+    event_hub.touch_counts([postId])
     return
 
 
@@ -403,40 +650,21 @@ def delete_comment(postId: int, commentId: int):
 # (11) 특정 포스트에 좋아요 (POST /api/posts/{postId}/likes)
 # ------------------------------------------------
 @api_router.post("/posts/{postId}/likes", status_code=status.HTTP_201_CREATED, operation_id="likePost")
-def like_post(postId: int, like: LikeBase):
+def like_post(postId: int, like: LikeBase, conn: sqlite3.Connection = Depends(get_post_conn)):
     if not like.userName:
         raise HTTPException(status_code=400, detail="userName이 필요합니다.")
 
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
-
-    # 포스트 확인
-    c.execute("SELECT * FROM posts WHERE id = ?", (postId,))
-    post = c.fetchone()
-    if not post:
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
-
-    # 이미 좋아요 눌렀는지 확인
-    c.execute("SELECT * FROM likes WHERE postId = ? AND userName = ?", (postId, like.userName))
-    if c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=400, detail="이미 좋아요를 눌렀습니다.")
-
-    # 좋아요 추가
-    c.execute("INSERT INTO likes (postId, userName) VALUES (?, ?)", (postId, like.userName))
-
-    # likeCount +1
-    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    c.execute("""
-        UPDATE posts
-        SET likeCount = likeCount + 1,
-            updatedAt = ?
-        WHERE id = ?
-    """, (now, postId))
-
-    conn.commit()
-    conn.close()
+    # 좋아요 기록 (likes 추가와 likeCount +1 은 모아서 한 번에 반영됩니다)
+    with user_summaries.updating(like.userName) as add:
+        recorded = like_aggregator.like(conn, postId, like.userName)
+        if recorded is None and _restore_posts(storage.for_post(postId), [postId]):
+            # 보관된 포스트였으면 되돌린 뒤 다시 기록합니다.
+            recorded = like_aggregator.like(conn, postId, like.userName)
+        if recorded is None:
+            _post_not_found(conn, postId)
+        if not recorded:
+            raise HTTPException(status_code=400, detail="이미 좋아요를 눌렀습니다.")
+        add(like.userName, likes=1)
 
     return {"message": "좋아요 성공"}
 
@@ -445,41 +673,460 @@ def like_post(postId: int, like: LikeBase):
 # (12) 특정 포스트의 좋아요 취소 (DELETE /api/posts/{postId}/likes)
 # ------------------------------------------------
 @api_router.delete("/posts/{postId}/likes", status_code=status.HTTP_204_NO_CONTENT, operation_id="unlikePost")
-def unlike_post(postId: int, like: LikeBase):
+def unlike_post(postId: int, like: LikeBase, conn: sqlite3.Connection = Depends(get_post_conn)):
     if not like.userName:
         raise HTTPException(status_code=400, detail="userName이 필요합니다.")
 
-    conn = sqlite3.connect("sns.db")
-    c = conn.cursor()
+    # 좋아요 취소 기록 (likes 삭제와 likeCount -1 은 모아서 한 번에 반영됩니다)
+    with user_summaries.updating(like.userName) as add:
+        recorded = like_aggregator.unlike(conn, postId, like.userName)
+        if recorded is None and _restore_posts(storage.for_post(postId), [postId]):
+            recorded = like_aggregator.unlike(conn, postId, like.userName)
+        if recorded is None:
+            _post_not_found(conn, postId)
+        if not recorded:
+            raise HTTPException(status_code=404, detail="좋아요 정보가 없습니다.")
+        add(like.userName, likes=-1)
+    return
+
+# ------------------------------------------------
+# (13) 포스트 일괄 작성 (POST /api/posts:batch)
+# ------------------------------------------------
+@api_router.post("/posts:batch", status_code=status.HTTP_201_CREATED, response_model=List[Post], operation_id="createPostsBatch")
+def create_posts_batch(posts: List[PostCreate]):
+    # 하나라도 잘못된 항목이 있으면 아무것도 저장하지 않습니다.
+    _check_batch(posts, lambda p: bool(p.userName and p.content), "userName, content가 필요합니다.")
+
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # 한 요청의 포스트는 모두 같은 샤드에 넣어 한 트랜잭션으로 저장합니다.
+    shard = storage.next_shard()
+    ids = storage.new_ids("posts", shard, len(posts))
 
-    # 포스트 확인
-    c.execute("SELECT * FROM posts WHERE id = ?", (postId,))
-    post = c.fetchone()
-    if not post:
-        conn.close()
-        raise HTTPException(status_code=404, detail="포스트를 찾을 수 없습니다.")
+    def write(conn: sqlite3.Connection):
+        return repository.insert_posts(conn, [(p.userName, p.content) for p in posts], now, ids)
 
-    # 좋아요 존재 여부 확인
-    c.execute("SELECT * FROM likes WHERE postId = ? AND userName = ?", (postId, like.userName))
-    if not c.fetchone():
-        conn.close()
-        raise HTTPException(status_code=404, detail="좋아요 정보가 없습니다.")
+    with user_summaries.updating(*{p.userName for p in posts}) as add:
+        ids = shard.write_queue.run(write)
+        for p in posts:
+            add(p.userName, posts=1)
+    read_cache.invalidate(POSTS_HEAD)
 
-    # 좋아요 삭제
-    c.execute("DELETE FROM likes WHERE postId = ? AND userName = ?", (postId, like.userName))
+    created = [
+        {"id": post_id, "userName": p.userName, "content": p.content,
+         "createdAt": now, "updatedAt": now, "likeCount": 0, "commentCount": 0}
+        for post_id, p in zip(ids, posts)
+    ]
+    event_hub.publish_many("post.created", created)
+    return created
+
+
+# ------------------------------------------------
+# (14) 특정 포스트에 댓글 일괄 작성 (POST /api/posts/{postId}/comments:batch)
+# ------------------------------------------------
+@api_router.post("/posts/{postId}/comments:batch", status_code=status.HTTP_201_CREATED, response_model=List[Comment], operation_id="createCommentsBatch")
+def create_comments_batch(postId: int, comments: List[CommentCreate]):
+    _check_batch(comments, lambda cm: bool(cm.userName and cm.content), "userName, content가 필요합니다.")
 
-    # likeCount -1
     now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    c.execute("""
-        UPDATE posts
-        SET likeCount = likeCount - 1,
-            updatedAt = ?
-        WHERE id = ?
-    """, (now, postId))
-
-    conn.commit()
-    conn.close()
-    return
+    shard = storage.for_post(postId)
+    ids = storage.new_ids("comments", shard, len(comments))
+
+    restored = []
+
+    def write(conn: sqlite3.Connection):
+        # 댓글 카운트는 한 번만 갱신하고, 그 갱신이 포스트 존재 확인을 겸합니다.
+        inserted = _restoring(conn, postId, lambda: repository.insert_comments(
+            conn, postId, [(cm.userName, cm.content) for cm in comments], now, ids), restored)
+        if inserted is None:
+            _post_not_found(conn, postId)
+        return inserted
+
+    with user_summaries.updating(*{cm.userName for cm in comments}) as add:
+        ids = shard.write_queue.run(write)
+        for cm in comments:
+            add(cm.userName, comments=1)
+    _restored(restored)
+    read_cache.invalidate(("post", postId), ("comments-head", postId))
+
+    created = [
+        {"id": comment_id, "postId": postId, "userName": cm.userName, "content": cm.content,
+         "createdAt": now, "updatedAt": now}
+        for comment_id, cm in zip(ids, comments)
+    ]
+    event_hub.publish_many("comment.created", created)
+    event_hub.touch_counts([postId])
+    return created
+
+
+# ------------------------------------------------
+# (15) 여러 포스트에 좋아요 일괄 추가 (POST /api/likes:batch)
+# ------------------------------------------------
+@api_router.post("/likes:batch", response_model=List[LikeResult], operation_id="likePostsBatch")
+def like_posts_batch(likes: List[Like]):
+    _check_batch(likes, lambda lk: bool(lk.userName), "userName이 필요합니다.")
+
+    # 샤드별로 대상 포스트 존재 여부를 한 번에 확인하고 좋아요를 기록합니다.
+    by_shard = {}
+    for i, lk in enumerate(likes):
+        by_shard.setdefault(storage.shard_index(lk.postId), []).append(i)
+
+    existing = set()
+    recorded = {}
+    with user_summaries.updating(*{lk.userName for lk in likes}) as add:
+        for index, positions in by_shard.items():
+            with storage.shards[index].pool.reader() as conn:
+                post_ids = sorted({likes[i].postId for i in positions})
+                existing |= repository.existing_post_ids(conn, post_ids)
+                # 없는 포스트가 있을 때만 보관 여부를 확인하고, 보관된 포스트는 되돌린 뒤 기록합니다.
+                archived = sorted(archive.archived_ids(conn, [post_id for post_id in post_ids if post_id not in existing]))
+                if archived:
+                    existing |= _restore_posts(storage.shards[index], archived)
+                valid = [i for i in positions if likes[i].postId in existing]
+                recorded.update(zip(valid, like_aggregator.like_many(
+                    conn, [(likes[i].postId, likes[i].userName) for i in valid])))
+        for i, was_recorded in recorded.items():
+            if was_recorded:
+                add(likes[i].userName, likes=1)
+
+    # 배치는 응답 전에 샤드마다 한 트랜잭션으로 반영합니다. (postId 별 likeCount 갱신은 한 번씩)
+    like_aggregator.flush()
+
+    results = []
+    for i, lk in enumerate(likes):
+        if lk.postId not in existing:
+            results.append({"postId": lk.postId, "userName": lk.userName, "status": 404, "message": "포스트를 찾을 수 없습니다."})
+        elif recorded[i]:
+            results.append({"postId": lk.postId, "userName": lk.userName, "status": 201, "message": "좋아요 성공"})
+        else:
+            results.append({"postId": lk.postId, "userName": lk.userName, "status": 400, "message": "이미 좋아요를 눌렀습니다."})
+    return results
+
+
+# ------------------------------------------------
+# (16) 포스트 / 댓글 전문 검색 (GET /api/search)
+# ------------------------------------------------
+@api_router.get("/search", response_model=List[SearchResult], operation_id="search")
+def search_content(request: Request, response: Response, q: str = "",
+                   kind: str = Query("all", alias="type"),
+                   limit: Optional[int] = None, after: Optional[str] = None):
+    match = to_match_query(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="검색어(q)가 필요합니다.")
+    if kind not in SEARCH_TYPES:
+        raise HTTPException(status_code=400, detail=f"type 은 {', '.join(SEARCH_TYPES)} 중 하나여야 합니다.")
+
+    # 관련도 순 정렬은 키셋으로 이어갈 수 없으므로 커서에 위치(offset)를 담습니다.
+    limit = clamp_limit(limit)
+    offset = _decode_after("search", after) or 0
+    if offset > MAX_SEARCH_OFFSET:
+        raise HTTPException(status_code=400, detail=f"검색 결과는 {MAX_SEARCH_OFFSET}번째까지만 볼 수 있습니다.")
+
+    items, has_more = search_all(storage, match, kind, limit, offset)
+    cursor = encode_cursor("search", offset + limit) if has_more else None
+    set_cursor_headers(request, response, cursor, limit)
+    return items
+
+
+# ------------------------------------------------
+# (17) 전체 데이터 내보내기 (GET /api/export)
+# ------------------------------------------------
+@api_router.get("/export", response_class=StreamingResponse, operation_id="exportData")
+def export_data():
+    # 대기 중인 좋아요까지 포함되도록 먼저 반영합니다.
+    like_aggregator.flush()
+    return StreamingResponse(
+        export_ndjson(storage),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="sns-export.ndjson"'},
+    )
+
+
+# ------------------------------------------------
+# (18) 전체 데이터 가져오기 (POST /api/import)
+# ------------------------------------------------
+@api_router.post("/import", response_model=ImportResult, operation_id="importData")
+async def import_data(request: Request):
+    await run_in_threadpool(like_aggregator.flush)
+    try:
+        counts = await import_ndjson(storage, request.stream())
+    except InvalidRecord as e:
+        raise HTTPException(status_code=400, detail={"line": e.line, "message": str(e), **e.counts})
+    finally:
+        # 어떤 포스트가 바뀌었는지 따로 추적하지 않으므로 읽기 캐시를 모두 비웁니다.
+        read_cache.clear()
+    return counts
+
+
+# ------------------------------------------------
+# (19) 실시간 변경 이벤트 (GET /api/events)
+# ------------------------------------------------
+@api_router.get("/events", response_class=StreamingResponse, operation_id="streamEvents")
+async def stream_events(limit: Optional[int] = Query(None, ge=1)):
+    # 목록을 주기적으로 다시 읽는 대신 변경 이벤트를 Server-Sent Events 로 받습니다.
+    if event_hub.full:
+        raise HTTPException(status_code=503, detail="이벤트 구독자가 너무 많습니다.", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        event_hub.stream(limit),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        # 프록시가 이벤트를 모아 두지 않도록 합니다.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ------------------------------------------------
+# (20) 피드 조회 (GET /api/feed)
+# ------------------------------------------------
+@api_router.get("/feed", response_model=List[FeedPost], operation_id="getFeed")
+def get_feed(request: Request, response: Response, viewer: Optional[str] = None,
+             limit: Optional[int] = None, after: Optional[str] = None,
+             comments: Optional[int] = Query(None, ge=0)):
+    # 포스트 목록 + 포스트별 댓글 목록 + 좋아요 여부를 따로 조회하지 않도록 한 번에 돌려줍니다.
+    limit = clamp_limit(limit)
+    after_id = _decode_after("feed", after)
+    per_post = FEED_COMMENTS if comments is None else min(comments, MAX_FEED_COMMENTS)
+
+    def load():
+        # 포스트 목록은 getPosts 와 같고, 댓글은 페이지 크기와 관계없이 샤드마다 쿼리 하나로 읽습니다.
+        rows = merge_sorted(storage.read_all(lambda conn: repository.list_posts(conn, limit + 1, after_id)),
+                            key=lambda row: -row[0], limit=limit + 1)
+        page, cursor = paginate("feed", rows, limit)
+        comment_rows = _read_by_shard([row[0] for row in page],
+                                      lambda conn, ids: repository.top_comments(conn, ids, per_post))
+
+        by_post = {}
+        if json_cache.FAST_JSON:
+            # 빠른 경로: 포스트 조각 뒤에 댓글 조각 목록을 붙여 둡니다. (likedByViewer 는 응답할 때 붙임)
+            for row, fragment in zip(comment_rows, json_cache.fragments.encode(COMMENT_JSON, comment_rows)):
+                by_post.setdefault(row[1], []).append(fragment)
+            items = [json_cache.with_fields(fragment, b'"comments":' + json_cache.join(by_post.get(row[0], ())))
+                     for row, fragment in zip(page, json_cache.fragments.encode(POST_JSON, page))]
+        else:
+            for row in comment_rows:
+                by_post.setdefault(row[1], []).append(repository.comment_dict(row))
+            items = [{**repository.post_dict(row), "comments": by_post.get(row[0], [])} for row in page]
+
+        # 댓글 수정 / 삭제도 피드에 보이도록 담은 댓글마다 태그를 답니다. (새 댓글은 포스트 태그로 지워짐)
+        tags = [("post", row[0]) for row in rows] + [("comment", row[0]) for row in comment_rows] + [POSTS_PAGES]
+        if after_id is None:
+            tags.append(POSTS_HEAD)
+        return ([row[0] for row in page], items, cursor, list_etag(page + comment_rows, cursor)), tags
+
+    post_ids, items, cursor, etag = read_cache.get_or_load(("feed", after_id, limit, per_post), load)
+
+    # 좋아요 여부는 보는 사람마다 다르므로 캐시하지 않고, 아직 반영되지 않은 좋아요까지 포함해서 읽습니다.
+    liked = set()
+    if viewer:
+        liked = set().union(*_read_by_shard(
+            post_ids, lambda conn, ids: [like_aggregator.liked_posts(conn, ids, viewer)]))
+        etag = list_etag([(etag, viewer, tuple(sorted(liked)))], None)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    if json_cache.FAST_JSON:
+        response = json_cache.json_response(json_cache.join(
+            json_cache.with_fields(item, b'"likedByViewer":true' if post_id in liked else b'"likedByViewer":false')
+            for post_id, item in zip(post_ids, items)))
+    set_cursor_headers(request, response, cursor, limit)
+    response.headers["ETag"] = etag
+    if json_cache.FAST_JSON:
+        return response
+    return [{**item, "likedByViewer": item["id"] in liked} for item in items]
+
+
+# ------------------------------------------------
+# (21) 인기 포스트 조회 (GET /api/trending)
+# ------------------------------------------------
+@api_router.get("/trending", response_model=List[TrendingPost], operation_id="getTrending")
+def get_trending(limit: Optional[int] = None):
+    # 좋아요 / 댓글에 시간 감쇠를 적용한 점수 순. 점수 표의 색인에서 상위 limit 개만 읽습니다.
+    # (샤드가 여러 개면 샤드마다 상위 limit 개를 읽어 점수 순으로 합칩니다)
+    limit = clamp_limit(limit)
+    now = time.time()
+    rows = merge_sorted(storage.read_all(lambda conn: trending(conn, limit, now)),
+                        key=lambda row: (-row[-1], -row[0]), limit=limit)
+    return [{**repository.post_dict(row), "score": row[-1]} for row in rows]
+
+
+
+def _user_list_response(request: Request, response: Response, kind: str, encoder, to_dict, rows: list, limit: int):
+    # 사용자별 목록은 사용자마다 다르고 변경마다 지울 태그가 많아 읽기 캐시에 두지 않습니다.
+    # (ETag 와 JSON 조각 캐시로 응답 비용만 줄입니다)
+    page, cursor = paginate(kind, rows, limit)
+    if json_cache.FAST_JSON:
+        items = json_cache.join(json_cache.fragments.encode(encoder, page))
+    else:
+        items = [to_dict(row) for row in page]
+    return _list_response(request, response, items, cursor, limit, list_etag(page, cursor), None)
+
+
+def _load_user_summary(user_name: str):
+    # 반영 대기 중인 좋아요 / 취소를 먼저 읽고, 샤드마다 개수와 그 중 DB 에 이미 있는 좋아요 수를 한 쿼리로 셉니다.
+    pending = like_aggregator.pending_for_user(user_name)
+    by_shard = {}
+    for post_id in pending:
+        by_shard.setdefault(storage.shard_index(post_id), []).append(post_id)
+
+    def count(shard):
+        with shard.pool.reader() as conn:
+            return repository.user_counts(conn, user_name, by_shard.get(shard.index, ()))
+
+    counts = storage.gather(count)
+    likes = sum(c[2] - c[3] for c in counts) + sum(1 for liked in pending.values() if liked)
+    return sum(c[0] for c in counts), sum(c[1] for c in counts), likes
+
+
+# ------------------------------------------------
+# (22) 사용자 요약 조회 (GET /api/users/{userName})
+# ------------------------------------------------
+@api_router.get("/users/{userName}", response_model=UserSummary, operation_id="getUserSummary")
+def get_user_summary(userName: str, request: Request, response: Response):
+    # 포스트 / 댓글 / 좋아요 수. 처음에만 색인으로 세고, 그 뒤로는 변경 핸들러가 증감을 더합니다.
+    # (아직 반영되지 않은 좋아요 / 취소도 포함합니다)
+    summary = {"userName": userName, **user_summaries.get(userName, lambda: _load_user_summary(userName))}
+    etag = list_etag([tuple(summary.values())], None)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return summary
+
+
+# ------------------------------------------------
+# (23) 사용자의 포스트 목록 조회 (GET /api/users/{userName}/posts)
+# ------------------------------------------------
+@api_router.get("/users/{userName}/posts", response_model=List[Post], operation_id="getUserPosts")
+def get_user_posts(userName: str, request: Request, response: Response,
+                   limit: Optional[int] = None, after: Optional[str] = None):
+    limit = clamp_limit(limit)
+    after_id = _decode_after("user-posts", after)
+    replicas.prepare(request)
+    # 샤드마다 (userName, id) 색인에서 limit + 1 개를 읽어 id 순서로 합칩니다.
+    rows = merge_sorted(replicas.read_all(lambda conn: repository.list_user_posts(conn, userName, limit + 1, after_id)),
+                        key=lambda row: -row[0], limit=limit + 1)
+    return _user_list_response(request, response, "user-posts", POST_JSON, repository.post_dict, rows, limit)
+
+
+# ------------------------------------------------
+# (24) 사용자의 댓글 목록 조회 (GET /api/users/{userName}/comments)
+# ------------------------------------------------
+@api_router.get("/users/{userName}/comments", response_model=List[Comment], operation_id="getUserComments")
+def get_user_comments(userName: str, request: Request, response: Response,
+                      limit: Optional[int] = None, after: Optional[str] = None):
+    limit = clamp_limit(limit)
+    after_id = _decode_after("user-comments", after)
+    replicas.prepare(request)
+    rows = merge_sorted(replicas.read_all(lambda conn: repository.list_user_comments(conn, userName, limit + 1, after_id)),
+                        key=lambda row: -row[0], limit=limit + 1)
+    return _user_list_response(request, response, "user-comments", COMMENT_JSON, repository.comment_dict, rows, limit)
+
+
+# ------------------------------------------------
+# (25) 사용자가 좋아요한 포스트 목록 조회 (GET /api/users/{userName}/likes)
+# ------------------------------------------------
+@api_router.get("/users/{userName}/likes", response_model=List[Post], operation_id="getUserLikes")
+def get_user_likes(userName: str, request: Request, response: Response,
+                   limit: Optional[int] = None, after: Optional[str] = None):
+    # 좋아요에는 id 가 없으므로 좋아요한 포스트의 id 내림차순으로 이어갑니다.
+    limit = clamp_limit(limit)
+    after_id = _decode_after("user-likes", after)
+
+    # 반영 대기 중인 좋아요 / 취소를 먼저 읽고 DB 를 읽어야 반영(flush)과 엇갈려도 빠지는 항목이 없습니다.
+    # (복제본은 좋아요를 따라가지 않으므로 디스크에서 읽습니다)
+    pending = {post_id: liked for post_id, liked in like_aggregator.pending_for_user(userName).items()
+               if after_id is None or post_id < after_id}
+    # 대기 항목이 있는 포스트는 DB 결과에서 빼고 대기 항목을 따르므로 그만큼 더 읽습니다.
+    results = storage.read_all(lambda conn: [
+        row for row in repository.list_user_liked_posts(conn, userName, limit + 1 + len(pending), after_id)
+        if row[0] not in pending])
+    liked = sorted((post_id for post_id, is_liked in pending.items() if is_liked), reverse=True)[:limit + 1]
+    if liked:
+        results.append(sorted(_read_by_shard(liked, repository.posts_by_ids), key=lambda row: -row[0]))
+    rows = merge_sorted(results, key=lambda row: -row[0], limit=limit + 1)
+    return _user_list_response(request, response, "user-likes", POST_JSON, repository.post_dict, rows, limit)
+
+# ------------------------------------------------
+# 읽기 캐시 / 좋아요 반영 통계 (GET /api/cache/stats)
+# ------------------------------------------------
+@api_router.get("/cache/stats", include_in_schema=False)
+def get_cache_stats():
+    return {**read_cache.stats(), "sync": cache_sync.stats(), "events": event_hub.stats(),
+            "likes": like_aggregator.stats(), "trending": trending_decay.stats(), "archive": archive.compactor.stats(),
+            "executor": db_executor.stats(), "admission": admission.admission.stats(), "replica": replicas.stats(),
+            "json": json_cache.fragments.stats(),
+            "users": user_summaries.stats(),
+            "writer": storage.writer_stats(), "shards": storage.shard_count}
+
+# ------------------------------------------------
+# Prometheus 지표 (GET /metrics)
+# ------------------------------------------------
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+def get_metrics():
+    cache = read_cache.stats()
+    sync = cache_sync.stats()
+    events = event_hub.stats()
+    likes = like_aggregator.stats()
+    writer = storage.writer_stats()
+    archived = archive.compactor.stats()
+    lanes = db_executor.stats()
+    admitted = admission.admission.stats()
+    replica = replicas.stats()
+    fragments = json_cache.fragments.stats()
+    summaries = user_summaries.stats()
+    extra = {
+        "sns_db_shards": ("gauge", storage.shard_count),
+        "sns_cache_entries": ("gauge", cache["entries"]),
+        "sns_cache_hits_total": ("counter", cache["hits"]),
+        "sns_cache_misses_total": ("counter", cache["misses"]),
+        "sns_cache_evictions_total": ("counter", cache["evictions"]),
+        "sns_cache_expirations_total": ("counter", cache["expirations"]),
+        "sns_cache_invalidations_total": ("counter", cache["invalidations"]),
+        "sns_cache_sync_published_total": ("counter", sync["published"]),
+        "sns_cache_sync_received_total": ("counter", sync["received"]),
+        "sns_events_subscribers": ("gauge", events["subscribers"]),
+        "sns_events_published_total": ("counter", events["published"]),
+        "sns_events_delivered_total": ("counter", events["delivered"]),
+        "sns_events_dropped_clients_total": ("counter", events["droppedClients"]),
+        "sns_likes_pending": ("gauge", likes["pending"]),
+        "sns_likes_flushes_total": ("counter", likes["flushes"]),
+        "sns_likes_flushed_intents_total": ("counter", likes["flushedIntents"]),
+        "sns_archive_runs_total": ("counter", archived["runs"]),
+        "sns_archive_posts_total": ("counter", archived["archivedPosts"]),
+        "sns_archive_cache_hits_total": ("counter", archived["cache"]["hits"]),
+        "sns_archive_cache_misses_total": ("counter", archived["cache"]["misses"]),
+        "sns_db_read_lane_running": ("gauge", lanes["read"]["running"]),
+        "sns_db_read_lane_queued": ("gauge", lanes["read"]["queued"]),
+        "sns_db_write_lane_running": ("gauge", lanes["write"]["running"]),
+        "sns_db_write_lane_queued": ("gauge", lanes["write"]["queued"]),
+        "sns_db_lane_rejected_total": ("counter", lanes["read"]["rejected"] + lanes["write"]["rejected"]),
+        "sns_db_lane_timeouts_total": ("counter", lanes["read"]["timeouts"] + lanes["write"]["timeouts"]),
+        "sns_db_lane_cancelled_total": ("counter", lanes["read"]["cancelled"] + lanes["write"]["cancelled"]),
+        "sns_admission_rate_limited_total": ("counter", admitted["rateLimitedTotal"]),
+        "sns_admission_read_active": ("gauge", admitted["read"]["active"]),
+        "sns_admission_read_queued": ("gauge", admitted["read"]["queued"]),
+        "sns_admission_read_queued_total": ("counter", admitted["read"]["queuedTotal"]),
+        "sns_admission_read_shed_total": ("counter", admitted["read"]["shed"]),
+        "sns_admission_write_active": ("gauge", admitted["write"]["active"]),
+        "sns_admission_write_queued": ("gauge", admitted["write"]["queued"]),
+        "sns_admission_write_queued_total": ("counter", admitted["write"]["queuedTotal"]),
+        "sns_admission_write_shed_total": ("counter", admitted["write"]["shed"]),
+        "sns_replica_lag_seconds": ("gauge", max((r["lagMs"] for r in replica["shards"]), default=0) / 1000),
+        "sns_replica_reads_total": ("counter", replica["replicaReads"]),
+        "sns_replica_primary_reads_total": ("counter", replica["primaryReads"]),
+        "sns_replica_applied_total": ("counter", sum(r["applied"] for r in replica["shards"])),
+        "sns_replica_reloads_total": ("counter", sum(r["reloads"] for r in replica["shards"])),
+        "sns_json_fragments": ("gauge", fragments["entries"]),
+        "sns_json_fragment_hits_total": ("counter", fragments["hits"]),
+        "sns_json_fragment_misses_total": ("counter", fragments["misses"]),
+        "sns_json_fallbacks_total": ("counter", fragments["fallbacks"]),
+        "sns_user_summaries": ("gauge", summaries["entries"]),
+        "sns_user_summary_hits_total": ("counter", summaries["hits"]),
+        "sns_user_summary_misses_total": ("counter", summaries["misses"]),
+        "sns_user_summary_invalidations_total": ("counter", summaries["invalidations"]),
+        "sns_writer_queued": ("gauge", writer["queued"]),
+        "sns_writer_commits_total": ("counter", writer["commits"]),
+        "sns_writer_operations_total": ("counter", writer["operations"]),
+        "sns_writer_failed_commits_total": ("counter", writer["failedCommits"]),
+        "sns_writer_rejected_total": ("counter", writer["rejected"]),
+    }
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
 
 # API 라우터 등록
 app.include_router(api_router)
@@ -0,0 +1,351 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+# ------------------------------------------------
+# 계측 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 0 이면 요청 / SQL 계측을 끕니다. (/metrics 는 빈 값만 돌려줍니다)
+METRICS_ENABLED = os.environ.get("SNS_METRICS_ENABLED", "1") != "0"
+# 이 시간(ms) 이상 걸린 요청을 실행한 SQL 과 함께 로그로 남깁니다. 0 이면 끕니다.
+SLOW_REQUEST_MS = float(os.environ.get("SNS_SLOW_REQUEST_MS", "0"))
+# 느린 요청 로그에 남길 최대 SQL 수
+SLOW_LOG_MAX_STATEMENTS = int(os.environ.get("SNS_SLOW_LOG_MAX_STATEMENTS", "50"))
+
+# 요청 지연 시간 버킷(초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 요청당 SQL 수 버킷
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+# 요청 밖(좋아요 반영 스레드, 시작 시 스키마 생성 등)에서 실행된 SQL 의 operation 라벨
+BACKGROUND = "background"
+
+slow_log = logging.getLogger("sns.slow")
+
+T = TypeVar("T")
+
+
+class RequestStats:
+    """
+    요청 하나가 실행한 SQL 통계. 요청을 처리하는 스레드 하나만 건드리므로 lock 이 필요 없습니다.
+    (다른 스레드에서 실행하는 부분 작업은 Metrics.subtask 로 따로 모았다가 합칩니다)
+    """
+
+    __slots__ = ("statements", "sql_seconds", "commits", "lock_wait", "locked_retries", "log")
+
+    def __init__(self, keep_log: bool):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.commits = 0
+        self.lock_wait = 0.0
+        self.locked_retries = 0
+        # 느린 요청 로그가 켜져 있을 때만 (SQL, 초) 를 모읍니다.
+        self.log: Optional[List[Tuple[str, float]]] = [] if keep_log else None
+
+
+_current: "contextvars.ContextVar[Optional[RequestStats]]" = contextvars.ContextVar("sns_request_stats", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class _OperationMetrics:
+    __slots__ = ("latency", "statements", "max_statements", "responses", "in_flight", "sql_statements",
+                 "sql_seconds", "commits", "lock_wait", "locked_retries")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.statements = _Histogram(STATEMENT_BUCKETS)
+        # 요청 하나가 실행한 SQL 수의 최댓값 (쿼리 수 예산 검사용)
+        self.max_statements = 0
+        # 상태 코드별 응답 수
+        self.responses: Dict[int, int] = {}
+        self.in_flight = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.commits = 0
+        self.lock_wait = 0.0
+        self.locked_retries = 0
+
+
+class Metrics:
+    """
+    operation(operationId) 별 요청 / SQL 지표를 모아서 Prometheus 텍스트 형식으로 내보냅니다.
+
+    SQL 하나마다 전역 lock 을 잡지 않도록, 요청 중에는 RequestStats 에만 더하고
+    요청이 끝날 때 한 번만 lock 을 잡고 합칩니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, _OperationMetrics] = {}
+
+    def _operation(self, name: str) -> _OperationMetrics:
+        # self._lock 을 잡은 상태에서 호출
+        op = self._operations.get(name)
+        if op is None:
+            op = self._operations[name] = _OperationMetrics()
+        return op
+
+    # ------------------------------------------------
+    # 요청 시작 / 종료
+    # ------------------------------------------------
+    def begin(self, operation: str) -> Tuple[RequestStats, contextvars.Token]:
+        with self._lock:
+            self._operation(operation).in_flight += 1
+        stats = RequestStats(keep_log=SLOW_REQUEST_MS > 0)
+        return stats, _current.set(stats)
+
+    def end(self, operation: str, stats: RequestStats, token: contextvars.Token,
+            status_code: int, elapsed: float) -> None:
+        _current.reset(token)
+        with self._lock:
+            op = self._operation(operation)
+            op.in_flight -= 1
+            op.latency.observe(elapsed)
+            op.statements.observe(stats.statements)
+            op.max_statements = max(op.max_statements, stats.statements)
+            op.responses[status_code] = op.responses.get(status_code, 0) + 1
+            op.sql_statements += stats.statements
+            op.sql_seconds += stats.sql_seconds
+            op.commits += stats.commits
+            op.lock_wait += stats.lock_wait
+            op.locked_retries += stats.locked_retries
+        if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+            _log_slow_request(operation, status_code, elapsed, stats)
+
+    def _background(self, statements: int = 0, sql_seconds: float = 0.0, commits: int = 0,
+                    lock_wait: float = 0.0, locked_retries: int = 0) -> None:
+        with self._lock:
+            op = self._operation(BACKGROUND)
+            op.sql_statements += statements
+            op.sql_seconds += sql_seconds
+            op.commits += commits
+            op.lock_wait += lock_wait
+            op.locked_retries += locked_retries
+
+    def subtask(self, fn: Callable[..., T]) -> Callable[..., T]:
+        """
+        지금 요청의 일부를 다른 스레드(샤드 scatter-gather 등)에서 실행하도록 fn 을 감쌉니다.
+        실행하는 스레드마다 별도 RequestStats 에 모았다가 끝날 때 요청 통계에 더합니다.
+        """
+        parent = _current.get()
+        if parent is None:
+            return fn
+
+        def run(*args, **kwargs):
+            stats = RequestStats(keep_log=parent.log is not None)
+            token = _current.set(stats)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current.reset(token)
+                # 여러 스레드가 같은 요청 통계에 더하므로 lock 을 잡습니다. (요청 스레드는 결과를 기다리는 중)
+                with self._lock:
+                    parent.statements += stats.statements
+                    parent.sql_seconds += stats.sql_seconds
+                    parent.commits += stats.commits
+                    parent.lock_wait += stats.lock_wait
+                    parent.locked_retries += stats.locked_retries
+                    if parent.log is not None:
+                        parent.log.extend(stats.log[:max(0, SLOW_LOG_MAX_STATEMENTS - len(parent.log))])
+
+        return run
+
+    # ------------------------------------------------
+    # DB 계층에서 호출 (db.InstrumentedConnection / ConnectionPool)
+    # ------------------------------------------------
+    def record_statement(self, sql: str, seconds: float) -> None:
+        stats = _current.get()
+        if stats is None:
+            self._background(statements=1, sql_seconds=seconds)
+            return
+        stats.statements += 1
+        stats.sql_seconds += seconds
+        if stats.log is not None and len(stats.log) < SLOW_LOG_MAX_STATEMENTS:
+            stats.log.append((sql, seconds))
+
+    def record_fetch(self, seconds: float) -> None:
+        # SELECT 는 execute 이후 fetch 에서도 실행되므로 SQL 시간에 더합니다.
+        stats = _current.get()
+        if stats is None:
+            self._background(sql_seconds=seconds)
+        else:
+            stats.sql_seconds += seconds
+
+    def record_commit(self, seconds: float) -> None:
+        stats = _current.get()
+        if stats is None:
+            self._background(commits=1, sql_seconds=seconds)
+        else:
+            stats.commits += 1
+            stats.sql_seconds += seconds
+
+    def record_lock_wait(self, seconds: float, retry: bool = False) -> None:
+        stats = _current.get()
+        if stats is None:
+            self._background(lock_wait=seconds, locked_retries=int(retry))
+        else:
+            stats.lock_wait += seconds
+            stats.locked_retries += int(retry)
+
+    # ------------------------------------------------
+    # 내보내기
+    # ------------------------------------------------
+    def render(self, extra: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Prometheus 텍스트 형식 (version 0.0.4).
+        extra 는 {이름: (타입, 값)} 형태의 라벨 없는 지표입니다. (캐시 / 좋아요 통계 등)
+        """
+        with self._lock:
+            ops = sorted(self._operations.items())
+            snapshot = [(name, _copy(op)) for name, op in ops]
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("sns_http_request_duration_seconds", "histogram", "핸들러 처리 시간")
+        for name, op in snapshot:
+            if op.latency.count:
+                _histogram_lines(lines, "sns_http_request_duration_seconds", name, op.latency)
+        family("sns_http_requests_total", "counter", "상태 코드별 응답 수")
+        for name, op in snapshot:
+            for code, count in sorted(op.responses.items()):
+                lines.append(f'sns_http_requests_total{{operation="{name}",status="{code}"}} {count}')
+        family("sns_http_requests_in_flight", "gauge", "처리 중인 요청 수")
+        for name, op in snapshot:
+            if name != BACKGROUND:
+                lines.append(f'sns_http_requests_in_flight{{operation="{name}"}} {op.in_flight}')
+        family("sns_db_statements_per_request", "histogram", "요청 하나가 실행한 SQL 수")
+        for name, op in snapshot:
+            if op.statements.count:
+                _histogram_lines(lines, "sns_db_statements_per_request", name, op.statements)
+        family("sns_db_statements_per_request_max", "gauge", "요청 하나가 실행한 SQL 수의 최댓값")
+        for name, op in snapshot:
+            if op.statements.count:
+                lines.append(f'sns_db_statements_per_request_max{{operation="{name}"}} {op.max_statements}')
+
+        for metric, attr, kind, help_text in (
+            ("sns_db_statements_total", "sql_statements", "counter", "실행한 SQL 수"),
+            ("sns_db_seconds_total", "sql_seconds", "counter", "SQL 실행 / fetch / commit 에 쓴 시간"),
+            ("sns_db_commits_total", "commits", "counter", "commit 수"),
+            ("sns_db_lock_wait_seconds_total", "lock_wait", "counter", "writer 잠금과 database is locked 재시도로 기다린 시간"),
+            ("sns_db_locked_retries_total", "locked_retries", "counter", "database is locked 로 다시 실행한 횟수"),
+        ):
+            family(metric, kind, help_text)
+            for name, op in snapshot:
+                lines.append(f'{metric}{{operation="{name}"}} {_number(getattr(op, attr))}')
+
+        for name, (kind, value) in sorted((extra or {}).items()):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def statement_counts(self) -> Dict[str, Tuple[int, int]]:
+        """{operation: (요청 수, 요청당 최대 SQL 수)} (bench budget 에서 사용)"""
+        with self._lock:
+            return {name: (op.statements.count, op.max_statements)
+                    for name, op in self._operations.items() if op.statements.count}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+
+
+def _copy(op: _OperationMetrics) -> _OperationMetrics:
+    copy = _OperationMetrics()
+    for attr in _OperationMetrics.__slots__:
+        value = getattr(op, attr)
+        if isinstance(value, _Histogram):
+            h = _Histogram(value.buckets)
+            h.counts, h.total, h.count = list(value.counts), value.total, value.count
+            value = h
+        elif isinstance(value, dict):
+            value = dict(value)
+        setattr(copy, attr, value)
+    return copy
+
+
+def _histogram_lines(lines: List[str], metric: str, operation: str, h: _Histogram) -> None:
+    cumulative = 0
+    for bound, count in zip(h.buckets, h.counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{operation="{operation}",le="{_number(bound)}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{operation="{operation}",le="+Inf"}} {h.count}')
+    lines.append(f'{metric}_sum{{operation="{operation}"}} {_number(h.total)}')
+    lines.append(f'{metric}_count{{operation="{operation}"}} {h.count}')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(round(value, 6))
+    return str(int(value))
+
+
+def _log_slow_request(operation: str, status_code: int, elapsed: float, stats: RequestStats) -> None:
+    statements = "\n".join(f"  {seconds * 1000:8.3f} ms  {' '.join(sql.split())}" for sql, seconds in stats.log)
+    omitted = stats.statements - len(stats.log)
+    if omitted > 0:
+        statements += f"\n  ... {omitted} more"
+    slow_log.warning("slow request %s -> %d: %.1f ms, %d statements, sql %.1f ms, lock wait %.1f ms\n%s",
+                     operation, status_code, elapsed * 1000, stats.statements, stats.sql_seconds * 1000,
+                     stats.lock_wait * 1000, statements)
+
+
+metrics = Metrics()
+
+
+# ------------------------------------------------
+# 라우트 계측
+# ------------------------------------------------
+class InstrumentedRoute(APIRoute):
+    """
+    핸들러를 감싸서 operationId 별 지연 시간 / 처리 중 요청 / SQL 통계를 남기는 APIRoute.
+    (APIRouter(route_class=InstrumentedRoute) 로 사용)
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not METRICS_ENABLED:
+            return handler
+        operation = self.operation_id or self.name
+
+        async def instrumented(request: Request) -> Response:
+            stats, token = metrics.begin(operation)
+            started = time.perf_counter()
+            status_code = 500
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except Exception as e:
+                status_code = getattr(e, "status_code", 500)
+                raise
+            finally:
+                metrics.end(operation, stats, token, status_code, time.perf_counter() - started)
+
+        return instrumented
@@ -0,0 +1,247 @@
+import argparse
+import datetime
+import sqlite3
+import sys
+from typing import Callable, List, NamedTuple, Optional
+
+from archive import create_archive_tables, create_archived_user_counts
+from db import DB_PATH
+from replica import create_change_log
+from search import create_search_index
+from trending import add_like_times, create_trending_index
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+# ------------------------------------------------
+# 마이그레이션 (버전 순서대로 한 번씩 적용, 이미 배포된 항목은 수정하지 말고 새 항목을 추가)
+# ------------------------------------------------
+def _initial_tables(conn: sqlite3.Connection) -> None:
+    # 버전 관리 이전에 만들어진 데이터베이스도 그대로 이어받도록 IF NOT EXISTS 를 씁니다.
+    c = conn.cursor()
+
+    # 포스트 테이블
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS posts (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      userName TEXT NOT NULL,
+      content TEXT NOT NULL,
+      createdAt TEXT NOT NULL,
+      updatedAt TEXT NOT NULL,
+      likeCount INTEGER NOT NULL,
+      commentCount INTEGER NOT NULL
+    )
+    """)
+
+    # 댓글 테이블
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS comments (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      postId INTEGER NOT NULL,
+      userName TEXT NOT NULL,
+      content TEXT NOT NULL,
+      createdAt TEXT NOT NULL,
+      updatedAt TEXT NOT NULL
+    )
+    """)
+
+    # 좋아요 테이블
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS likes (
+      postId INTEGER NOT NULL,
+      userName TEXT NOT NULL,
+      PRIMARY KEY (postId, userName)
+    )
+    """)
+
+
+def _foreign_keys(conn: sqlite3.Connection) -> None:
+    # SQLite 는 기존 테이블에 FOREIGN KEY 를 추가할 수 없으므로 새 테이블로 옮겨 담습니다.
+    c = conn.cursor()
+
+    # 포스트가 없는 댓글 / 좋아요는 옮길 수 없으므로 먼저 지웁니다. (검색 색인도 트리거로 함께 정리)
+    c.execute("DELETE FROM comments WHERE postId NOT IN (SELECT id FROM posts)")
+    c.execute("DELETE FROM likes WHERE postId NOT IN (SELECT id FROM posts)")
+
+    # 지워진 최신 댓글의 id 가 다시 쓰이지 않도록 AUTOINCREMENT 시퀀스를 유지합니다.
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'comments'")
+    row = c.fetchone()
+    comment_seq = row[0] if row else 0
+
+    c.execute("""
+    CREATE TABLE comments_new (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      postId INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+      userName TEXT NOT NULL,
+      content TEXT NOT NULL,
+      createdAt TEXT NOT NULL,
+      updatedAt TEXT NOT NULL
+    )
+    """)
+    c.execute("""
+        INSERT INTO comments_new (id, postId, userName, content, createdAt, updatedAt)
+        SELECT id, postId, userName, content, createdAt, updatedAt FROM comments
+    """)
+    c.execute("DROP TABLE comments")
+    c.execute("ALTER TABLE comments_new RENAME TO comments")
+    c.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'comments'", (comment_seq,))
+
+    c.execute("""
+    CREATE TABLE likes_new (
+      postId INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+      userName TEXT NOT NULL,
+      PRIMARY KEY (postId, userName)
+    )
+    """)
+    c.execute("INSERT INTO likes_new (postId, userName) SELECT postId, userName FROM likes")
+    c.execute("DROP TABLE likes")
+    c.execute("ALTER TABLE likes_new RENAME TO likes")
+
+    # DROP TABLE 로 함께 지워진 댓글 검색 색인 트리거를 다시 만듭니다. (색인 내용은 id 가 같으므로 그대로 유효)
+    create_search_index(conn)
+
+
+def _comments_post_index(conn: sqlite3.Connection) -> None:
+    # 포스트별 댓글 목록(postId, id DESC 키셋)과 댓글 수 재계산, ON DELETE CASCADE 를 색인으로 처리합니다.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (postId, id)")
+
+
+def _analyze(conn: sqlite3.Connection) -> None:
+    # 새 색인을 쿼리 플래너가 바로 쓰도록 통계를 만듭니다.
+    conn.execute("ANALYZE")
+
+
+def _user_indexes(conn: sqlite3.Connection) -> None:
+    # 사용자별 포스트 / 댓글 / 좋아요 목록(userName, id DESC 키셋)과 사용자 요약의 개수 세기를 색인으로 처리합니다.
+    # 좋아요에는 id 가 없으므로 포스트 id 로 정렬합니다. (샤드가 여러 개여도 전역에서 유일한 값)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_user ON posts (userName, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_user ON comments (userName, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_likes_user ON likes (userName, postId)")
+    # 새 색인의 통계만 만듭니다.
+    for index in ("idx_posts_user", "idx_comments_user", "idx_likes_user"):
+        conn.execute(f"ANALYZE {index}")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_tables", _initial_tables),
+    Migration(2, "search_index", create_search_index),
+    Migration(3, "foreign_keys_cascade", _foreign_keys),
+    Migration(4, "comments_post_index", _comments_post_index),
+    Migration(5, "analyze", _analyze),
+    Migration(6, "trending_index", create_trending_index),
+    Migration(7, "archived_posts", create_archive_tables),
+    Migration(8, "replica_change_log", create_change_log),
+    Migration(9, "user_indexes", _user_indexes),
+    Migration(10, "archived_user_counts", create_archived_user_counts),
+    Migration(11, "like_times", add_like_times),
+]
+
+
+# ------------------------------------------------
+# 적용
+# ------------------------------------------------
+def _ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+      version INTEGER PRIMARY KEY,
+      name TEXT NOT NULL,
+      appliedAt TEXT NOT NULL
+    )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn: sqlite3.Connection) -> dict:
+    """{version: appliedAt}"""
+    _ensure_version_table(conn)
+    return {v: at for v, at in conn.execute("SELECT version, appliedAt FROM schema_version")}
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return max(applied_versions(conn), default=0)
+
+
+def pending_migrations(conn: sqlite3.Connection, target: Optional[int] = None) -> List[Migration]:
+    applied = applied_versions(conn)
+    return [m for m in MIGRATIONS
+            if m.version not in applied and (target is None or m.version <= target)]
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> List[Migration]:
+    """
+    아직 적용되지 않은 마이그레이션을 버전 순서대로 각각 한 트랜잭션에서 적용합니다.
+    하나가 실패하면 그 마이그레이션만 되돌리고 예외를 다시 발생시킵니다. (앞선 항목은 적용된 채로 남음)
+    """
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+        # 빈 파일: 테이블을 만들기 전에만 바꿀 수 있습니다. (보관 후 빈 페이지 정리용, archive.py)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    pending = pending_migrations(conn, target)
+    if not pending:
+        return []
+
+    # 테이블을 다시 만드는 동안에는 외래 키 검사를 끕니다. (트랜잭션 밖에서만 바꿀 수 있음)
+    conn.commit()
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for migration in pending:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                migration.apply(conn)
+                violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+                if violations:
+                    raise sqlite3.IntegrityError(f"외래 키 위반 {len(violations)}건: {violations[:5]}")
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, appliedAt) VALUES (?, ?, ?)",
+                    (migration.version, migration.name, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    finally:
+        conn.execute(f"PRAGMA foreign_keys={'ON' if foreign_keys else 'OFF'}")
+    return pending
+
+
+# ------------------------------------------------
+# CLI (python migrations.py status|apply)
+# ------------------------------------------------
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python migrations.py", description="Simple SNS 스키마 마이그레이션")
+    parser.add_argument("--db", default=DB_PATH, help=f"데이터베이스 파일 경로 (기본: {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="적용된 / 대기 중인 마이그레이션을 보여줍니다.")
+    apply = sub.add_parser("apply", help="대기 중인 마이그레이션을 적용합니다.")
+    apply.add_argument("--to", type=int, help="이 버전까지만 적용")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None) -> int:
+    args = _parse_args(argv)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "status":
+            applied = applied_versions(conn)
+            for m in MIGRATIONS:
+                state = f"적용됨 {applied[m.version]}" if m.version in applied else "대기"
+                print(f"{m.version:>4}  {m.name:<24}{state}")
+            return 0
+
+        applied = migrate(conn, args.to)
+        for m in applied:
+            print(f"적용: {m.version} {m.name}")
+        if not applied:
+            print("적용할 마이그레이션이 없습니다.")
+        print(f"현재 버전: {current_version(conn)}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
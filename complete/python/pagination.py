@@ -0,0 +1,66 @@
+import base64
+import binascii
+import os
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+
+# ------------------------------------------------
+# 페이지 크기 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+DEFAULT_PAGE_SIZE = int(os.environ.get("SNS_DEFAULT_PAGE_SIZE", "20"))
+# 클라이언트가 더 큰 limit 를 보내도 이 값으로 잘라냅니다.
+MAX_PAGE_SIZE = int(os.environ.get("SNS_MAX_PAGE_SIZE", "100"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(kind: str, last_id: int) -> str:
+    # 커서는 클라이언트에게 의미 없는 문자열이어야 하므로 base64url 로 감쌉니다.
+    raw = f"{kind}:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        cursor_kind, _, value = raw.partition(":")
+        last_id = int(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("잘못된 커서입니다.")
+    # 다른 목록에서 받은 커서는 거부합니다.
+    if cursor_kind != kind or last_id < 1:
+        raise InvalidCursor("잘못된 커서입니다.")
+    return last_id
+
+
+def paginate(kind: str, rows: list, limit: int, id_index: int = 0) -> Tuple[list, Optional[str]]:
+    """
+    limit + 1 개까지 조회한 rows 를 받아 limit 개로 자르고,
+    다음 페이지가 있으면 그 커서를 함께 돌려줍니다.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(kind, rows[-1][id_index])
+
+
+def set_cursor_headers(request: Request, response: Response, cursor: Optional[str], limit: int) -> None:
+    if cursor is None:
+        return
+    next_url = request.url.include_query_params(limit=limit, after=cursor)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -0,0 +1,439 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from fastapi import Request
+
+from db import BUSY_TIMEOUT_MS, POOL_SIZE, ConnectionPool
+
+if TYPE_CHECKING:
+    # storage -> migrations -> replica 순서로 import 되므로 타입 검사할 때만 가져옵니다.
+    from storage import Shard, ShardedStorage
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 읽기 복제본 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 1 이면 샤드마다 데이터베이스를 메모리로 복사해 두고 포스트 / 댓글 조회를 복제본에서 읽습니다.
+REPLICA_ENABLED = os.environ.get("SNS_REPLICA", "0") == "1"
+# 변경 기록을 확인해서 복제본에 반영하는 주기(초)
+REPLICA_INTERVAL = float(os.environ.get("SNS_REPLICA_INTERVAL", "0.01"))
+# 복제본이 이 시간(초)보다 오래 따라잡지 못하면 따라잡을 때까지 디스크에서 읽습니다.
+MAX_STALENESS = float(os.environ.get("SNS_REPLICA_MAX_STALENESS", "1"))
+# 한 트랜잭션에 반영하는 변경 기록 수. 작을수록 복제본을 읽는 요청이 덜 기다립니다.
+BATCH_SIZE = int(os.environ.get("SNS_REPLICA_BATCH_SIZE", "500"))
+# 변경 기록을 보관하는 시간(초). 이보다 오래 멈춰 있던 복제본은 처음부터 다시 복사합니다.
+LOG_RETENTION = float(os.environ.get("SNS_REPLICA_LOG_RETENTION", "60"))
+
+# 이 헤더가 0 이 아니면 요청이 도착하기 전에 commit 된 변경이 복제본에 반영된 뒤에 읽습니다.
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+# 복제본에 따라 반영하는 테이블: (테이블, 키, 포스트 id)
+TRACKED_TABLES = (
+    ("posts", "id", "id"),
+    ("comments", "id", "postId"),
+    ("archived_posts", "id", "id"),
+)
+
+T = TypeVar("T")
+
+# (tableName, op, rowKey, postId). op 는 I / U / D
+Change = Tuple[str, str, int, int]
+
+
+class ChangeLogGap(Exception):
+    pass
+
+
+# ------------------------------------------------
+# 변경 기록 (디스크 데이터베이스)
+# ------------------------------------------------
+def create_change_log(conn: sqlite3.Connection) -> None:
+    """
+    복제본이 따라 반영할 변경 기록 표를 만듭니다. 기록은 복제본을 켰을 때만 트리거가 채웁니다.
+    (enable_change_log) commit 은 호출하는 쪽(마이그레이션)에서 합니다.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS replica_changes (
+      seq INTEGER PRIMARY KEY AUTOINCREMENT,
+      tableName TEXT NOT NULL,
+      op TEXT NOT NULL,
+      rowKey INTEGER NOT NULL,
+      postId INTEGER NOT NULL,
+      createdAt INTEGER NOT NULL
+    )
+    """)
+
+
+def enable_change_log(conn: sqlite3.Connection) -> None:
+    """
+    추적하는 테이블이 바뀔 때마다 바뀐 행의 키를 replica_changes 에 남기는 트리거를 만듭니다.
+    ON DELETE CASCADE 로 함께 지워지는 댓글도 트리거가 기록합니다.
+    """
+    for table, key, post_key in TRACKED_TABLES:
+        for event, op, ref in (("INSERT", "I", "new"), ("UPDATE", "U", "new"), ("DELETE", "D", "old")):
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS replica_{table}_{op.lower()} AFTER {event} ON {table} BEGIN
+              INSERT INTO replica_changes (tableName, op, rowKey, postId, createdAt)
+              VALUES ('{table}', '{op}', {ref}.{key}, {ref}.{post_key}, CAST(strftime('%s', 'now') AS INTEGER));
+            END
+            """)
+
+
+def disable_change_log(conn: sqlite3.Connection) -> None:
+    """복제본을 끄면 쓰기마다 기록이 쌓이지 않도록 트리거와 남은 기록을 지웁니다."""
+    for table, _, _ in TRACKED_TABLES:
+        for op in ("i", "u", "d"):
+            conn.execute(f"DROP TRIGGER IF EXISTS replica_{table}_{op}")
+    conn.execute("DELETE FROM replica_changes")
+
+
+def prune_change_log(conn: sqlite3.Connection, cutoff: float) -> int:
+    # 기록은 seq 순서로 쌓이므로 cutoff 이후의 첫 기록 앞까지를 기본 키 범위로 지웁니다.
+    return conn.execute("""
+        DELETE FROM replica_changes WHERE seq < COALESCE(
+          (SELECT seq FROM replica_changes WHERE createdAt >= ? ORDER BY seq LIMIT 1),
+          (SELECT MAX(seq) + 1 FROM replica_changes))
+    """, (cutoff,)).rowcount
+
+
+def log_position(conn: sqlite3.Connection) -> int:
+    """지금까지 남긴 마지막 변경 기록의 seq (지워진 기록 포함)"""
+    row = conn.execute("SELECT seq FROM main.sqlite_sequence WHERE name = 'replica_changes'").fetchone()
+    return row[0] if row else 0
+
+
+# ------------------------------------------------
+# 복제본 (샤드 하나)
+# ------------------------------------------------
+_PENDING_SQL = """
+    SELECT seq, tableName, op, rowKey, postId FROM replica_changes
+    WHERE seq > ? ORDER BY seq LIMIT ?
+"""
+_CHANGED_KEYS = "SELECT rowKey FROM main.replica_changes WHERE seq BETWEEN ? AND ? AND tableName = ?"
+
+
+class Replica:
+    """
+    샤드 파일 하나를 메모리 데이터베이스(memdb)로 복사한 읽기 복제본.
+
+    처음에는 VACUUM INTO 로 한 시점의 내용을 통째로 복사하고, 그 뒤로는 디스크를 열고 복제본을 붙여(ATTACH) 둔
+    전용 커넥션이 변경 기록의 다음 구간을 읽어 그 구간에서 바뀐 행을 디스크의 현재 값으로 다시 복사합니다.
+    같은 변경을 두 번 반영해도 결과가 같으므로, 복사 직전의 기록 위치부터 이어서 반영하면 됩니다.
+    읽기 요청은 같은 메모리 데이터베이스를 여는 커넥션 풀(pool)에서 커넥션을 빌립니다.
+    """
+
+    def __init__(self, index: int, path: str, pool_size: int = POOL_SIZE):
+        self.index = index
+        self.path = path
+        self.pool_size = pool_size
+        self.pool: Optional[ConnectionPool] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._generation = 0
+        self._data_version: Optional[int] = None
+        self.last_seq = 0
+        # 마지막으로 변경 기록을 끝까지 따라잡은 확인의 시작 시각 (그 전에 commit 된 변경은 모두 반영됨)
+        self.synced_at = 0.0
+        self.stale = False
+
+        self.applied = 0
+        self.batches = 0
+        self.reloads = 0
+        self.last_load_ms = 0.0
+
+    def load(self) -> None:
+        """디스크의 현재 내용을 새 메모리 데이터베이스로 복사하고 바꿔 끼웁니다."""
+        started = time.perf_counter()
+        self._generation += 1
+        uri = f"file:/sns-replica-{os.getpid()}-{self.index}-{self._generation}?vfs=memdb"
+        # 복사하는 동안 메모리 데이터베이스가 사라지지 않도록 열어 둡니다. (마지막 커넥션이 닫히면 사라짐)
+        holder = sqlite3.connect(uri, uri=True)
+        # 변경을 반영할 커넥션: 디스크 파일을 열고 복제본을 replica 로 붙입니다.
+        conn = sqlite3.connect(self.path, uri=True, isolation_level=None, check_same_thread=False,
+                               timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            # 복사보다 먼저 읽은 위치부터 반영하므로 복사하는 동안의 변경도 빠지지 않습니다.
+            last_seq = log_position(conn)
+            # backup API 는 WAL 파일 헤더까지 복사해서 memdb 를 다른 커넥션이 열 수 없게 되므로 VACUUM INTO 를 씁니다.
+            conn.execute("VACUUM INTO ?", (uri,))
+            conn.execute("ATTACH DATABASE ? AS replica", (uri,))
+            # 검색 색인 / 인기 점수 / 변경 기록 트리거는 복제본에서 다시 실행되지 않도록 지웁니다.
+            for (name,) in conn.execute("SELECT name FROM replica.sqlite_master WHERE type = 'trigger'").fetchall():
+                conn.execute(f'DROP TRIGGER replica."{name}"')
+        except BaseException:
+            conn.close()
+            raise
+        finally:
+            holder.close()
+        pool = ConnectionPool(uri, self.pool_size, uri=True)
+
+        old_pool, old_conn = self.pool, self._conn
+        self.pool, self._conn = pool, conn
+        self.last_seq = last_seq
+        self._data_version = None
+        if old_conn is not None:
+            # 빌려 간 커넥션은 반납될 때 닫힙니다.
+            old_pool.close()
+            old_conn.close()
+            self.reloads += 1
+        self.last_load_ms = (time.perf_counter() - started) * 1000
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self.pool.close()
+            self._conn.close()
+            self.pool = self._conn = None
+
+    def poll(self, batch_size: int, on_apply: Callable[[List[Change]], None]) -> int:
+        """디스크에 새 commit 이 있었으면 변경 기록을 끝까지 반영하고 반영한 기록 수를 돌려줍니다."""
+        started = time.monotonic()
+        applied = 0
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            # 반영하는 동안 생긴 commit 은 다음 확인에서 다시 봅니다.
+            self._data_version = data_version
+            while True:
+                count = self._apply_batch(batch_size, on_apply)
+                applied += count
+                if count < batch_size:
+                    break
+        self.synced_at = started
+        return applied
+
+    def _apply_batch(self, batch_size: int, on_apply: Callable[[List[Change]], None]) -> int:
+        conn = self._conn
+        rows = conn.execute(_PENDING_SQL, (self.last_seq, batch_size)).fetchall()
+        if not rows:
+            # 반영하지 않은 기록이 보관 시간이 지나 모두 지워졌을 수도 있습니다.
+            if log_position(conn) > self.last_seq:
+                raise ChangeLogGap()
+            return 0
+        if rows[0][0] != self.last_seq + 1:
+            raise ChangeLogGap()
+
+        first, last = rows[0][0], rows[-1][0]
+        tables = {row[1] for row in rows}
+        conn.execute("BEGIN")
+        try:
+            # 포스트가 지워졌다면 디스크에도 없으므로 지우기만 하고, 있으면 현재 값으로 바꿉니다.
+            for table, key, _ in TRACKED_TABLES:
+                if table in tables:
+                    conn.execute(f"DELETE FROM replica.{table} WHERE {key} IN ({_CHANGED_KEYS})", (first, last, table))
+                    conn.execute(f"INSERT INTO replica.{table} SELECT * FROM main.{table} WHERE {key} IN ({_CHANGED_KEYS})",
+                                 (first, last, table))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.last_seq = last
+        self.applied += len(rows)
+        self.batches += 1
+        on_apply([row[1:] for row in rows])
+        return len(rows)
+
+    def stats(self, now: float) -> dict:
+        return {
+            "lastSeq": self.last_seq,
+            "lagMs": round((now - self.synced_at) * 1000, 3),
+            "applied": self.applied,
+            "batches": self.batches,
+            "reloads": self.reloads,
+            "lastLoadMs": round(self.last_load_ms, 3),
+        }
+
+
+class ReplicaSet:
+    """
+    샤드별 읽기 복제본과 그 복제본을 따라잡게 하는 백그라운드 스레드.
+
+    조회는 복제본이 MAX_STALENESS 안에 디스크를 따라잡았을 때만 복제본에서 읽고, 아니면 디스크에서 읽습니다.
+    X-Read-Your-Writes 요청은 요청이 도착한 뒤에 시작한 확인이 끝날 때까지 기다립니다. (바로 확인하도록 스레드를 깨움)
+    반영한 변경은 on_apply 로 알려 읽기 캐시에서 지우게 하고, 복제본을 다시 복사했거나 너무 뒤처져서
+    캐시 무효화를 놓쳤을 수 있을 때는 on_reset 으로 캐시를 모두 비우게 합니다.
+    """
+
+    def __init__(self, enabled: bool = REPLICA_ENABLED, interval: float = REPLICA_INTERVAL,
+                 max_staleness: float = MAX_STALENESS, batch_size: int = BATCH_SIZE,
+                 retention: float = LOG_RETENTION):
+        self.enabled = enabled
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.batch_size = max(1, batch_size)
+        self.retention = retention
+        self.storage: Optional["ShardedStorage"] = None
+        self.replicas: List[Replica] = []
+        self.on_apply: Callable[[List[Change]], None] = lambda changes: None
+        self.on_reset: Callable[[], None] = lambda: None
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._synced = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.waits = 0
+        self.wait_timeouts = 0
+        self.resets = 0
+
+    # ------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------
+    def start(self, storage: "ShardedStorage", on_apply: Optional[Callable[[List[Change]], None]] = None,
+              on_reset: Optional[Callable[[], None]] = None) -> None:
+        self.storage = storage
+        for shard in storage.shards:
+            with shard.pool.writer() as conn:
+                if self.enabled:
+                    enable_change_log(conn)
+                else:
+                    disable_change_log(conn)
+        if not self.enabled:
+            return
+        if on_apply is not None:
+            self.on_apply = on_apply
+        if on_reset is not None:
+            self.on_reset = on_reset
+        for shard in storage.shards:
+            replica = Replica(shard.index, shard.path, storage.pool_size)
+            replica.load()
+            replica.poll(self.batch_size, self.on_apply)
+            self.replicas.append(replica)
+        self._last_prune = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="read-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for replica in self.replicas:
+            replica.close()
+        self.replicas = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            for replica in self.replicas:
+                self._poll(replica)
+            with self._synced:
+                self._synced.notify_all()
+            if self.retention > 0 and time.monotonic() - self._last_prune > self.retention / 2:
+                self._last_prune = time.monotonic()
+                self._prune()
+
+    def _poll(self, replica: Replica) -> None:
+        try:
+            replica.poll(self.batch_size, self.on_apply)
+        except ChangeLogGap:
+            logger.warning("샤드 %d 복제본이 지워진 변경 기록을 건너뛰어 다시 복사합니다.", replica.index)
+            try:
+                replica.load()
+                replica.poll(self.batch_size, self.on_apply)
+            except sqlite3.Error:
+                logger.exception("샤드 %d 복제본을 다시 복사하지 못했습니다.", replica.index)
+            self.resets += 1
+            self.on_reset()
+        except sqlite3.Error:
+            # 다음 주기에 다시 시도합니다. 그동안 뒤처진 만큼은 디스크에서 읽습니다.
+            logger.exception("샤드 %d 복제본에 변경을 반영하지 못했습니다.", replica.index)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        for shard in self.storage.shards:
+            try:
+                shard.write_queue.run(lambda conn: prune_change_log(conn, cutoff))
+            except Exception:
+                logger.exception("샤드 %d 의 오래된 변경 기록을 지우지 못했습니다.", shard.index)
+
+    # ------------------------------------------------
+    # 읽기
+    # ------------------------------------------------
+    def prepare(self, request: Request, shards: Optional[List["Shard"]] = None) -> None:
+        """
+        X-Read-Your-Writes 요청이면 요청이 도착하기 전에 commit 된 변경이 (shards 의) 복제본에 반영될 때까지
+        최대 MAX_STALENESS 동안 기다립니다. 읽기 캐시를 보기 전에 호출해야 캐시에 남은 이전 값도 피할 수 있습니다.
+        """
+        if not self.replicas or request.headers.get(READ_YOUR_WRITES_HEADER, "0") == "0":
+            return
+        since = time.monotonic()
+        replicas = self.replicas if shards is None else [self.replicas[shard.index] for shard in shards]
+        self.waits += 1
+        self._wake.set()
+        with self._synced:
+            synced = self._synced.wait_for(lambda: all(r.synced_at >= since for r in replicas), self.max_staleness)
+        if not synced:
+            # 기다린 만큼 뒤처진 복제본은 reader 가 디스크로 돌립니다.
+            self.wait_timeouts += 1
+
+    @contextmanager
+    def reader(self, shard: "Shard") -> Iterator[sqlite3.Connection]:
+        """샤드의 읽기 커넥션. 복제본이 충분히 따라잡았으면 복제본, 아니면 디스크"""
+        if not self.replicas:
+            with shard.pool.reader() as conn:
+                yield conn
+            return
+        replica = self.replicas[shard.index]
+        if not self._usable(replica):
+            self.primary_reads += 1
+            with shard.pool.reader() as conn:
+                yield conn
+            return
+        self.replica_reads += 1
+        with replica.pool.reader() as conn:
+            yield conn
+
+    def read_all(self, fn: Callable[[sqlite3.Connection], T]) -> List[T]:
+        """storage.read_all 과 같지만 샤드마다 reader 의 커넥션으로 읽습니다."""
+        def read(shard: "Shard") -> T:
+            with self.reader(shard) as conn:
+                return fn(conn)
+        return self.storage.gather(read)
+
+    def _usable(self, replica: Replica) -> bool:
+        if time.monotonic() - replica.synced_at <= self.max_staleness:
+            replica.stale = False
+            return True
+        if not replica.stale:
+            # 뒤처진 동안 반영하지 못한 변경의 캐시 항목이 남아 있을 수 있으므로 한 번 비웁니다.
+            replica.stale = True
+            self.resets += 1
+            self.on_reset()
+        return False
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "interval": self.interval,
+            "maxStaleness": self.max_staleness,
+            "replicaReads": self.replica_reads,
+            "primaryReads": self.primary_reads,
+            "readYourWritesWaits": self.waits,
+            "readYourWritesTimeouts": self.wait_timeouts,
+            "resets": self.resets,
+            "shards": [replica.stats(now) for replica in self.replicas],
+        }
+
+
+replicas = ReplicaSet()
+
+
+def get_read_conn(postId: int, request: Request) -> Iterator[sqlite3.Connection]:
+    """조회 핸들러용 get_post_conn. 읽기 복제본을 켰으면 복제본의 커넥션을 빌려줍니다. (FastAPI dependency)"""
+    shard = replicas.storage.for_post(postId)
+    replicas.prepare(request, [shard])
+    with replicas.reader(shard) as conn:
+        yield conn
@@ -0,0 +1,471 @@
+import sqlite3
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List, Optional, Set, Tuple
+
+# ------------------------------------------------
+# 데이터 접근 계층
+#
+# 핸들러는 SQL 을 직접 쓰지 않고 이 모듈의 함수를 호출합니다.
+# - 변경 후 다시 SELECT 하지 않도록 INSERT / UPDATE ... RETURNING 을 사용합니다.
+# - 존재 확인과 소유 확인(댓글이 그 포스트의 것인지)은 본 쿼리의 WHERE 에 합쳐서,
+#   "없음" 을 구분해야 하는 실패 경로에서만 추가 쿼리를 실행합니다.
+# - SQL 문자열은 모두 상수라서 커넥션별 prepared statement 캐시(cached_statements)에 그대로 재사용됩니다.
+#   (필드 선택 목록 조회도 컬럼 조합마다 한 번 만든 문자열을 재사용합니다)
+# ------------------------------------------------
+
+POST_COLUMNS = ("id", "userName", "content", "createdAt", "updatedAt", "likeCount", "commentCount")
+COMMENT_COLUMNS = ("id", "postId", "userName", "content", "createdAt", "updatedAt")
+
+# 여러 행을 VALUES 하나로 보낼 때 한 문장에 넣는 최대 행 수 (SQLite 변수 수 제한 안쪽)
+MAX_ROWS_PER_STATEMENT = 500
+
+_POST = ", ".join(POST_COLUMNS)
+_COMMENT = ", ".join(COMMENT_COLUMNS)
+
+Key = Tuple[int, str]
+
+
+# ------------------------------------------------
+# 필드 선택 (?fields=)
+# ------------------------------------------------
+class UnknownField(ValueError):
+    pass
+
+
+def project_columns(all_columns: Tuple[str, ...], fields: str) -> Tuple[str, ...]:
+    """
+    "id,likeCount" 같은 필드 목록을 all_columns 순서의 컬럼 튜플로 바꿉니다.
+    id 는 커서와 샤드 병합에 필요하므로 항상 맨 앞에 포함합니다.
+    """
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested.difference(all_columns))
+    if unknown:
+        raise UnknownField(f"알 수 없는 필드입니다: {', '.join(unknown)} (가능한 필드: {', '.join(all_columns)})")
+    return tuple(column for column in all_columns if column == "id" or column in requested)
+
+
+# 선택한 컬럼 조합마다 SQL 을 한 번만 만들어 두므로 prepared statement 캐시도 그대로 재사용됩니다.
+# (컬럼 이름은 project_columns 가 허용 목록으로 확인한 것만 들어옵니다)
+_PROJECTED_SQL = {
+    "posts": ("SELECT {} FROM posts ORDER BY id DESC LIMIT ?",
+              "SELECT {} FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?"),
+    "comments": ("SELECT {} FROM comments WHERE postId = ? ORDER BY id DESC LIMIT ?",
+                 "SELECT {} FROM comments WHERE postId = ? AND id < ? ORDER BY id DESC LIMIT ?"),
+}
+
+
+@lru_cache(maxsize=256)
+def _projected_sql(table: str, columns: Tuple[str, ...], after: bool) -> str:
+    return _PROJECTED_SQL[table][after].format(", ".join(columns))
+
+
+def projected_dict(columns: Tuple[str, ...], row: tuple) -> dict:
+    return dict(zip(columns, row))
+
+
+def post_dict(row: tuple) -> dict:
+    return dict(zip(POST_COLUMNS, row))
+
+
+def comment_dict(row: tuple) -> dict:
+    return dict(zip(COMMENT_COLUMNS, row))
+
+
+def last_insert_id(conn: sqlite3.Connection, table: str) -> int:
+    # executemany 는 lastrowid 를 돌려주지 않으므로 AUTOINCREMENT 시퀀스를 읽습니다.
+    return conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()[0]
+
+
+# ------------------------------------------------
+# 포스트
+# ------------------------------------------------
+_LIST_POSTS = f"SELECT {_POST} FROM posts ORDER BY id DESC LIMIT ?"
+_LIST_POSTS_AFTER = f"SELECT {_POST} FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?"
+_GET_POST = f"SELECT {_POST} FROM posts WHERE id = ?"
+_POST_EXISTS = "SELECT 1 FROM posts WHERE id = ?"
+# id 가 NULL 이면 AUTOINCREMENT 가, 값이 있으면(샤드 저장소의 전역 id) 그 값이 쓰입니다.
+_INSERT_POST = f"""
+    INSERT INTO posts (id, userName, content, createdAt, updatedAt, likeCount, commentCount)
+    VALUES (?, ?, ?, ?, ?, 0, 0)
+    RETURNING {_POST}
+"""
+_INSERT_POSTS = """
+    INSERT INTO posts (id, userName, content, createdAt, updatedAt, likeCount, commentCount)
+    VALUES (?, ?, ?, ?, ?, 0, 0)
+"""
+_UPDATE_POST = f"UPDATE posts SET content = ?, updatedAt = ? WHERE id = ? RETURNING {_POST}"
+_DELETE_POST = "DELETE FROM posts WHERE id = ?"
+
+
+def list_posts(conn: sqlite3.Connection, limit: int, before_id: Optional[int] = None,
+               columns: Optional[Tuple[str, ...]] = None) -> List[tuple]:
+    """최신순으로 limit 개. before_id 가 있으면 그보다 작은 id 부터. columns 를 주면 그 컬럼만 읽습니다."""
+    if columns is not None:
+        sql = _projected_sql("posts", columns, before_id is not None)
+        return conn.execute(sql, (limit,) if before_id is None else (before_id, limit)).fetchall()
+    if before_id is None:
+        return conn.execute(_LIST_POSTS, (limit,)).fetchall()
+    return conn.execute(_LIST_POSTS_AFTER, (before_id, limit)).fetchall()
+
+
+def get_post(conn: sqlite3.Connection, post_id: int) -> Optional[tuple]:
+    return conn.execute(_GET_POST, (post_id,)).fetchone()
+
+
+def post_exists(conn: sqlite3.Connection, post_id: int) -> bool:
+    return conn.execute(_POST_EXISTS, (post_id,)).fetchone() is not None
+
+
+def insert_post(conn: sqlite3.Connection, user_name: str, content: str, now: str,
+                post_id: Optional[int] = None) -> tuple:
+    return conn.execute(_INSERT_POST, (post_id, user_name, content, now, now)).fetchone()
+
+
+def insert_posts(conn: sqlite3.Connection, items: Iterable[Tuple[str, str]], now: str,
+                 ids: Optional[List[int]] = None) -> List[int]:
+    """여러 포스트를 넣고 id 목록을 돌려줍니다."""
+    items = list(items)
+    if ids is None:
+        conn.executemany(_INSERT_POSTS, [(None, user, content, now, now) for user, content in items])
+        # writer 는 하나뿐이고 트랜잭션 안이므로 방금 넣은 id 는 연속된 값입니다.
+        first_id = last_insert_id(conn, "posts") - len(items) + 1
+        return list(range(first_id, first_id + len(items)))
+    conn.executemany(_INSERT_POSTS, [(post_id, user, content, now, now)
+                                     for post_id, (user, content) in zip(ids, items)])
+    return ids
+
+
+def update_post_content(conn: sqlite3.Connection, post_id: int, content: str, now: str) -> Optional[tuple]:
+    """수정된 행, 포스트가 없으면 None"""
+    return conn.execute(_UPDATE_POST, (content, now, post_id)).fetchone()
+
+
+def delete_post(conn: sqlite3.Connection, post_id: int) -> bool:
+    # 댓글, 좋아요는 ON DELETE CASCADE 로 함께 삭제됩니다.
+    return conn.execute(_DELETE_POST, (post_id,)).rowcount > 0
+
+
+# ------------------------------------------------
+# 댓글
+# ------------------------------------------------
+_LIST_COMMENTS = f"SELECT {_COMMENT} FROM comments WHERE postId = ? ORDER BY id DESC LIMIT ?"
+_LIST_COMMENTS_AFTER = f"SELECT {_COMMENT} FROM comments WHERE postId = ? AND id < ? ORDER BY id DESC LIMIT ?"
+_GET_COMMENT = f"SELECT {_COMMENT} FROM comments WHERE id = ? AND postId = ?"
+# 포스트가 있으면 댓글 수를 올리면서 존재 확인을 함께 합니다.
+_BUMP_COMMENT_COUNT = "UPDATE posts SET commentCount = commentCount + ?, updatedAt = ? WHERE id = ?"
+_INSERT_COMMENT = f"""
+    INSERT INTO comments (id, postId, userName, content, createdAt, updatedAt)
+    VALUES (?, ?, ?, ?, ?, ?)
+    RETURNING {_COMMENT}
+"""
+_INSERT_COMMENTS = """
+    INSERT INTO comments (id, postId, userName, content, createdAt, updatedAt)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_UPDATE_COMMENT = f"""
+    UPDATE comments SET content = ?, updatedAt = ?
+    WHERE id = ? AND postId = ?
+    RETURNING {_COMMENT}
+"""
+_DELETE_COMMENT = "DELETE FROM comments WHERE id = ? AND postId = ? RETURNING userName"
+_RECOUNT_COMMENTS = """
+    UPDATE posts
+    SET commentCount = (SELECT COUNT(*) FROM comments WHERE postId = ?),
+        updatedAt = ?
+    WHERE id = ?
+"""
+
+
+def list_comments(conn: sqlite3.Connection, post_id: int, limit: int,
+                  before_id: Optional[int] = None, columns: Optional[Tuple[str, ...]] = None) -> List[tuple]:
+    if columns is not None:
+        sql = _projected_sql("comments", columns, before_id is not None)
+        params = (post_id, limit) if before_id is None else (post_id, before_id, limit)
+        return conn.execute(sql, params).fetchall()
+    if before_id is None:
+        return conn.execute(_LIST_COMMENTS, (post_id, limit)).fetchall()
+    return conn.execute(_LIST_COMMENTS_AFTER, (post_id, before_id, limit)).fetchall()
+
+
+def top_comments(conn: sqlite3.Connection, post_ids: Iterable[int], per_post: int) -> List[tuple]:
+    """
+    포스트마다 최신 댓글 per_post 개를 한 쿼리로 읽습니다. (postId, id DESC 순서)
+    포스트 수와 관계없이 idx_comments_post 색인 위에서 ROW_NUMBER() 로 자릅니다.
+    """
+    post_ids = list(post_ids)
+    rows: List[tuple] = []
+    if per_post < 1:
+        return rows
+    for i in range(0, len(post_ids), MAX_ROWS_PER_STATEMENT):
+        chunk = post_ids[i:i + MAX_ROWS_PER_STATEMENT]
+        placeholders = ",".join("?" * len(chunk))
+        rows += conn.execute(f"""
+            SELECT {_COMMENT} FROM (
+              SELECT {_COMMENT}, ROW_NUMBER() OVER (PARTITION BY postId ORDER BY id DESC) AS rn
+              FROM comments WHERE postId IN ({placeholders})
+            )
+            WHERE rn <= ?
+            ORDER BY postId, id DESC
+        """, [*chunk, per_post]).fetchall()
+    return rows
+
+
+def get_comment(conn: sqlite3.Connection, post_id: int, comment_id: int) -> Optional[tuple]:
+    """그 포스트의 댓글일 때만 돌려줍니다."""
+    return conn.execute(_GET_COMMENT, (comment_id, post_id)).fetchone()
+
+
+def insert_comment(conn: sqlite3.Connection, post_id: int, user_name: str, content: str,
+                   now: str, comment_id: Optional[int] = None) -> Optional[tuple]:
+    """추가된 댓글, 포스트가 없으면 None"""
+    if conn.execute(_BUMP_COMMENT_COUNT, (1, now, post_id)).rowcount == 0:
+        return None
+    return conn.execute(_INSERT_COMMENT, (comment_id, post_id, user_name, content, now, now)).fetchone()
+
+
+def insert_comments(conn: sqlite3.Connection, post_id: int, items: Iterable[Tuple[str, str]],
+                    now: str, ids: Optional[List[int]] = None) -> Optional[List[int]]:
+    """여러 댓글을 넣고 id 목록을 돌려줍니다. 포스트가 없으면 None"""
+    items = list(items)
+    if conn.execute(_BUMP_COMMENT_COUNT, (len(items), now, post_id)).rowcount == 0:
+        return None
+    if ids is None:
+        conn.executemany(_INSERT_COMMENTS, [(None, post_id, user, content, now, now) for user, content in items])
+        first_id = last_insert_id(conn, "comments") - len(items) + 1
+        return list(range(first_id, first_id + len(items)))
+    conn.executemany(_INSERT_COMMENTS, [(comment_id, post_id, user, content, now, now)
+                                        for comment_id, (user, content) in zip(ids, items)])
+    return ids
+
+
+def update_comment_content(conn: sqlite3.Connection, post_id: int, comment_id: int, content: str,
+                           now: str) -> Optional[tuple]:
+    """수정된 댓글, 그 포스트의 댓글이 없으면 None"""
+    return conn.execute(_UPDATE_COMMENT, (content, now, comment_id, post_id)).fetchone()
+
+
+def delete_comment(conn: sqlite3.Connection, post_id: int, comment_id: int, now: str) -> Optional[str]:
+    """삭제한 댓글의 작성자(사용자 요약 갱신용), 그 포스트의 댓글이 없으면 None"""
+    row = conn.execute(_DELETE_COMMENT, (comment_id, post_id)).fetchone()
+    if row is None:
+        return None
+    # 댓글 수는 색인(comments(postId, id))으로 다시 셉니다.
+    conn.execute(_RECOUNT_COMMENTS, (post_id, now, post_id))
+    return row[0]
+
+
+# ------------------------------------------------
+# 좋아요
+# ------------------------------------------------
+# 포스트가 없으면 행이 없고, 있으면 그 사용자의 좋아요 여부(0/1)
+_LIKE_STATE = """
+    SELECT EXISTS (SELECT 1 FROM likes WHERE postId = p.id AND userName = ?)
+    FROM posts p WHERE p.id = ?
+"""
+
+
+_ADD_LIKE_COUNT = """
+    UPDATE posts
+    SET likeCount = likeCount + ?,
+        updatedAt = MAX(updatedAt, ?)
+    WHERE id = ?
+"""
+# 여러 워커가 각자 반영해도 같은 값이 되도록 likeCount 를 기본 키 (postId, userName) 로 다시 셉니다.
+_RECOUNT_LIKES = """
+    UPDATE posts
+    SET likeCount = (SELECT COUNT(*) FROM likes WHERE postId = ?),
+        updatedAt = MAX(updatedAt, ?)
+    WHERE id = ?
+"""
+
+
+def like_state(conn: sqlite3.Connection, post_id: int, user_name: str) -> Optional[bool]:
+    """좋아요 상태, 포스트가 없으면 None"""
+    row = conn.execute(_LIKE_STATE, (user_name, post_id)).fetchone()
+    return None if row is None else bool(row[0])
+
+
+def existing_post_ids(conn: sqlite3.Connection, post_ids: Iterable[int]) -> Set[int]:
+    post_ids = list(post_ids)
+    if not post_ids:
+        return set()
+    placeholders = ",".join("?" * len(post_ids))
+    return {row[0] for row in conn.execute(f"SELECT id FROM posts WHERE id IN ({placeholders})", post_ids)}
+
+
+def post_counts(conn: sqlite3.Connection, post_ids: Iterable[int]) -> List[dict]:
+    """포스트별 likeCount / commentCount (없는 포스트는 빠짐)"""
+    post_ids = list(post_ids)
+    counts = []
+    for i in range(0, len(post_ids), MAX_ROWS_PER_STATEMENT):
+        chunk = post_ids[i:i + MAX_ROWS_PER_STATEMENT]
+        placeholders = ",".join("?" * len(chunk))
+        counts += [{"id": row[0], "likeCount": row[1], "commentCount": row[2]} for row in conn.execute(
+            f"SELECT id, likeCount, commentCount FROM posts WHERE id IN ({placeholders})", chunk
+        )]
+    return counts
+
+
+def liked_post_ids(conn: sqlite3.Connection, post_ids: Iterable[int], user_name: str) -> Set[int]:
+    """post_ids 중 user_name 이 좋아요한 포스트 (DB 기준, 기본 키 (postId, userName) 로 찾음)"""
+    post_ids = list(post_ids)
+    liked: Set[int] = set()
+    for i in range(0, len(post_ids), MAX_ROWS_PER_STATEMENT):
+        chunk = post_ids[i:i + MAX_ROWS_PER_STATEMENT]
+        placeholders = ",".join("?" * len(chunk))
+        liked.update(row[0] for row in conn.execute(
+            f"SELECT postId FROM likes WHERE userName = ? AND postId IN ({placeholders})", [user_name, *chunk]
+        ))
+    return liked
+
+
+def liked_keys(conn: sqlite3.Connection, keys: Iterable[Key]) -> Set[Key]:
+    """keys 중 DB 에 좋아요가 있는 (postId, userName)"""
+    keys = list(keys)
+    if not keys:
+        return set()
+    found: Set[Key] = set()
+    for chunk in _chunks(keys):
+        values, params = _values(chunk)
+        found.update((row[0], row[1]) for row in conn.execute(
+            f"SELECT postId, userName FROM likes WHERE (postId, userName) IN (VALUES {values})", params
+        ))
+    return found
+
+
+def _chunks(keys: List[Key]) -> Iterable[List[Key]]:
+    for i in range(0, len(keys), MAX_ROWS_PER_STATEMENT):
+        yield keys[i:i + MAX_ROWS_PER_STATEMENT]
+
+
+def _values(keys: List[Key]) -> Tuple[str, list]:
+    return ",".join(["(?, ?)"] * len(keys)), [v for key in keys for v in key]
+
+
+def insert_likes(conn: sqlite3.Connection, likes: Iterable[Tuple[int, str, str]]) -> Counter:
+    """
+    (postId, userName, 누른 시각) 목록으로 좋아요를 넣고 실제로 추가된 수를 postId 별로 돌려줍니다.
+    (이미 있거나 포스트가 없으면 건너뜀)
+    """
+    return Counter(post_id for post_id, _ in insert_like_keys(conn, likes))
+
+
+def insert_like_keys(conn: sqlite3.Connection, likes: Iterable[Tuple[int, str, str]]) -> Set[Key]:
+    """
+    (postId, userName, 누른 시각) 목록으로 좋아요를 넣고 실제로 추가된 (postId, userName) 을 돌려줍니다.
+    누른 시각은 인기 점수가 좋아요를 더하고 뺄 때 씁니다.
+    """
+    added: Set[Key] = set()
+    likes = list(likes)
+    for i in range(0, len(likes), MAX_ROWS_PER_STATEMENT):
+        chunk = likes[i:i + MAX_ROWS_PER_STATEMENT]
+        values = ",".join(["(?, ?, ?)"] * len(chunk))
+        params = [v for like in chunk for v in like]
+        added.update((row[0], row[1]) for row in conn.execute(f"""
+            INSERT OR IGNORE INTO likes (postId, userName, likedAt)
+            SELECT v.column1, v.column2, v.column3 FROM (VALUES {values}) v
+            WHERE EXISTS (SELECT 1 FROM posts WHERE id = v.column1)
+            RETURNING postId, userName
+        """, params).fetchall())
+    return added
+
+
+def delete_likes(conn: sqlite3.Connection, keys: Iterable[Key]) -> Counter:
+    """좋아요를 지우고 실제로 삭제된 수를 postId 별로 돌려줍니다."""
+    removed: Counter = Counter()
+    for chunk in _chunks(list(keys)):
+        values, params = _values(chunk)
+        removed.update(row[0] for row in conn.execute(
+            f"DELETE FROM likes WHERE (postId, userName) IN (VALUES {values}) RETURNING postId", params
+        ).fetchall())
+    return removed
+
+
+def add_like_counts(conn: sqlite3.Connection, changes: Iterable[Tuple[int, str, int]]) -> None:
+    """(delta, 마지막 변경 시각, postId) 목록으로 likeCount 를 한 번에 조정합니다."""
+    conn.executemany(_ADD_LIKE_COUNT, list(changes))
+
+
+def recount_likes(conn: sqlite3.Connection, changes: Iterable[Tuple[int, str]]) -> None:
+    """(postId, 마지막 변경 시각) 목록의 likeCount 를 likes 에서 다시 셉니다."""
+    conn.executemany(_RECOUNT_LIKES, [(post_id, at, post_id) for post_id, at in changes])
+
+
+# ------------------------------------------------
+# 사용자별 목록 / 요약
+# ------------------------------------------------
+# 모두 (userName, id) 색인(idx_posts_user, idx_comments_user, idx_likes_user)에서 키셋으로 읽습니다.
+_USER_POSTS = f"SELECT {_POST} FROM posts WHERE userName = ? ORDER BY id DESC LIMIT ?"
+_USER_POSTS_AFTER = f"SELECT {_POST} FROM posts WHERE userName = ? AND id < ? ORDER BY id DESC LIMIT ?"
+_USER_COMMENTS = f"SELECT {_COMMENT} FROM comments WHERE userName = ? ORDER BY id DESC LIMIT ?"
+_USER_COMMENTS_AFTER = f"SELECT {_COMMENT} FROM comments WHERE userName = ? AND id < ? ORDER BY id DESC LIMIT ?"
+# 좋아요에는 id 가 없으므로 좋아요한 포스트의 id 순서입니다.
+_LIKED_POST = ", ".join("p." + column for column in POST_COLUMNS)
+_USER_LIKED_POSTS = f"""
+    SELECT {_LIKED_POST} FROM likes l JOIN posts p ON p.id = l.postId
+    WHERE l.userName = ? ORDER BY l.postId DESC LIMIT ?
+"""
+_USER_LIKED_POSTS_AFTER = f"""
+    SELECT {_LIKED_POST} FROM likes l JOIN posts p ON p.id = l.postId
+    WHERE l.userName = ? AND l.postId < ? ORDER BY l.postId DESC LIMIT ?
+"""
+# 보관된 포스트의 활동은 archived_user_counts 에 따로 세어 두고 더합니다.
+_USER_COUNTS = """
+    SELECT (SELECT COUNT(*) FROM posts WHERE userName = :user) + COALESCE(a.posts, 0),
+           (SELECT COUNT(*) FROM comments WHERE userName = :user) + COALESCE(a.comments, 0),
+           (SELECT COUNT(*) FROM likes WHERE userName = :user) + COALESCE(a.likes, 0),
+           {pending}
+    FROM (SELECT 1) LEFT JOIN archived_user_counts a ON a.userName = :user
+"""
+
+
+def list_user_posts(conn: sqlite3.Connection, user_name: str, limit: int,
+                    before_id: Optional[int] = None) -> List[tuple]:
+    if before_id is None:
+        return conn.execute(_USER_POSTS, (user_name, limit)).fetchall()
+    return conn.execute(_USER_POSTS_AFTER, (user_name, before_id, limit)).fetchall()
+
+
+def list_user_comments(conn: sqlite3.Connection, user_name: str, limit: int,
+                       before_id: Optional[int] = None) -> List[tuple]:
+    if before_id is None:
+        return conn.execute(_USER_COMMENTS, (user_name, limit)).fetchall()
+    return conn.execute(_USER_COMMENTS_AFTER, (user_name, before_id, limit)).fetchall()
+
+
+def list_user_liked_posts(conn: sqlite3.Connection, user_name: str, limit: int,
+                          before_post_id: Optional[int] = None) -> List[tuple]:
+    """user_name 이 좋아요한 포스트 (DB 기준, 포스트 id 내림차순)"""
+    if before_post_id is None:
+        return conn.execute(_USER_LIKED_POSTS, (user_name, limit)).fetchall()
+    return conn.execute(_USER_LIKED_POSTS_AFTER, (user_name, before_post_id, limit)).fetchall()
+
+
+def posts_by_ids(conn: sqlite3.Connection, post_ids: Iterable[int]) -> List[tuple]:
+    """post_ids 의 포스트 행 (없는 포스트는 빠짐, 순서는 정하지 않음)"""
+    post_ids = list(post_ids)
+    rows: List[tuple] = []
+    for i in range(0, len(post_ids), MAX_ROWS_PER_STATEMENT):
+        chunk = post_ids[i:i + MAX_ROWS_PER_STATEMENT]
+        placeholders = ",".join("?" * len(chunk))
+        rows += conn.execute(f"SELECT {_POST} FROM posts WHERE id IN ({placeholders})", chunk).fetchall()
+    return rows
+
+
+def user_counts(conn: sqlite3.Connection, user_name: str, post_ids: Iterable[int] = ()) -> Tuple[int, int, int, int]:
+    """
+    (포스트 수, 댓글 수, 좋아요 수, post_ids 중 DB 에 좋아요가 있는 수) 를 보관된 활동까지 포함해 한 쿼리로 셉니다.
+    한 스냅숏에서 세야 좋아요 반영(flush)과 엇갈려도 반영 대기 항목을 정확히 보정할 수 있습니다.
+    post_ids 가 MAX_ROWS_PER_STATEMENT 개를 넘으면 넘는 만큼은 따로 셉니다.
+    """
+    post_ids = list(post_ids)
+    chunk = post_ids[:MAX_ROWS_PER_STATEMENT]
+    params = {"user": user_name, **{f"p{i}": post_id for i, post_id in enumerate(chunk)}}
+    pending = "0"
+    if chunk:
+        placeholders = ",".join(f":p{i}" for i in range(len(chunk)))
+        pending = f"(SELECT COUNT(*) FROM likes WHERE userName = :user AND postId IN ({placeholders}))"
+    posts, comments, likes, pending = conn.execute(_USER_COUNTS.format(pending=pending), params).fetchone()
+    pending += len(liked_post_ids(conn, post_ids[MAX_ROWS_PER_STATEMENT:], user_name))
+    return posts, comments, likes, pending
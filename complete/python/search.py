@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import os
+import sqlite3
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # storage -> migrations -> search 순서로 import 되므로 타입 검사할 때만 가져옵니다.
+    from storage import ShardedStorage
+
+# ------------------------------------------------
+# 전문 검색 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# FTS5 토크나이저. 인덱스를 처음 만들 때만 적용됩니다.
+# 한국어처럼 조사가 붙는 언어에서 부분 일치가 필요하면 "trigram" 을 사용하세요. (3글자 이상 검색)
+FTS_TOKENIZER = os.environ.get("SNS_FTS_TOKENIZER", "unicode61 remove_diacritics 2")
+# 검색 결과로 넘길 수 있는 최대 위치 (너무 깊은 페이지는 막습니다)
+MAX_SEARCH_OFFSET = int(os.environ.get("SNS_MAX_SEARCH_OFFSET", "1000"))
+
+SEARCH_TYPES = ("all", "posts", "comments")
+
+# (FTS 테이블, 원본 테이블)
+_INDEXES = (("posts_fts", "posts"), ("comments_fts", "comments"))
+
+
+def create_search_index(conn: sqlite3.Connection) -> None:
+    """
+    posts / comments 의 content 를 색인하는 FTS5 테이블과 동기화 트리거를 만듭니다.
+    기존 데이터베이스라서 FTS 테이블이 새로 만들어졌다면 한 번만 전체 색인을 채웁니다.
+    commit 은 호출하는 쪽(마이그레이션)에서 합니다.
+    """
+    c = conn.cursor()
+    for fts, table in _INDEXES:
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        exists = c.fetchone() is not None
+
+        # 원본 테이블의 content 를 그대로 참조하는 external content 테이블
+        c.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+          content,
+          content='{table}',
+          content_rowid='id',
+          tokenize='{FTS_TOKENIZER}'
+        )
+        """)
+
+        # 추가 / 삭제 / content 수정 시 색인을 증분 갱신
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+          INSERT INTO {fts} (rowid, content) VALUES (new.id, new.content);
+        END
+        """)
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+          INSERT INTO {fts} ({fts}, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+        """)
+        # likeCount / commentCount 만 바뀌는 UPDATE 는 색인을 건드리지 않습니다.
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF content ON {table} BEGIN
+          INSERT INTO {fts} ({fts}, rowid, content) VALUES ('delete', old.id, old.content);
+          INSERT INTO {fts} (rowid, content) VALUES (new.id, new.content);
+        END
+        """)
+
+        if not exists:
+            c.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def to_match_query(q: str) -> Optional[str]:
+    # 사용자 입력을 FTS5 문법으로 해석하지 않도록 단어마다 따옴표로 감쌉니다. (모든 단어 AND)
+    terms = [t.replace('"', '""') for t in q.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"' for t in terms)
+
+
+_POSTS_SQL = """
+    SELECT 'post' AS type, p.id AS id, p.id AS postId, p.userName AS userName,
+           snippet(posts_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet,
+           bm25(posts_fts) AS score
+    FROM posts_fts
+    JOIN posts p ON p.id = posts_fts.rowid
+    WHERE posts_fts MATCH :q
+"""
+
+_COMMENTS_SQL = """
+    SELECT 'comment' AS type, cm.id AS id, cm.postId AS postId, cm.userName AS userName,
+           snippet(comments_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet,
+           bm25(comments_fts) AS score
+    FROM comments_fts
+    JOIN comments cm ON cm.id = comments_fts.rowid
+    WHERE comments_fts MATCH :q
+"""
+
+
+def search(conn: sqlite3.Connection, match: str, kind: str, limit: int, offset: int) -> Tuple[List[dict], bool]:
+    """
+    bm25 점수 순(작을수록 관련도 높음)으로 limit 개를 돌려주고, 다음 페이지가 있는지도 함께 돌려줍니다.
+    """
+    if kind == "posts":
+        sql = _POSTS_SQL
+    elif kind == "comments":
+        sql = _COMMENTS_SQL
+    else:
+        sql = _POSTS_SQL + " UNION ALL " + _COMMENTS_SQL
+
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT * FROM ({sql})
+        ORDER BY score, type DESC, id DESC
+        LIMIT :limit OFFSET :offset
+    """, {"q": match, "limit": limit + 1, "offset": offset})
+    rows = c.fetchall()
+    col = [desc[0] for desc in c.description]
+    has_more = len(rows) > limit
+    return [dict(zip(col, row)) for row in rows[:limit]], has_more
+
+
+def _order(item: dict) -> tuple:
+    # search 의 ORDER BY score, type DESC, id DESC 와 같은 순서
+    return item["score"], item["type"] != "post", -item["id"]
+
+
+def search_all(storage: "ShardedStorage", match: str, kind: str, limit: int, offset: int) -> Tuple[List[dict], bool]:
+    """
+    모든 샤드에서 검색해 점수 순으로 합칩니다. 샤드마다 앞에서부터 offset + limit 개를 받아 merge 합니다.
+    bm25 의 단어 통계는 샤드마다 따로 계산되므로 샤드가 여러 개면 순서는 근사치입니다.
+    """
+    if not storage.sharded:
+        with storage.shards[0].pool.reader() as conn:
+            return search(conn, match, kind, limit, offset)
+    results = storage.read_all(lambda conn: search(conn, match, kind, offset + limit, 0))
+    merged = list(itertools.islice(heapq.merge(*[items for items, _ in results], key=_order), offset + limit + 1))
+    has_more = len(merged) > offset + limit or any(more for _, more in results)
+    return merged[offset:offset + limit], has_more
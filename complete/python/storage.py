@@ -0,0 +1,452 @@
+import argparse
+import heapq
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from db import BUSY_TIMEOUT_MS, DB_PATH, POOL_SIZE, ConnectionPool
+from metrics import metrics
+from migrations import migrate
+from write_queue import WriteQueue
+
+# ------------------------------------------------
+# 저장소(샤드) 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 포스트(와 그 댓글, 좋아요)를 나눠 담을 SQLite 파일 수. 1 이면 SNS_DB_PATH 파일 하나만 씁니다.
+# 이미 데이터가 있을 때 값을 바꾸려면 서버를 멈추고 python storage.py rebalance --to N 을 실행합니다.
+SHARD_COUNT = int(os.environ.get("SNS_DB_SHARDS", "1"))
+# 전역 id 를 메타 DB 에서 한 번에 예약해 두는 개수
+ID_BLOCK_SIZE = int(os.environ.get("SNS_ID_BLOCK_SIZE", "100"))
+
+# 전역 id 를 쓰는 테이블
+ID_KINDS = ("posts", "comments")
+
+T = TypeVar("T")
+
+
+def shard_paths(path: str, shard_count: int) -> List[str]:
+    """샤드 파일 경로. 샤드가 하나면 path 그대로, 여러 개면 sns.shard0.db, sns.shard1.db, ..."""
+    if shard_count == 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}.shard{i}{ext}" for i in range(shard_count)]
+
+
+def meta_path(path: str) -> str:
+    # 샤드 수와 전역 id 시퀀스를 담는 메타 DB (샤드가 여러 개일 때만 사용)
+    root, ext = os.path.splitext(path)
+    return f"{root}.meta{ext}"
+
+
+# ------------------------------------------------
+# 메타 DB / 전역 id 할당
+# ------------------------------------------------
+def _connect_meta(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, isolation_level=None)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS shard_config (
+      id INTEGER PRIMARY KEY CHECK (id = 1),
+      shardCount INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS id_sequence (
+      name TEXT PRIMARY KEY,
+      nextSeq INTEGER NOT NULL
+    )
+    """)
+    return conn
+
+
+def read_shard_count(path: str) -> int:
+    """메타 DB 에 기록된 샤드 수. 메타 DB 가 없으면 단일 파일(1)입니다."""
+    meta = meta_path(path)
+    if not os.path.exists(meta):
+        return 1
+    conn = _connect_meta(meta)
+    try:
+        row = conn.execute("SELECT shardCount FROM shard_config").fetchone()
+        return row[0] if row else 1
+    finally:
+        conn.close()
+
+
+def _write_meta(path: str, shard_count: int, next_seqs: Dict[str, int]) -> None:
+    conn = _connect_meta(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR REPLACE INTO shard_config (id, shardCount) VALUES (1, ?)", (shard_count,))
+        conn.executemany("INSERT OR REPLACE INTO id_sequence (name, nextSeq) VALUES (?, ?)", next_seqs.items())
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+class IdAllocator:
+    """
+    샤드가 여러 개일 때 포스트 / 댓글의 전역 id 를 나눠 줍니다.
+
+    id = seq * shard_count + shard 이므로 id 만 보고 샤드를 알 수 있고(id % shard_count),
+    seq 는 모든 샤드가 공유하는 하나의 증가 값이라 프로세스 하나 안에서는 id 순서가 곧 작성 순서입니다.
+    seq 는 메타 DB 에서 block_size 개씩 예약하므로 id 를 만들 때마다 디스크에 쓰지 않고,
+    여러 프로세스(launcher.py 워커)가 같은 메타 DB 를 써도 겹치지 않습니다. (재시작하면 예약만 하고
+    쓰지 않은 seq 는 건너뛰고, 워커마다 다른 구간을 쓰므로 워커 사이의 id 순서는 작성 순서와 다를 수 있습니다)
+    """
+
+    def __init__(self, path: str, shard_count: int, block_size: int = ID_BLOCK_SIZE):
+        self.shard_count = shard_count
+        self.block_size = max(1, block_size)
+        self._conn = _connect_meta(path)
+        self._lock = threading.Lock()
+        # 종류별 예약해 둔 seq 범위 [next, end)
+        self._blocks: Dict[str, List[int]] = {kind: [0, 0] for kind in ID_KINDS}
+
+    def allocate(self, kind: str, shard: int, n: int = 1) -> List[int]:
+        """shard 에 들어갈 kind 의 새 id n 개 (증가 순)"""
+        with self._lock:
+            block = self._blocks[kind]
+            if block[1] - block[0] < n:
+                # 남은 예약은 버리고 새로 예약합니다.
+                size = max(n, self.block_size)
+                start = self._reserve(kind, size)
+                block[0], block[1] = start, start + size
+            seqs = range(block[0], block[0] + n)
+            block[0] += n
+        return [seq * self.shard_count + shard for seq in seqs]
+
+    def advance_past(self, kind: str, max_id: int) -> None:
+        """앞으로 나눠 줄 id 가 max_id 보다 크도록 합니다. (id 를 지정해서 넣는 가져오기 후 호출)"""
+        min_seq = max_id // self.shard_count + 1
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("INSERT OR IGNORE INTO id_sequence (name, nextSeq) VALUES (?, 1)", (kind,))
+            self._conn.execute("UPDATE id_sequence SET nextSeq = MAX(nextSeq, ?) WHERE name = ?", (min_seq, kind))
+            self._conn.execute("COMMIT")
+            block = self._blocks[kind]
+            if block[0] < min_seq:
+                block[0] = block[1] = 0
+
+    def _reserve(self, kind: str, size: int) -> int:
+        # self._lock 을 잡은 상태에서 호출. 예약한 첫 seq 를 돌려줍니다.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("INSERT OR IGNORE INTO id_sequence (name, nextSeq) VALUES (?, 1)", (kind,))
+            start = self._conn.execute("SELECT nextSeq FROM id_sequence WHERE name = ?", (kind,)).fetchone()[0]
+            self._conn.execute("UPDATE id_sequence SET nextSeq = ? WHERE name = ?", (start + size, kind))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return start
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ------------------------------------------------
+# 샤드 저장소
+# ------------------------------------------------
+class Shard:
+    """SQLite 파일 하나와 그 파일의 커넥션 풀, 쓰기 큐"""
+
+    def __init__(self, index: int, path: str, pool: ConnectionPool, write_queue: WriteQueue):
+        self.index = index
+        self.path = path
+        self.pool = pool
+        self.write_queue = write_queue
+
+
+class ShardedStorage:
+    """
+    포스트를 post id 로 나눠 shard_count 개의 SQLite 파일에 저장합니다. 댓글과 좋아요는 포스트와
+    같은 샤드에 들어가므로 포스트 하나에 대한 작업은 항상 샤드 하나 안에서 끝나고, 샤드마다
+    writer 가 따로 있어 쓰기가 샤드 수만큼 병렬로 처리됩니다.
+
+    - 포스트 하나에 대한 읽기 / 쓰기: for_post(postId) 로 해당 샤드에 바로 보냅니다.
+    - 목록 / 검색: gather 로 모든 샤드에 동시에 묻고 정렬 순서대로 합칩니다. (merge_sorted)
+    - 새 포스트: 샤드를 돌아가며 고르고 IdAllocator 로 그 샤드의 전역 id 를 받습니다.
+
+    샤드가 하나면 기존과 같은 단일 파일이고 id 는 AUTOINCREMENT 가 정합니다.
+    """
+
+    def __init__(self, path: str = DB_PATH, shard_count: int = SHARD_COUNT, pool_size: int = POOL_SIZE):
+        if shard_count < 1:
+            raise ValueError("SNS_DB_SHARDS 는 1 이상이어야 합니다.")
+        self.path = path
+        self.shard_count = shard_count
+        self.pool_size = pool_size
+        self.shards: List[Shard] = []
+        self.allocator: Optional[IdAllocator] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._round_robin = itertools.count()
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count > 1
+
+    # ------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------
+    def open(self) -> None:
+        if self.shards:
+            return
+        self._check_layout()
+        if self.sharded:
+            self.allocator = IdAllocator(meta_path(self.path), self.shard_count)
+            self._executor = ThreadPoolExecutor(max_workers=self.shard_count, thread_name_prefix="sns-shard")
+        for index, path in enumerate(shard_paths(self.path, self.shard_count)):
+            # 커넥션 풀 생성 (writer 커넥션이 WAL 모드로 전환) 후 샤드마다 마이그레이션을 적용합니다.
+            pool = ConnectionPool(path, self.pool_size)
+            with pool.writer() as conn:
+                migrate(conn)
+            write_queue = WriteQueue()
+            write_queue.start(pool)
+            self.shards.append(Shard(index, path, pool, write_queue))
+
+    def _check_layout(self) -> None:
+        # 샤드 수가 데이터와 다르면 포스트를 엉뚱한 샤드에서 찾게 되므로 시작하지 않습니다.
+        if self.sharded and not os.path.exists(meta_path(self.path)):
+            if os.path.exists(self.path):
+                raise RuntimeError(f"단일 파일 데이터베이스 {self.path} 가 있습니다. "
+                                   f"python storage.py rebalance --to {self.shard_count} 로 먼저 나누세요.")
+            # 새 데이터베이스
+            _write_meta(meta_path(self.path), self.shard_count, {})
+        stored = read_shard_count(self.path)
+        if stored != self.shard_count:
+            raise RuntimeError(f"데이터베이스는 샤드 {stored}개로 나뉘어 있습니다. SNS_DB_SHARDS={stored} 로 실행하거나 "
+                               f"python storage.py rebalance --to {self.shard_count} 로 먼저 나누세요.")
+
+    def close(self) -> None:
+        # 남은 쓰기 작업을 모두 처리한 뒤 커넥션 풀을 닫습니다.
+        for shard in self.shards:
+            shard.write_queue.stop()
+        for shard in self.shards:
+            shard.pool.close()
+        self.shards = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self.allocator is not None:
+            self.allocator.close()
+            self.allocator = None
+
+    # ------------------------------------------------
+    # 라우팅
+    # ------------------------------------------------
+    def shard_index(self, post_id: int) -> int:
+        return post_id % self.shard_count
+
+    def for_post(self, post_id: int) -> Shard:
+        return self.shards[self.shard_index(post_id)]
+
+    def next_shard(self) -> Shard:
+        """새 포스트를 넣을 샤드 (돌아가며 선택)"""
+        return self.shards[next(self._round_robin) % self.shard_count]
+
+    def new_ids(self, kind: str, shard: Shard, n: int = 1) -> Optional[List[int]]:
+        """shard 에 넣을 새 id. 샤드가 하나면 None (AUTOINCREMENT 사용)"""
+        if self.allocator is None:
+            return None
+        return self.allocator.allocate(kind, shard.index, n)
+
+    def new_id(self, kind: str, shard: Shard) -> Optional[int]:
+        ids = self.new_ids(kind, shard)
+        return ids[0] if ids else None
+
+    def advance_ids(self, kind: str, max_id: int) -> None:
+        if self.allocator is not None:
+            self.allocator.advance_past(kind, max_id)
+
+    # ------------------------------------------------
+    # scatter-gather
+    # ------------------------------------------------
+    def gather(self, fn: Callable[[Shard], T]) -> List[T]:
+        """모든 샤드에서 fn(shard) 를 동시에 실행하고 샤드 순서대로 결과를 돌려줍니다."""
+        if self._executor is None:
+            return [fn(shard) for shard in self.shards]
+        futures = [self._executor.submit(metrics.subtask(fn), shard) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    def read_all(self, fn: Callable[[sqlite3.Connection], T]) -> List[T]:
+        """모든 샤드의 읽기 커넥션으로 fn(conn) 을 동시에 실행합니다."""
+        def read(shard: Shard) -> T:
+            with shard.pool.reader() as conn:
+                return fn(conn)
+        return self.gather(read)
+
+    def writer_stats(self) -> dict:
+        """샤드별 쓰기 큐 통계의 합 (largestBatch 는 최댓값)"""
+        total: dict = {}
+        for shard in self.shards:
+            for key, value in shard.write_queue.stats().items():
+                if key in ("largestBatch", "maxBatch"):
+                    total[key] = max(total.get(key, 0), value)
+                else:
+                    total[key] = total.get(key, 0) + value
+        return total
+
+
+def merge_sorted(results: Iterable[Iterable[T]], key: Callable[[T], object], limit: Optional[int] = None) -> List[T]:
+    """샤드별로 이미 key 순서로 정렬된 결과를 k-way merge 해서 앞에서부터 limit 개를 돌려줍니다."""
+    merged = heapq.merge(*results, key=key)
+    return list(itertools.islice(merged, limit))
+
+
+storage = ShardedStorage()
+
+
+def get_post_conn(postId: int) -> Iterator[sqlite3.Connection]:
+    """경로의 postId 가 들어 있는 샤드의 읽기 커넥션 (FastAPI dependency)"""
+    with storage.for_post(postId).pool.reader() as conn:
+        yield conn
+
+
+# ------------------------------------------------
+# 샤드 수 늘리기 (서버를 멈춘 상태에서 실행)
+# ------------------------------------------------
+_COPY = (
+    ("posts", "id", "id, userName, content, createdAt, updatedAt, likeCount, commentCount"),
+    ("comments", "postId", "id, postId, userName, content, createdAt, updatedAt"),
+    ("likes", "postId", "postId, userName, likedAt"),
+    ("archived_posts", "id",
+     "id, userName, createdAt, updatedAt, likeCount, commentCount, archivedAt, rawSize, data"),
+)
+
+
+def _checkpoint(path: str) -> None:
+    # WAL 에 남은 내용을 본 파일로 옮겨 두면 파일만 옮겨도 안전합니다.
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def _next_seqs(path: str, sources: List[str], current: int, target: int) -> Dict[str, int]:
+    # 새 샤드 수에서도 지금까지 나눠 준(삭제된 것 포함) 어떤 id 보다 큰 id 부터 나눠 주도록 합니다.
+    highest = {kind: 0 for kind in ID_KINDS}
+    if current > 1:
+        conn = _connect_meta(meta_path(path))
+        try:
+            for kind, next_seq in conn.execute("SELECT name, nextSeq FROM id_sequence"):
+                if kind in highest:
+                    highest[kind] = next_seq * current - 1
+        finally:
+            conn.close()
+    for source in sources:
+        conn = sqlite3.connect(source)
+        try:
+            for kind, seq in conn.execute("SELECT name, seq FROM sqlite_sequence"):
+                if kind in highest:
+                    highest[kind] = max(highest[kind], seq)
+        finally:
+            conn.close()
+    return {kind: value // target + 1 for kind, value in highest.items()}
+
+
+def rebalance(path: str, target: int, log: Callable[[str], None] = print) -> None:
+    """
+    샤드 수를 target 으로 늘립니다. 모든 행을 id % target (댓글 / 좋아요는 postId) 샤드로 옮겨
+    새 파일을 만든 뒤 바꿔 끼우며, 원래 파일은 .bak 으로 남겨 둡니다. id 는 그대로 유지됩니다.
+    """
+    from likes import journal_paths
+    from trending import copy_scores
+
+    current = read_shard_count(path)
+    if target <= current:
+        raise ValueError(f"샤드 수는 늘리기만 할 수 있습니다. (현재 {current}개)")
+    journals = journal_paths()
+    if journals:
+        raise RuntimeError(f"반영되지 않은 좋아요 저널 {', '.join(journals)} 가 있습니다. 서버를 한 번 실행했다가 종료해서 반영한 뒤 다시 시도하세요.")
+
+    sources = [p for p in shard_paths(path, current) if os.path.exists(p)]
+    targets = shard_paths(path, target)
+    backups = [p + ".bak" for p in sources]
+    for backup in backups:
+        if os.path.exists(backup):
+            raise RuntimeError(f"{backup} 가 이미 있습니다. 옮기거나 지운 뒤 다시 시도하세요.")
+    for source in sources:
+        _checkpoint(source)
+
+    tmp_paths = [p + ".rebalance" for p in targets]
+    for i, tmp in enumerate(tmp_paths):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = sqlite3.connect(tmp, isolation_level=None)
+        try:
+            migrate(conn)
+            for source in sources:
+                conn.execute("ATTACH DATABASE ? AS src", (source,))
+                conn.execute("BEGIN")
+                # 댓글 / 좋아요가 포스트를 찾을 수 있도록 포스트부터 옮깁니다. (검색 색인은 트리거로 채워짐)
+                for table, key, columns in _COPY:
+                    conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM src.{table} "
+                                 f"WHERE {key} % ? = ?", (target, i))
+                copy_scores(conn, "src", target, i)
+                conn.execute("COMMIT")
+                conn.execute("DETACH DATABASE src")
+            conn.execute("ANALYZE")
+            posts = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+            log(f"샤드 {i}: 포스트 {posts}개 -> {targets[i]}")
+        finally:
+            conn.close()
+
+    meta_tmp = meta_path(path) + ".rebalance"
+    if os.path.exists(meta_tmp):
+        os.remove(meta_tmp)
+    _write_meta(meta_tmp, target, _next_seqs(path, sources, current, target))
+
+    for source, backup in zip(sources, backups):
+        os.replace(source, backup)
+    for tmp, final in zip(tmp_paths, targets):
+        os.replace(tmp, final)
+    os.replace(meta_tmp, meta_path(path))
+    log(f"샤드 {current}개 -> {target}개 (원래 파일은 .bak 으로 보관)")
+
+
+# ------------------------------------------------
+# CLI (python storage.py status|rebalance)
+# ------------------------------------------------
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python storage.py", description="Simple SNS 샤드 관리")
+    parser.add_argument("--db", default=DB_PATH, help=f"데이터베이스 기본 경로 (기본: {DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="샤드별 포스트 / 댓글 / 좋아요 수를 보여줍니다.")
+    reb = sub.add_parser("rebalance", help="샤드 수를 늘립니다. (서버를 멈춘 상태에서 실행)")
+    reb.add_argument("--to", type=int, required=True, help="새 샤드 수")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None) -> int:
+    args = _parse_args(argv)
+    if args.command == "rebalance":
+        try:
+            rebalance(args.db, args.to)
+        except (ValueError, RuntimeError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    count = read_shard_count(args.db)
+    print(f"샤드 수: {count}")
+    for i, path in enumerate(shard_paths(args.db, count)):
+        if not os.path.exists(path):
+            print(f"{i:>4}  {path}  (없음)")
+            continue
+        conn = sqlite3.connect(path)
+        try:
+            counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table, _, _ in _COPY]
+        except sqlite3.OperationalError:
+            counts = [0, 0, 0, 0]
+        finally:
+            conn.close()
+        print(f"{i:>4}  {path}  포스트 {counts[0]}  댓글 {counts[1]}  좋아요 {counts[2]}  보관 {counts[3]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import json
+import os
+from contextlib import ExitStack
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+import archive
+from storage import ShardedStorage
+
+# ------------------------------------------------
+# 내보내기 / 가져오기 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 내보낼 때 한 번에 읽어서 보내는 행 수
+EXPORT_CHUNK_SIZE = int(os.environ.get("SNS_EXPORT_CHUNK_SIZE", "1000"))
+# 가져올 때 한 트랜잭션에 쓰는 레코드 수
+IMPORT_BATCH_SIZE = int(os.environ.get("SNS_IMPORT_BATCH_SIZE", "1000"))
+# 가져올 때 한 줄(레코드)의 최대 크기(byte)
+IMPORT_MAX_LINE_BYTES = int(os.environ.get("SNS_IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# 레코드 종류별 (내보내기 SELECT, 필드와 타입, 가져오기 INSERT)
+# 포스트를 모두 내보낸 뒤 댓글, 좋아요 순서로 내보내므로 가져올 때는 항상 포스트가 먼저 들어갑니다.
+# 보관된 포스트와 같은 id 는 이미 있는 것으로 보고 건너뛰며, 그 댓글 / 좋아요도 posts 에 포스트가 없으므로 건너뜁니다.
+# 모두 기본 키(또는 rowid) 순서라서 정렬용 임시 공간 없이 읽고, 샤드가 여러 개면 같은 순서로 k-way merge 합니다.
+_RECORDS = {
+    "post": (
+        "SELECT id, userName, content, createdAt, updatedAt, likeCount, commentCount FROM posts ORDER BY id",
+        (("id", int), ("userName", str), ("content", str), ("createdAt", str), ("updatedAt", str),
+         ("likeCount", int), ("commentCount", int)),
+        """INSERT OR IGNORE INTO posts (id, userName, content, createdAt, updatedAt, likeCount, commentCount)
+           SELECT ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM archived_posts WHERE id = ?)""",
+    ),
+    "comment": (
+        "SELECT id, postId, userName, content, createdAt, updatedAt FROM comments ORDER BY id",
+        (("id", int), ("postId", int), ("userName", str), ("content", str), ("createdAt", str), ("updatedAt", str)),
+        """INSERT OR IGNORE INTO comments (id, postId, userName, content, createdAt, updatedAt)
+           SELECT ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM posts WHERE id = ?)""",
+    ),
+    # likedAt 이 없는(예전에 내보낸) 좋아요는 포스트의 마지막 변경 시각으로 채웁니다.
+    "like": (
+        "SELECT postId, userName, likedAt FROM likes ORDER BY postId, userName",
+        (("postId", int), ("userName", str), ("likedAt", str)),
+        """INSERT OR IGNORE INTO likes (postId, userName, likedAt)
+           SELECT ?, ?, COALESCE(?, p.updatedAt) FROM posts p WHERE p.id = ?""",
+    ),
+}
+
+# 없거나 null 이어도 되는 필드
+_OPTIONAL_FIELDS = {"likedAt"}
+
+# 응답에 쓰는 레코드 종류별 개수 키
+_COUNT_KEYS = {"post": "posts", "comment": "comments", "like": "likes"}
+
+
+class InvalidRecord(ValueError):
+    def __init__(self, line: int, message: str, counts: Dict[str, int]):
+        super().__init__(message)
+        self.line = line
+        # 오류가 난 줄 이전까지 이미 저장된 개수
+        self.counts = counts
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+# ------------------------------------------------
+# 내보내기 (GET /api/export)
+# ------------------------------------------------
+def export_ndjson(storage: ShardedStorage, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    포스트, 댓글, 좋아요를 한 줄에 레코드 하나씩 NDJSON 으로 내보냅니다.
+    chunk_size 행씩 읽어서 한 덩어리로 보내므로 데이터 크기와 관계없이 메모리 사용량이 일정합니다.
+    보관된 포스트(archive.py)도 종류마다 일반 행 뒤에 이어서 내보내므로 가져오면 일반 포스트로 돌아갑니다.
+    """
+    with ExitStack() as stack:
+        conns = [stack.enter_context(shard.pool.reader()) for shard in storage.shards]
+        # 내보내는 동안 들어온 쓰기가 섞이지 않도록 샤드마다 하나의 읽기 트랜잭션(스냅숏)에서 읽습니다.
+        for conn in conns:
+            conn.execute("BEGIN")
+        for kind, (select, fields, _) in _RECORDS.items():
+            # 샤드별 결과는 이미 정렬되어 있으므로 행 단위로 merge 하면 전체도 같은 순서가 됩니다.
+            rows_iter = itertools.chain(heapq.merge(*[conn.execute(select) for conn in conns]),
+                                        *[_archived_rows(conn, kind) for conn in conns])
+            names = [name for name, _ in fields]
+            while True:
+                rows = list(itertools.islice(rows_iter, chunk_size))
+                if not rows:
+                    break
+                yield "".join(
+                    _dumps({"type": kind, **dict(zip(names, row))}) + "\n" for row in rows
+                ).encode()
+
+
+def _archived_rows(conn, kind: str) -> Iterator[tuple]:
+    # 보관 블록을 하나씩 풀어서 _RECORDS 의 SELECT 와 같은 모양의 행으로 돌려줍니다.
+    for archived in archive.iter_archived(conn):
+        if kind == "post":
+            yield archived.row
+        elif kind == "comment":
+            yield from archived.comments
+        else:
+            yield from ((archived.row[0], user_name, at) for user_name, at in zip(archived.likes, archived.liked_at))
+
+
+# ------------------------------------------------
+# 가져오기 (POST /api/import)
+# ------------------------------------------------
+def parse_record(line: bytes) -> Tuple[str, tuple]:
+    """NDJSON 한 줄을 (종류, INSERT 파라미터) 로 바꿉니다. 잘못된 줄은 ValueError."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise ValueError("JSON 형식이 아닙니다.")
+    if not isinstance(record, dict):
+        raise ValueError("레코드는 JSON 객체여야 합니다.")
+    kind = record.get("type")
+    if kind not in _RECORDS:
+        raise ValueError(f"type 은 {', '.join(_RECORDS)} 중 하나여야 합니다.")
+    values = []
+    for name, typ in _RECORDS[kind][1]:
+        value = record.get(name)
+        # bool 은 int 의 하위 타입이므로 type 으로 비교합니다.
+        if type(value) is not typ and not (value is None and name in _OPTIONAL_FIELDS):
+            raise ValueError(f"{kind} 레코드의 {name} 가 없거나 형식이 잘못되었습니다.")
+        values.append(value)
+    # 포스트 존재(포스트는 보관 여부) 확인용 postId
+    values.append(record["id"] if kind == "post" else record["postId"])
+    return kind, tuple(values)
+
+
+def write_batch(storage: ShardedStorage, batch: List[Tuple[str, tuple]]) -> Dict[str, int]:
+    """
+    레코드 묶음을 샤드마다 한 트랜잭션에 씁니다. id 를 그대로 유지하며 이미 있는 id 는(보관된 포스트 포함)
+    건너뛰므로 중간에 실패한 가져오기를 같은 파일로 다시 실행해도 안전합니다.
+    """
+    # 마지막 파라미터인 포스트 id 로 샤드를 정합니다.
+    by_shard: Dict[int, Dict[str, List[tuple]]] = {}
+    for kind, params in batch:
+        post_id = params[-1]
+        by_kind = by_shard.setdefault(storage.shard_index(post_id), {kind: [] for kind in _RECORDS})
+        by_kind[kind].append(params)
+
+    counts = {key: 0 for key in _COUNT_KEYS.values()}
+    for index, by_kind in by_shard.items():
+        with storage.shards[index].pool.writer() as conn:
+            c = conn.cursor()
+            # 같은 묶음 안의 댓글 / 좋아요가 포스트를 찾을 수 있도록 포스트부터 씁니다.
+            for kind, params in by_kind.items():
+                if params:
+                    c.executemany(_RECORDS[kind][2], params)
+                    counts[_COUNT_KEYS[kind]] += c.rowcount
+    counts["skipped"] = len(batch) - sum(counts.values())
+
+    # 샤드 저장소의 전역 id 가 가져온 id 와 겹치지 않도록 합니다.
+    for kind, id_kind in (("post", "posts"), ("comment", "comments")):
+        ids = [params[0] for k, params in batch if k == kind]
+        if ids:
+            storage.advance_ids(id_kind, max(ids))
+    return counts
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes]]:
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_no += 1
+            yield line_no, line
+        if len(buffer) > max_line_bytes:
+            raise InvalidRecord(line_no + 1, f"한 줄은 최대 {max_line_bytes} byte 까지 가능합니다.", {})
+    if buffer:
+        yield line_no + 1, buffer
+
+
+async def import_ndjson(storage: ShardedStorage, chunks: AsyncIterator[bytes],
+                        batch_size: int = IMPORT_BATCH_SIZE,
+                        max_line_bytes: int = IMPORT_MAX_LINE_BYTES) -> Dict[str, int]:
+    """
+    스트리밍으로 받은 NDJSON 을 batch_size 레코드씩 나눠 각각 한 트랜잭션으로 씁니다.
+    메모리에는 쓰기 전인 묶음 하나와 아직 끝나지 않은 줄만 남습니다.
+    """
+    counts = {"posts": 0, "comments": 0, "likes": 0, "skipped": 0}
+    batch: List[Tuple[str, tuple]] = []
+
+    async def flush() -> None:
+        written = await run_in_threadpool(write_batch, storage, batch)
+        for key, value in written.items():
+            counts[key] += value
+        batch.clear()
+
+    try:
+        async for line_no, line in _iter_lines(chunks, max_line_bytes):
+            if not line.strip():
+                continue
+            try:
+                batch.append(parse_record(line))
+            except ValueError as e:
+                # 오류 전까지의 레코드는 저장하고 알려줍니다.
+                if batch:
+                    await flush()
+                raise InvalidRecord(line_no, str(e), counts)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+    except InvalidRecord as e:
+        e.counts = counts
+        raise
+    return counts
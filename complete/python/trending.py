@@ -0,0 +1,267 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    # storage -> migrations -> trending 순서로 import 되므로 타입 검사할 때만 가져옵니다.
+    from storage import ShardedStorage
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 인기 글 점수 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 점수가 절반으로 줄어드는 시간(초). 좋아요 / 댓글은 이 시간이 지날 때마다 무게가 절반이 됩니다.
+HALF_LIFE = float(os.environ.get("SNS_TRENDING_HALF_LIFE", str(6 * 60 * 60)))
+# 좋아요 하나, 댓글 하나의 점수
+LIKE_WEIGHT = float(os.environ.get("SNS_TRENDING_LIKE_WEIGHT", "1"))
+COMMENT_WEIGHT = float(os.environ.get("SNS_TRENDING_COMMENT_WEIGHT", "2"))
+# 저장된 점수를 현재 시각 기준으로 다시 계산하는 주기(초)
+DECAY_INTERVAL = float(os.environ.get("SNS_TRENDING_DECAY_INTERVAL", "300"))
+# 다시 계산한 점수가 이보다 작으면 인기 글 표에서 뺍니다.
+MIN_SCORE = float(os.environ.get("SNS_TRENDING_MIN_SCORE", "0.01"))
+
+# 지금 시각 기준으로 좋아요 / 댓글 하나의 점수가 기준 시각(base)의 몇 배인지
+# (기준 시각 이후의 이벤트일수록 크므로 저장된 점수끼리 그대로 비교할 수 있습니다)
+_NOW_FACTOR = "pow(2.0, (strftime('%s', 'now') - m.base) / m.halfLife)"
+# 댓글은 작성 시각 기준 (가져오기로 들어온 오래된 댓글은 작게 더해지고, 삭제하면 더한 만큼 정확히 빠집니다)
+# 시각을 읽을 수 없는 값이면 지금 시각으로 봅니다.
+_COMMENT_FACTOR = ("pow(2.0, (COALESCE(strftime('%s', {}.createdAt, 'utc'), strftime('%s', 'now')) - m.base)"
+                   " / m.halfLife)")
+# 좋아요는 누른 시각(likedAt) 기준 (마이그레이션 11 부터). 취소하면 더했던 만큼만 빠집니다.
+_LIKE_FACTOR = _COMMENT_FACTOR.replace(".createdAt", ".likedAt")
+
+
+def create_trending_index(conn: sqlite3.Connection) -> None:
+    """
+    포스트별 인기 점수 표와 좋아요 / 댓글 변경 시 점수를 증분 갱신하는 트리거를 만들고,
+    기존 데이터로 한 번 점수를 채웁니다. commit 은 호출하는 쪽(마이그레이션)에서 합니다.
+
+    점수는 sum(무게 * 2^((이벤트 시각 - base) / halfLife)) 로 저장합니다. 모든 포스트에 같은
+    base 를 쓰므로 저장된 점수의 순서가 곧 현재 인기 순서이고, 시간이 지나도 다시 계산하지 않고
+    score 색인에서 바로 상위 N 개를 읽을 수 있습니다. 값이 계속 커지지 않도록 TrendingDecay 가
+    주기적으로 base 를 현재 시각으로 옮기며 점수를 줄입니다.
+    """
+    c = conn.cursor()
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS trending_meta (
+      id INTEGER PRIMARY KEY CHECK (id = 1),
+      base REAL NOT NULL,
+      halfLife REAL NOT NULL,
+      likeWeight REAL NOT NULL,
+      commentWeight REAL NOT NULL
+    )
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS trending (
+      postId INTEGER PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+      score REAL NOT NULL
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trending_score ON trending (score)")
+    c.execute("""
+        INSERT OR IGNORE INTO trending_meta (id, base, halfLife, likeWeight, commentWeight)
+        VALUES (1, strftime('%s', 'now'), ?, ?, ?)
+    """, (HALF_LIFE, LIKE_WEIGHT, COMMENT_WEIGHT))
+
+    # 좋아요는 시각이 남지 않으므로 지금 시각 기준으로 더하고 뺍니다. (0 아래로는 내려가지 않음)
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trending_likes_ai AFTER INSERT ON likes BEGIN
+      INSERT INTO trending (postId, score)
+      SELECT new.postId, m.likeWeight * {_NOW_FACTOR} FROM trending_meta m WHERE m.id = 1
+      ON CONFLICT (postId) DO UPDATE SET score = score + excluded.score;
+    END
+    """)
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trending_likes_ad AFTER DELETE ON likes BEGIN
+      UPDATE trending
+      SET score = MAX(score - (SELECT m.likeWeight * {_NOW_FACTOR} FROM trending_meta m WHERE m.id = 1), 0)
+      WHERE postId = old.postId;
+    END
+    """)
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trending_comments_ai AFTER INSERT ON comments BEGIN
+      INSERT INTO trending (postId, score)
+      SELECT new.postId, m.commentWeight * {_COMMENT_FACTOR.format("new")} FROM trending_meta m WHERE m.id = 1
+      ON CONFLICT (postId) DO UPDATE SET score = score + excluded.score;
+    END
+    """)
+    c.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trending_comments_ad AFTER DELETE ON comments BEGIN
+      UPDATE trending
+      SET score = MAX(score - (SELECT m.commentWeight * {_COMMENT_FACTOR.format("old")}
+                               FROM trending_meta m WHERE m.id = 1), 0)
+      WHERE postId = old.postId;
+    END
+    """)
+
+    # 기존 데이터: 댓글은 작성 시각, 좋아요는 시각이 없으므로 포스트의 마지막 변경 시각을 씁니다.
+    c.execute(f"""
+        INSERT OR IGNORE INTO trending (postId, score)
+        SELECT p.id,
+               m.likeWeight * p.likeCount
+                 * pow(2.0, (COALESCE(strftime('%s', p.updatedAt, 'utc'), m.base) - m.base) / m.halfLife)
+               + COALESCE((SELECT SUM(m.commentWeight * {_COMMENT_FACTOR.format("cm")})
+                           FROM comments cm WHERE cm.postId = p.id), 0)
+        FROM posts p, trending_meta m
+        WHERE m.id = 1 AND (p.likeCount > 0 OR p.commentCount > 0)
+    """)
+    c.execute("DELETE FROM trending WHERE score < ?", (MIN_SCORE,))
+
+
+def add_like_times(conn: sqlite3.Connection) -> None:
+    """
+    likes 에 누른 시각(likedAt)을 추가하고 좋아요 트리거가 그 시각으로 점수를 더하고 빼도록 바꿉니다.
+    지금 시각 기준으로 빼면 오래된 좋아요 하나를 취소할 때 남은 좋아요의 점수까지 빠지고, 복원 / 가져오기로
+    다시 들어간 오래된 좋아요는 지금 누른 것처럼 더해지기 때문입니다. 기존 좋아요는 시각을 알 수 없으므로
+    마이그레이션 6 의 초기 점수처럼 포스트의 마지막 변경 시각으로 채우고, 그 값으로 점수를 다시 계산합니다.
+    """
+    c = conn.cursor()
+    c.execute("ALTER TABLE likes ADD COLUMN likedAt TEXT")
+    c.execute("UPDATE likes SET likedAt = (SELECT p.updatedAt FROM posts p WHERE p.id = likes.postId)")
+    c.execute("DROP TRIGGER IF EXISTS trending_likes_ai")
+    c.execute("DROP TRIGGER IF EXISTS trending_likes_ad")
+    c.execute(f"""
+    CREATE TRIGGER trending_likes_ai AFTER INSERT ON likes BEGIN
+      INSERT INTO trending (postId, score)
+      SELECT new.postId, m.likeWeight * {_LIKE_FACTOR.format("new")} FROM trending_meta m WHERE m.id = 1
+      ON CONFLICT (postId) DO UPDATE SET score = score + excluded.score;
+    END
+    """)
+    c.execute(f"""
+    CREATE TRIGGER trending_likes_ad AFTER DELETE ON likes BEGIN
+      UPDATE trending
+      SET score = MAX(score - (SELECT m.likeWeight * {_LIKE_FACTOR.format("old")}
+                               FROM trending_meta m WHERE m.id = 1), 0)
+      WHERE postId = old.postId;
+    END
+    """)
+
+    c.execute("DELETE FROM trending")
+    c.execute(f"""
+        INSERT INTO trending (postId, score)
+        SELECT postId, SUM(score) FROM (
+          SELECT l.postId, m.likeWeight * {_LIKE_FACTOR.format("l")} AS score FROM likes l, trending_meta m WHERE m.id = 1
+          UNION ALL
+          SELECT cm.postId, m.commentWeight * {_COMMENT_FACTOR.format("cm")} FROM comments cm, trending_meta m WHERE m.id = 1
+        ) GROUP BY postId
+    """)
+    c.execute("DELETE FROM trending WHERE score < ?", (MIN_SCORE,))
+
+
+def configure(conn: sqlite3.Connection) -> None:
+    """환경 변수의 무게 / 반감기를 트리거가 읽는 trending_meta 에 반영합니다. (이후 이벤트부터 적용)"""
+    conn.execute("UPDATE trending_meta SET halfLife = ?, likeWeight = ?, commentWeight = ? WHERE id = 1",
+                 (HALF_LIFE, LIKE_WEIGHT, COMMENT_WEIGHT))
+
+
+def decay(conn: sqlite3.Connection, now: float) -> int:
+    """
+    base 를 now 로 옮기고 점수를 그만큼 줄인 뒤, MIN_SCORE 보다 작아진 포스트를 빼고 그 수를 돌려줍니다.
+    점수 순서는 바뀌지 않습니다. 첫 UPDATE 가 쓰기 잠금을 잡으므로 여러 워커가 동시에 실행해도
+    같은 base 로 두 번 줄이지 않습니다.
+    """
+    conn.execute("""
+        UPDATE trending
+        SET score = score * (SELECT pow(2.0, (m.base - ?) / m.halfLife) FROM trending_meta m WHERE m.id = 1)
+    """, (now,))
+    pruned = conn.execute("DELETE FROM trending WHERE score < ?", (MIN_SCORE,)).rowcount
+    conn.execute("UPDATE trending_meta SET base = ? WHERE id = 1", (now,))
+    return pruned
+
+
+def copy_scores(conn: sqlite3.Connection, schema: str, shard_count: int, index: int) -> None:
+    """
+    샤드 재배치용: 다른 데이터베이스(schema)의 점수를 이 데이터베이스의 base 기준으로 바꿔 옮깁니다.
+    옮기는 동안 트리거가 좋아요를 지금 시각 기준으로 다시 더했으므로 그 값은 지우고 원래 점수로 바꿉니다.
+    """
+    conn.execute(f"DELETE FROM trending WHERE postId IN (SELECT id FROM {schema}.posts WHERE id % ? = ?)",
+                 (shard_count, index))
+    conn.execute(f"""
+        INSERT INTO trending (postId, score)
+        SELECT t.postId, t.score * pow(2.0, (s.base - m.base) / m.halfLife)
+        FROM {schema}.trending t, {schema}.trending_meta s, trending_meta m
+        WHERE s.id = 1 AND m.id = 1 AND t.postId % ? = ?
+    """, (shard_count, index))
+
+
+_TRENDING_SQL = """
+    SELECT p.id, p.userName, p.content, p.createdAt, p.updatedAt, p.likeCount, p.commentCount,
+           t.score * pow(2.0, (m.base - ?) / m.halfLife) AS score
+    FROM trending t
+    JOIN posts p ON p.id = t.postId
+    JOIN trending_meta m ON m.id = 1
+    WHERE t.score > 0
+    ORDER BY t.score DESC, t.postId DESC
+    LIMIT ?
+"""
+
+
+def trending(conn: sqlite3.Connection, limit: int, now: float) -> List[tuple]:
+    """점수 높은 순으로 limit 개. 각 행은 포스트 컬럼 뒤에 now 기준 점수가 붙습니다."""
+    return conn.execute(_TRENDING_SQL, (now, limit)).fetchall()
+
+
+class TrendingDecay:
+    """DECAY_INTERVAL 마다 모든 샤드의 인기 점수를 현재 시각 기준으로 다시 계산하는 백그라운드 스레드."""
+
+    def __init__(self, interval: float = DECAY_INTERVAL):
+        self.interval = interval
+        self._storage: Optional["ShardedStorage"] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.runs = 0
+        self.pruned = 0
+        self.last_run_ms = 0.0
+
+    def start(self, storage: "ShardedStorage") -> None:
+        self._storage = storage
+        for shard in storage.shards:
+            with shard.pool.writer() as conn:
+                configure(conn)
+        if self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trending-decay", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception:
+                # 다음 주기에 다시 시도합니다. 그동안에도 점수 순서는 정확합니다.
+                logger.exception("인기 점수를 다시 계산하지 못했습니다.")
+
+    def run(self) -> int:
+        started = time.perf_counter()
+        now = time.time()
+        pruned = 0
+        for shard in self._storage.shards:
+            with shard.pool.writer() as conn:
+                pruned += decay(conn, now)
+        self.runs += 1
+        self.pruned += pruned
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        return pruned
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "halfLife": HALF_LIFE,
+            "runs": self.runs,
+            "pruned": self.pruned,
+            "lastRunMs": round(self.last_run_ms, 3),
+        }
+
+
+trending_decay = TrendingDecay()
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+# ------------------------------------------------
+# 사용자 요약 캐시 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 기억하는 사용자 요약 수. 0 이면 캐시하지 않고 요청마다 색인으로 셉니다. (워커마다)
+SUMMARY_MAX_ENTRIES = int(os.environ.get("SNS_USER_SUMMARY_MAX_ENTRIES", "10000"))
+# 요약이 살아있는 최대 시간(초)
+SUMMARY_TTL = float(os.environ.get("SNS_USER_SUMMARY_TTL", "300"))
+
+FIELDS = ("postCount", "commentCount", "likeCount")
+
+# 읽기 캐시 태그: 사용자 한 명의 요약 / 모든 사용자의 요약
+# (포스트 삭제와 보관은 다른 사용자의 댓글 / 좋아요까지 지우므로 모두 비웁니다)
+ALL_USERS = ("users",)
+
+
+def user_tag(user_name: str) -> Tuple[str, str]:
+    return ("user", user_name)
+
+
+class UserSummaryCache:
+    """
+    사용자별 (포스트 수, 댓글 수, 좋아요 수) LRU + TTL 캐시.
+
+    없으면 load() 로 센 값을 저장하고, 그 뒤로는 변경 핸들러가 updating() 안에서 증감을 더합니다.
+    세는 동안 그 사용자의 변경이 시작되었거나 끝났다면 센 값이 그 변경을 포함하는지 알 수 없으므로
+    저장하지 않습니다. (다음 요청이 다시 셉니다)
+
+    증감은 이 프로세스의 요약에만 더하고, on_change 로 다른 워커에는 그 사용자의 요약을 지우라고 알립니다.
+    """
+
+    def __init__(self, max_entries: int = SUMMARY_MAX_ENTRIES, ttl: float = SUMMARY_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # userName -> [[포스트 수, 댓글 수, 좋아요 수], 만료 시각]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        # 변경이 진행 중인 사용자별 수
+        self._changing: Dict[str, int] = {}
+        # 사용자별 마지막 변경 시작 / 끝 시각(_clock). 오래된 것부터 버리고, 버린 값 중 가장 큰 값(또는 모두 비운 시각)을
+        # _forgotten 에 둡니다. 세기 시작한 시각이 이 둘보다 앞서면 센 값을 저장하지 않습니다.
+        self._changed_at: "OrderedDict[str, int]" = OrderedDict()
+        self._clock = 0
+        self._forgotten = 0
+        # 증감을 더한 사용자 목록을 받습니다. (다른 워커에 알리기)
+        self.on_change: Optional[Callable[[List[str]], None]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, user_name: str, load: Callable[[], Tuple[int, int, int]]) -> dict:
+        if not self.enabled:
+            return dict(zip(FIELDS, load()))
+        with self._lock:
+            entry = self._entries.get(user_name)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(user_name)
+                    self.hits += 1
+                    return dict(zip(FIELDS, entry[0]))
+                del self._entries[user_name]
+            self.misses += 1
+            started = self._clock
+
+        counts = load()
+
+        with self._lock:
+            if not self._changing.get(user_name) and max(self._changed_at.get(user_name, 0), self._forgotten) <= started:
+                self._entries[user_name] = [list(counts), time.monotonic() + self.ttl]
+                self._entries.move_to_end(user_name)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return dict(zip(FIELDS, counts))
+
+    @contextmanager
+    def updating(self, *user_names: str) -> Iterator[Callable[..., None]]:
+        """
+        사용자 요약을 바꾸는 쓰기를 감쌉니다. (쓰기를 시작하기 전에 들어가야 합니다)
+        with 블록 안에서 add(userName, posts=, comments=, likes=) 로 기록한 증감은 블록이 정상적으로 끝날 때 더합니다.
+        예외로 끝나면 쓰기가 일부 반영되었을 수도 있으므로 증감 대신 그 사용자들의 요약을 지웁니다.
+        """
+        deltas: Dict[str, List[int]] = {}
+
+        def add(user_name: str, posts: int = 0, comments: int = 0, likes: int = 0) -> None:
+            delta = deltas.setdefault(user_name, [0, 0, 0])
+            delta[0] += posts
+            delta[1] += comments
+            delta[2] += likes
+
+        users = set(user_names)
+        with self._lock:
+            for user_name in users:
+                self._changing[user_name] = self._changing.get(user_name, 0) + 1
+                self._touch(user_name)
+        failed = False
+        try:
+            yield add
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                for user_name in users:
+                    remaining = self._changing[user_name] - 1
+                    if remaining:
+                        self._changing[user_name] = remaining
+                    else:
+                        del self._changing[user_name]
+                    self._touch(user_name)
+                    if failed and self._entries.pop(user_name, None) is not None:
+                        self.invalidations += 1
+                if not failed:
+                    for user_name, delta in deltas.items():
+                        entry = self._entries.get(user_name)
+                        if entry is not None:
+                            entry[0] = [count + change for count, change in zip(entry[0], delta)]
+                            self.updates += 1
+            changed = list(users) if failed else list(deltas)
+            if changed and self.on_change is not None:
+                self.on_change(changed)
+
+    def evict(self, tags: Optional[Iterable[Hashable]]) -> None:
+        """읽기 캐시의 on_evict. ("user", 이름) 이면 그 사용자, ALL_USERS 나 None 이면 모두 지웁니다."""
+        with self._lock:
+            if tags is None:
+                self._clear()
+                return
+            for tag in tags:
+                if tag == ALL_USERS:
+                    self._clear()
+                elif isinstance(tag, tuple) and len(tag) == 2 and tag[0] == "user":
+                    if self._entries.pop(tag[1], None) is not None:
+                        self.invalidations += 1
+                    # 지금 세고 있는 값도 저장하지 않도록 합니다.
+                    self._touch(tag[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "updates": self.updates,
+                "invalidations": self.invalidations,
+            }
+
+    # ------------------------------------------------
+    # 내부 함수 (self._lock 을 잡은 상태에서 호출)
+    # ------------------------------------------------
+    def _touch(self, user_name: str) -> None:
+        self._clock += 1
+        self._changed_at[user_name] = self._clock
+        self._changed_at.move_to_end(user_name)
+        while len(self._changed_at) > max(self.max_entries, 1000):
+            _, at = self._changed_at.popitem(last=False)
+            self._forgotten = max(self._forgotten, at)
+
+    def _clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        # 지금 세고 있는 값은 모두 저장하지 않습니다.
+        self._clock += 1
+        self._forgotten = self._clock
+
+
+user_summaries = UserSummaryCache()
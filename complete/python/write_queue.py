@@ -0,0 +1,188 @@
+import contextvars
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from db import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------
+# 쓰기 큐(group commit) 설정 (환경 변수로 조정 가능)
+# ------------------------------------------------
+# 대기할 수 있는 최대 쓰기 작업 수. 가득 차면 새 요청은 SUBMIT_TIMEOUT 만큼 기다린 뒤 503 을 받습니다.
+QUEUE_SIZE = int(os.environ.get("SNS_WRITER_QUEUE_SIZE", "1000"))
+# 한 트랜잭션(한 번의 commit)에 묶는 최대 작업 수. 작업 하나의 최대 commit 지연을 제한합니다.
+MAX_BATCH = int(os.environ.get("SNS_WRITER_MAX_BATCH", "128"))
+# 첫 작업이 들어온 뒤 같은 묶음에 넣을 작업을 더 기다리는 시간(ms). 0 이면 기다리지 않고
+# commit 하는 동안 쌓인 작업이 자연스럽게 다음 묶음이 됩니다.
+MAX_WAIT_MS = float(os.environ.get("SNS_WRITER_MAX_WAIT_MS", "0"))
+# 큐가 가득 찼을 때 빈자리를 기다리는 최대 시간(초)
+SUBMIT_TIMEOUT = float(os.environ.get("SNS_WRITER_SUBMIT_TIMEOUT", "5"))
+
+WriteFn = Callable[[sqlite3.Connection], Any]
+
+
+class WriterBusy(Exception):
+    pass
+
+
+class _Op:
+    __slots__ = ("fn", "context", "future")
+
+    def __init__(self, fn: WriteFn):
+        self.fn = fn
+        # 요청별 계측(metrics)이 writer 스레드에서도 이어지도록 컨텍스트를 함께 넘깁니다.
+        self.context = contextvars.copy_context()
+        self.future: "Future[Any]" = Future()
+
+
+class WriteQueue:
+    """
+    커넥션 풀(샤드) 하나의 모든 변경 작업을 전용 writer 스레드 하나에서 실행하는 group commit 큐.
+
+    writer 스레드는 쌓인 작업을 최대 max_batch 개씩 꺼내 한 트랜잭션에서 차례로 실행하고
+    한 번만 commit 한 뒤 각 작업의 Future 에 결과를 넘깁니다. 작업마다 SAVEPOINT 를 두므로
+    한 작업이 예외(예: 404)로 끝나도 그 작업만 되돌려지고 같은 묶음의 다른 작업은 반영됩니다.
+    Future 는 commit 이 끝난 뒤에 완료되므로, 결과를 받은 요청의 쓰기는 이미 저장되어 있습니다.
+    """
+
+    def __init__(self, max_queue: int = QUEUE_SIZE, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT_MS / 1000, submit_timeout: float = SUBMIT_TIMEOUT):
+        if max_batch < 1:
+            raise ValueError("max_batch 는 1 이상이어야 합니다.")
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.submit_timeout = submit_timeout
+
+        self._queue: "queue.Queue[Optional[_Op]]" = queue.Queue(max_queue)
+        self._pool: Optional[ConnectionPool] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.commits = 0
+        self.operations = 0
+        self.failed_commits = 0
+        self.rejected = 0
+        self.largest_batch = 0
+
+    # ------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------
+    def start(self, pool: ConnectionPool) -> None:
+        if self._thread is not None:
+            return
+        self._pool = pool
+        self._thread = threading.Thread(target=self._run, name="sns-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        # 이미 큐에 있는 작업을 모두 처리한 뒤 멈춥니다.
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    # ------------------------------------------------
+    # 작업 제출
+    # ------------------------------------------------
+    def submit(self, fn: WriteFn) -> "Future[Any]":
+        """fn(conn) 을 writer 스레드에서 실행하도록 예약합니다. fn 안에서 commit 하면 안 됩니다."""
+        if self._thread is None:
+            raise RuntimeError("쓰기 큐가 시작되지 않았습니다.")
+        op = _Op(fn)
+        try:
+            self._queue.put(op, timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriterBusy("쓰기 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.")
+        return op.future
+
+    def run(self, fn: WriteFn) -> Any:
+        """submit 후 commit 될 때까지 기다려 fn 의 결과를 돌려줍니다. (fn 의 예외는 그대로 다시 발생)"""
+        return self.submit(fn).result()
+
+    # ------------------------------------------------
+    # writer 스레드
+    # ------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            op = self._queue.get()
+            if op is None:
+                return
+            batch = [op]
+            stopping = self._gather(batch)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _gather(self, batch: List[_Op]) -> bool:
+        # 종료 신호를 만나면 True
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                op = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if op is None:
+                return True
+            batch.append(op)
+        return False
+
+    def _commit(self, batch: List[_Op]) -> None:
+        results: List[Tuple[bool, Any]] = []
+        try:
+            with self._pool.writer() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for op in batch:
+                    results.append(self._apply(conn, op))
+        except BaseException as e:
+            # commit 또는 되돌리기에 실패하면 묶음 전체가 반영되지 않은 것입니다.
+            logger.exception("쓰기 묶음을 반영하지 못했습니다. (%d개)", len(batch))
+            with self._lock:
+                self.failed_commits += 1
+            for op in batch:
+                op.future.set_exception(e)
+            return
+
+        with self._lock:
+            self.commits += 1
+            self.operations += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        for op, (ok, value) in zip(batch, results):
+            if ok:
+                op.future.set_result(value)
+            else:
+                op.future.set_exception(value)
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, op: _Op) -> Tuple[bool, Any]:
+        conn.execute("SAVEPOINT op")
+        try:
+            value = op.context.run(op.fn, conn)
+        except Exception as e:
+            conn.execute("ROLLBACK TO op")
+            conn.execute("RELEASE op")
+            return False, e
+        conn.execute("RELEASE op")
+        return True, value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "commits": self.commits,
+                "operations": self.operations,
+                "failedCommits": self.failed_commits,
+                "rejected": self.rejected,
+                "largestBatch": self.largest_batch,
+                "maxBatch": self.max_batch,
+            }